@@ -1,4 +1,4 @@
-from .type_viz import TypeVizName, TypeViz
+from .type_viz import TypeVizName, TypeViz, LazyTypeViz
 from .type_viz_expression import TypeVizFormatSpec, TypeVizFormatFlags, TypeVizExpression, TypeVizInterpolatedString
 from .type_viz_item_nodes import \
     TypeVizItemSizeTypeNode, \
@@ -1 +1 @@
-from .natvis_parser import NatvisParsingError, natvis_parse_file
+from .natvis_parser import NatvisParsingError, natvis_parse_file, NATVIS_PARSER_VERSION
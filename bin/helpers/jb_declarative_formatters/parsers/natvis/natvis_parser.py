@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import re
 import traceback
 from collections.abc import Iterable
@@ -26,6 +27,10 @@ from six import StringIO
 # noinspection HttpUrlsUsage
 NATVIS_SCHEMA_NAMESPACE = 'http://schemas.microsoft.com/vstudio/debugger/natvis/2010'
 
+# Version of the parsed object model (TypeViz and everything it holds).
+# Bump it on every change of the parser output: persistent caches of parsed files are invalidated by it.
+NATVIS_PARSER_VERSION = 6
+
 
 class NatvisIntrinsicXmlDefinition(object):
     def __init__(self, name: str, expression: str, optional: bool,
@@ -52,7 +57,11 @@ def _log(logger: Logger | None, message: str):
 
 
 # noinspection PyBroadException
-def natvis_parse_file(path: str, logger: Logger | None = None) -> Iterable[TypeViz]:
+def natvis_parse_file(path: str, logger: Logger | None = None, lazy: bool = False) -> Iterable[TypeViz | LazyTypeViz]:
+    """
+    :param lazy: parse only names, priorities and inheritance flags of the types,
+                 their bodies are parsed when the returned visualizers are materialized
+    """
     try:
         tree = ElementTree.parse(path)
         root = tree.getroot()
@@ -73,10 +82,19 @@ def natvis_parse_file(path: str, logger: Logger | None = None) -> Iterable[TypeV
             raise NatvisParsingError(error_message)
         return []
 
+    # Eager visualizers are fingerprinted by their parsed declaration, which includes the global intrinsics
+    global_intrinsics_fingerprint = _fingerprint_sources(map(ElementTree.tostring,
+                                                            root.findall('natvis:Intrinsic', _NS))) if lazy else ''
     for node_type_name in root.findall('natvis:Type', _NS):
         # noinspection PyBroadException
         try:
-            yield natvis_parse_type(node_type_name, intrinsics, logger)
+            if lazy:
+                yield NatvisLazyTypeViz(_parse_type_viz_names(node_type_name, logger),
+                                        _parse_boolean(node_type_name, 'Inheritable', 'true'),
+                                        _parse_type_priority(node_type_name),
+                                        node_type_name, intrinsics, global_intrinsics_fingerprint)
+            else:
+                yield natvis_parse_type(node_type_name, intrinsics, logger)
         except NatvisParsingError:
             # expected parsing error happened
             # - skip node and continue
@@ -88,6 +106,51 @@ def natvis_parse_file(path: str, logger: Logger | None = None) -> Iterable[TypeV
             continue
 
 
+def _fingerprint_sources(sources: Iterable[bytes], seed: str = '') -> str:
+    fingerprint = hashlib.sha256(seed.encode())
+    for source in sources:
+        fingerprint.update(source)
+    return fingerprint.hexdigest()
+
+
+class NatvisLazyTypeViz(LazyTypeViz):
+    def __init__(self, type_viz_names: list[TypeVizName], is_inheritable: bool, priority: int,
+                 source: Element, global_scope_intrinsics: IntrinsicsScope, global_intrinsics_fingerprint: str):
+        super().__init__(type_viz_names, is_inheritable, priority)
+        # The parsed <Type> node, it is serialized only when the visualizer is stored into the persistent cache
+        self._source: Element | bytes | None = source
+        self._global_scope_intrinsics = global_scope_intrinsics
+        self._global_intrinsics_fingerprint = global_intrinsics_fingerprint
+
+    def __getstate__(self):
+        # The serialized <Type> node is much more compact than the pickled element tree
+        state = self.__dict__.copy()
+        if isinstance(self._source, Element):
+            state['_source'] = ElementTree.tostring(self._source)
+        return state
+
+    def _get_source_bytes(self) -> bytes:
+        return ElementTree.tostring(self._source) if isinstance(self._source, Element) else self._source
+
+    def _compute_source_fingerprint(self) -> Optional[str]:
+        if self._source is None:
+            return None
+        return _fingerprint_sources([self._get_source_bytes()], self._global_intrinsics_fingerprint)
+
+    # noinspection PyBroadException
+    def _materialize(self, logger: Logger) -> Optional[TypeViz]:
+        source, self._source = self._source, None
+        try:
+            if not isinstance(source, Element):
+                source = ElementTree.fromstring(source)
+            return natvis_parse_type(source, self._global_scope_intrinsics, logger)
+        except NatvisParsingError:
+            _log(logger, f"NatvisParsingError on parsing type {self.type_viz_names[0]}. Traceback: {traceback.format_exc()}")
+        except Exception:
+            _log(logger, f"Error on parsing type {self.type_viz_names[0]}. Traceback: {traceback.format_exc()}")
+        return None
+
+
 def _unescape(value):
     if value is None:
         return value
@@ -164,6 +227,19 @@ def _natvis_node_parse_smart_pointer_usage(node: Element) -> TypeVizSmartPointer
         raise NatvisParsingError(f"Can't parse 'Usage' value '{value}', expected: {expected}")
 
 
+def _parse_type_viz_names(node_type_name: Element, logger: Logger) -> list[TypeVizName]:
+    type_viz_names = list[TypeVizName]()
+    alt_names = _parse_type_name_alternatives(node_type_name)
+    for alt_name in alt_names:
+        try:
+            _log(logger, f"Parsing type name '{alt_name}'")
+            name_ast = parse_type_name_template(alt_name)
+        except TypeNameParsingError as e:
+            raise NatvisParsingError(e)
+        type_viz_names.append(TypeVizName(alt_name, name_ast))
+    return type_viz_names
+
+
 def natvis_parse_type(node_type_name: Element, global_scope_intrinsics: IntrinsicsScope,
                       logger: Logger) -> TypeViz:
     _item_node_parsers = {
@@ -176,16 +252,7 @@ def natvis_parse_type(node_type_name: Element, global_scope_intrinsics: Intrinsi
         _make_tag('CustomListItems'): _natvis_node_parse_custom_list_items,
     }
 
-    type_viz_names = list[TypeVizName]()
-    alt_names = _parse_type_name_alternatives(node_type_name)
-    for alt_name in alt_names:
-        try:
-            _log(logger, f"Parsing type name '{alt_name}'")
-            name_ast = parse_type_name_template(alt_name)
-        except TypeNameParsingError as e:
-            raise NatvisParsingError(e)
-        type_viz_names.append(TypeVizName(alt_name, name_ast))
-
+    type_viz_names = _parse_type_viz_names(node_type_name, logger)
     inheritable = _parse_boolean(node_type_name, 'Inheritable', 'true')
     include_view = _natvis_node_parse_include_view(node_type_name)
     exclude_view = _natvis_node_parse_exclude_view(node_type_name)
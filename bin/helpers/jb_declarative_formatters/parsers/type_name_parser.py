@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import re
 from enum import Enum, auto
+from functools import lru_cache
 from typing import Optional, Tuple
 
 from jb_declarative_formatters.type_name_template import TypeNameTemplate
@@ -20,8 +22,26 @@ class DefaultDiagHandler(object):
         raise error
 
 
+# Maximum number of parsed type names kept in the cache
+TYPE_NAME_TEMPLATE_CACHE_SIZE = 4096
+
+
 def parse_type_name_template(type_name: str, diag_handler: Optional[DefaultDiagHandler] = None) -> TypeNameTemplate:
-    diag_handler = diag_handler or DefaultDiagHandler()
+    """
+    Parse the type name. Results parsed with the default diagnostics handler are cached,
+    TypeNameTemplate objects are immutable, so they are shared between the callers.
+    """
+    if diag_handler is None:
+        return _parse_type_name_template_cached(type_name)
+    return _parse_type_name_template(type_name, diag_handler)
+
+
+@lru_cache(maxsize=TYPE_NAME_TEMPLATE_CACHE_SIZE)
+def _parse_type_name_template_cached(type_name: str) -> TypeNameTemplate:
+    return _parse_type_name_template(type_name, DefaultDiagHandler())
+
+
+def _parse_type_name_template(type_name: str, diag_handler: DefaultDiagHandler) -> TypeNameTemplate:
     lexer = Lexer(type_name, diag_handler)
     parser = Parser(lexer, diag_handler)
     return parser.parse_type_name()
@@ -54,7 +74,6 @@ class Token(object):
 
 
 class Lexer(object):
-    WHITESPACES = [' ', '\n', '\t']
     TT_MAP = {
         '<': TokenType.LESS,
         '>': TokenType.GREATER,
@@ -64,40 +83,37 @@ class Lexer(object):
         ')': TokenType.RPARENT,
         '&': TokenType.AMPERSAND,
     }
+    # Single punctuator or identifier (anything else up to a whitespace or punctuator) after optional whitespaces
+    TOKEN_REGEX = re.compile(r'[ \n\t]*(?:([<>,*()&])|([^ \n\t<>,*()&]+))')
 
     def __init__(self, characters: str, diag_handler: DefaultDiagHandler):
         self.stream: str = characters
         self.stream_len: int = len(self.stream)
         self.diag_handler: DefaultDiagHandler = diag_handler
         self.pos: int = 0
+        self._tokens: list[Token] = self._tokenize()
+        self._token_index: int = 0
+
+    def _tokenize(self) -> list[Token]:
+        tokens = []
+        for m in self.TOKEN_REGEX.finditer(self.stream):
+            punctuator = m.group(1)
+            if punctuator is not None:
+                tokens.append(Token(self.TT_MAP[punctuator], punctuator, m.start(1)))
+            else:
+                # interprete anything else as identifier
+                tokens.append(Token(TokenType.IDENT, m.group(2), m.start(2)))
+        return tokens
 
     def fetch(self) -> Token:
-        # skip whitespaces
-        while self.pos < self.stream_len and self.stream[self.pos] in self.WHITESPACES:
-            self.pos += 1
-
-        if self.pos >= self.stream_len:
+        if self._token_index >= len(self._tokens):
+            self.pos = self.stream_len
             return Token(TokenType.END, '', self.pos)
 
-        tok_start_pos = self.pos
-        c = self.stream[self.pos]
-        self.pos += 1
-
-        possible_tt = self.TT_MAP.get(c, None)
-        if possible_tt is not None:
-            return Token(possible_tt, c, tok_start_pos)
-
-        # interprete anything else as identifier
-        while self.pos < self.stream_len:
-            c = self.stream[self.pos]
-            if c in self.WHITESPACES:
-                break
-            if c in self.TT_MAP:
-                break
-            self.pos += 1
-
-        ident = self.stream[tok_start_pos:self.pos]
-        return Token(TokenType.IDENT, ident, tok_start_pos)
+        token = self._tokens[self._token_index]
+        self._token_index += 1
+        self.pos = token.pos + len(token.text)
+        return token
 
     def _raise_error(self, message: str):
         self.diag_handler.raise_error(self._make_error(message))
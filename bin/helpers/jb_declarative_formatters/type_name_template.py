@@ -1,25 +1,40 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Iterable, Optional
 
 
 class TypeNameTemplate(object):
-    args: list[TypeNameTemplate]
+    """
+    Parsed type name. It is immutable: parsed type names are cached and shared.
+    """
+    args: tuple[TypeNameTemplate, ...]
     fmt: str
     name: str
 
     def __init__(self, name: str, fmt: str = None,
-                 args: list[TypeNameTemplate] = None,
+                 args: Iterable[TypeNameTemplate] = None,
                  original_text: Optional[str] = None):
         super(TypeNameTemplate, self).__init__()
 
-        if args is None:
-            args = []
+        args = tuple(args) if args is not None else ()
 
-        self.name = name
-        self.original_text = original_text
-        self.fmt = fmt
-        self.args = args
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'original_text', original_text)
+        object.__setattr__(self, 'fmt', fmt)
+        object.__setattr__(self, 'args', args)
+        object.__setattr__(self, 'has_wildcard', self.is_wildcard or any(arg.has_wildcard for arg in args))
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"'{type(self).__name__}' is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError(f"'{type(self).__name__}' is immutable")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __str__(self) -> str:
         if self.args:
@@ -27,17 +42,6 @@ class TypeNameTemplate(object):
 
         return self.original_text if self.original_text is not None else self.name
 
-    @property
-    def has_wildcard(self) -> bool:
-        if self.is_wildcard:
-            return True
-
-        for arg in self.args:
-            if arg.has_wildcard:
-                return True
-
-        return False
-
     @property
     def is_wildcard(self) -> bool:
         return self.name == '*'
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+
+from jb_declarative_formatters.type_name_template import TypeNameTemplate
+
+TValue = TypeVar("TValue")
+
+# Symbol of a wildcard template argument, it matches the whole subtree of the candidate argument
+_WILDCARD = ('*',)
+# Symbol of the trailing wildcard of a template with fewer arguments than the candidate (`T<A, *>` matches `T<A, B, C>`),
+# it matches all the remaining arguments of the candidate
+_TAIL_WILDCARD = ('*...',)
+# Arguments count in the symbol of a template ending with a wildcard: it matches any candidate with at least as many
+# arguments, so templates sharing leading arguments share the path in the tree
+_VARIADIC = -1
+
+
+class _Node(object):
+    __slots__ = ('children', 'values')
+
+    def __init__(self):
+        self.children: Dict[tuple, _Node] = {}
+        self.values: list = []
+
+
+class TypeNameTemplateIndex(Generic[TValue]):
+    """
+    Discrimination tree over wildcard type name templates.
+    Templates are flattened into the pre-order sequence of (name, arguments count) symbols, so a lookup walks
+    the tree along the candidate type name and its cost doesn't depend on the number of indexed templates.
+    `lookup` yields exactly the values whose templates `TypeNameTemplate.match` the candidate.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+
+    def add(self, template: TypeNameTemplate, value: TValue):
+        node = self._root
+        for symbol in _flatten_template(template):
+            child = node.children.get(symbol)
+            if child is None:
+                child = node.children[symbol] = _Node()
+            node = child
+        node.values.append(value)
+
+    def lookup(self, candidate: TypeNameTemplate) -> List[TValue]:
+        symbols, ends = _flatten_candidate(candidate)
+        symbols_count = len(symbols)
+
+        result = []
+        # (node, position in the candidate, linked stack of the ends of the enclosing variadic candidate nodes)
+        stack: List[Tuple[_Node, int, Optional[tuple]]] = [(self._root, 0, None)]
+        while stack:
+            node, pos, bounds = stack.pop()
+            if pos == symbols_count:
+                result.extend(node.values)
+                continue
+            # arguments of a variadic template must not run out of the matched candidate node
+            if bounds is not None and pos >= bounds[0]:
+                continue
+
+            children = node.children
+            child = children.get(_WILDCARD)
+            if child is not None:
+                stack.append((child, ends[pos], bounds))
+
+            child = children.get(_TAIL_WILDCARD)
+            if child is not None and bounds is not None:
+                stack.append((child, bounds[0], bounds[1]))
+
+            name, args_count = symbols[pos]
+            child = children.get((name, args_count))
+            if child is not None:
+                stack.append((child, pos + 1, bounds))
+
+            if args_count:
+                child = children.get((name, _VARIADIC))
+                if child is not None:
+                    stack.append((child, pos + 1, (ends[pos], bounds)))
+
+        return result
+
+
+def _flatten_template(template: TypeNameTemplate) -> List[tuple]:
+    symbols = []
+    stack = [(template, False)]
+    while stack:
+        current, is_tail = stack.pop()
+        if current.is_wildcard:
+            symbols.append(_TAIL_WILDCARD if is_tail else _WILDCARD)
+            continue
+
+        args = current.args
+        is_variadic = bool(args) and args[-1].is_wildcard
+        symbols.append((current.name, _VARIADIC if is_variadic else len(args)))
+        for i in range(len(args) - 1, -1, -1):
+            stack.append((args[i], is_variadic and i == len(args) - 1))
+    return symbols
+
+
+def _flatten_candidate(candidate: TypeNameTemplate) -> Tuple[List[Tuple[str, int]], List[int]]:
+    """
+    :return: pre-order (name, arguments count) symbols and index past the subtree of each symbol
+    """
+    symbols = []
+    ends = []
+    stack = [candidate]
+    pending_ends = []
+    while stack:
+        current = stack.pop()
+        if current is None:
+            ends[pending_ends.pop()] = len(symbols)
+            continue
+
+        pos = len(symbols)
+        symbols.append((current.name, len(current.args)))
+        ends.append(pos + 1)
+        if current.args:
+            pending_ends.append(pos)
+            stack.append(None)
+            stack.extend(reversed(current.args))
+    return symbols, ends
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import hashlib
+import io
+import pickle
 from enum import Enum, auto
 from typing import Optional, List
 
@@ -69,3 +72,89 @@ class TypeViz(object):
         self.hide_raw_view: bool = False
         self.smart_pointer: Optional[TypeVizSmartPointer] = None
         self.string_views: List[TypeVizStringView] = []
+        # Hash of the declaration the visualizer is built from (None until it is computed).
+        # Visualizers with equal fingerprints are interchangeable, it is used to find changed types on reloading.
+        self.source_fingerprint: Optional[str] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['logger'] = None
+        return state
+
+    def __setstate__(self, state):
+        # View spec ids are assigned per process, so they are recomputed when restored from a persistent cache
+        self.__dict__.update(state)
+        self.include_view_id = get_custom_view_spec_id_by_name(self.include_view)
+        self.exclude_view_id = get_custom_view_spec_id_by_name(self.exclude_view)
+
+    def get_source_fingerprint(self) -> Optional[str]:
+        """
+        The fingerprint is computed on the first call from the parsed declaration,
+        it is only needed to find changed types on reloading.
+        """
+        if self.source_fingerprint is None:
+            state = self.__getstate__()
+            del state['source_fingerprint']
+            self.source_fingerprint = _fingerprint_object(state)
+        return self.source_fingerprint
+
+
+def _fingerprint_object(obj) -> Optional[str]:
+    """
+    :return: hash of the pickled object or None if it can't be pickled without the memo
+    """
+    output = io.BytesIO()
+    pickler = pickle.Pickler(output, pickle.HIGHEST_PROTOCOL)
+    # Without the memo equal objects are pickled equally regardless of which of their parts are shared,
+    # e.g. the attribute names interned by unpickling or the type names cached by the parser
+    pickler.fast = True
+    try:
+        pickler.dump(obj)
+    except (ValueError, RecursionError):
+        return None
+    return hashlib.sha256(output.getvalue()).hexdigest()
+
+
+class LazyTypeViz(object):
+    """
+    Placeholder of a type visualizer whose declaration is parsed on the first use.
+    Only the attributes required to register and order the visualizer in a storage are available before that.
+    """
+
+    def __init__(self, type_viz_names: list[TypeVizName], is_inheritable: bool, priority: int):
+        self.type_viz_names = type_viz_names
+        self.is_inheritable = is_inheritable
+        self.priority = priority
+        self.source_fingerprint: Optional[str] = None
+        self._is_materialized = False
+        self._materialized: Optional[TypeViz] = None
+
+    def _materialize(self, logger: Logger) -> Optional[TypeViz]:
+        raise NotImplementedError
+
+    def _compute_source_fingerprint(self) -> Optional[str]:
+        return None
+
+    def get_source_fingerprint(self) -> Optional[str]:
+        """
+        The fingerprint is computed on the first call, it is only needed to find changed types on reloading.
+        """
+        if self.source_fingerprint is None:
+            self.source_fingerprint = self._compute_source_fingerprint()
+        return self.source_fingerprint
+
+    def get_materialized(self, logger: Logger = None) -> Optional[TypeViz]:
+        """
+        :return: the parsed visualizer (the same object on every call) or None if the declaration is invalid
+        """
+        if not self._is_materialized:
+            # The source is dropped on materializing
+            source_fingerprint = self.get_source_fingerprint()
+            type_viz = self._materialize(logger)
+            if type_viz is not None:
+                # Keep the names the placeholder was registered with, they are referenced by the storage
+                type_viz.type_viz_names = self.type_viz_names
+                type_viz.source_fingerprint = source_fingerprint
+            self._materialized = type_viz
+            self._is_materialized = True
+        return self._materialized
@@ -53,6 +53,11 @@ class TypeVizFormatOptions(object):
         self.view_spec = view_spec
         self.view_spec_id = get_custom_view_spec_id_by_name(view_spec)
 
+    def __setstate__(self, state):
+        # View spec ids are assigned per process, so they are recomputed when restored from a persistent cache
+        self.__dict__.update(state)
+        self.view_spec_id = get_custom_view_spec_id_by_name(self.view_spec)
+
     def __str__(self):
         r = ''
         if self.array_size:
@@ -99,6 +104,11 @@ class TypeVizCondition(object):
         self.exclude_view = exclude_view
         self.exclude_view_id = get_custom_view_spec_id_by_name(exclude_view)
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.include_view_id = get_custom_view_spec_id_by_name(self.include_view)
+        self.exclude_view_id = get_custom_view_spec_id_by_name(self.exclude_view)
+
 
 class TypeVizExpression(object):
     def __init__(self, text: str, array_size: str = None, format_spec: TypeVizFormatSpec = None,
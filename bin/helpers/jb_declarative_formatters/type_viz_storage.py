@@ -1,11 +1,15 @@
+from __future__ import annotations
+
 import copy
+import itertools
 import re
 from collections import defaultdict
-from typing import List, TypeVar, Callable, Tuple, Iterator
+from typing import List, TypeVar, Callable, Tuple, Iterator, Dict, Optional
 
 import six
-from jb_declarative_formatters import TypeViz, TypeVizName
+from jb_declarative_formatters import TypeViz, TypeVizName, LazyTypeViz
 from jb_declarative_formatters.type_name_template import TypeNameTemplate
+from jb_declarative_formatters.type_name_template_index import TypeNameTemplateIndex
 from jb_declarative_formatters.type_viz_synthetic_method import SyntheticMethodDefinition
 from jb_declarative_formatters.type_viz_top_level_methods import TypeVizTopLevelMethods
 
@@ -17,30 +21,42 @@ class DirectAcyclicGraph(object):
         self.children_accessor = children_accessor
         self.vertices = vertices
 
-    def _inner_recursive_sort(self, v: TVertex, visited: set[TVertex], stack: list[TVertex]) -> None:
-        visited.add(v)
-        for c in self.children_accessor(v):
-            if c not in visited:
-                self._inner_recursive_sort(c, visited, stack)
-
-        stack.append(v)
-
     def sort(self) -> list[TVertex]:
+        """
+        Topological sort in the post-order of the depth-first search, children are placed before their parents.
+        The search is iterative, so deep graphs don't hit the recursion limit.
+        """
         visited = set[TVertex]()
         accumulator = list[TVertex]()
-        for v in self.vertices:
-            if v not in visited:
-                self._inner_recursive_sort(v, visited, accumulator)
+        for root in self.vertices:
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(self.children_accessor(root)))]
+            while stack:
+                v, children = stack[-1]
+                for c in children:
+                    if c not in visited:
+                        visited.add(c)
+                        stack.append((c, iter(self.children_accessor(c))))
+                        break
+                else:
+                    stack.pop()
+                    accumulator.append(v)
         return accumulator
 
 
 class TypeVizDescriptor(object):
-    def __init__(self, type_viz_name: TypeVizName, regex: str, visualizer: TypeViz):
+    def __init__(self, type_viz_name: TypeVizName, regex: str, visualizer: TypeViz | LazyTypeViz):
         self.name = type_viz_name
         self.regex = regex
-        self.visualizers: List[TypeViz] = [visualizer]
+        self.visualizers: List[TypeViz | LazyTypeViz] = [visualizer]
         self.more_specific_descriptors = []
 
+    @property
+    def has_lazy_visualizers(self) -> bool:
+        return any(isinstance(visualizer, LazyTypeViz) for visualizer in self.visualizers)
+
     def __str__(self):
         return str(self.name)
 
@@ -51,6 +67,16 @@ class TypeVizStorage(object):
             self.descriptors_was_sorted: bool = False
             self.exact_match: List[TypeVizDescriptor] = []
             self.wildcard_match: List[TypeVizDescriptor] = []
+            self.exact_match_by_regex: Dict[str, TypeVizDescriptor] = {}
+            self.wildcard_match_by_regex: Dict[str, TypeVizDescriptor] = {}
+            # Number of wildcard descriptors whose `more_specific_descriptors` are already filled
+            self._linked_wildcard_count: int = 0
+            self._wildcard_index: Optional[TypeNameTemplateIndex[Tuple[int, TypeVizDescriptor]]] = None
+
+        def __getstate__(self):
+            state = self.__dict__.copy()
+            state['_wildcard_index'] = None
+            return state
 
         def ensure_descriptors_sorted(self):
             if self.descriptors_was_sorted:
@@ -62,54 +88,107 @@ class TypeVizStorage(object):
             for descriptor in self.wildcard_match:
                 descriptor.visualizers.sort(key=lambda x: -x.priority)
 
+            self._link_pending_wildcard_descriptors()
             graph = DirectAcyclicGraph(self.wildcard_match, lambda m: m.more_specific_descriptors)
             self.wildcard_match = list(graph.sort())
+            self._wildcard_index = None
             self.descriptors_was_sorted = True
 
+        def _link_pending_wildcard_descriptors(self):
+            """
+            Fill `more_specific_descriptors` for the wildcard descriptors added since the last sorting.
+            The result is the same as if each added descriptor was compared with all the preceding ones:
+            a preceding descriptor matching the added one gets it as more specific,
+            otherwise the added descriptor gets the preceding one if it matches it.
+            Matching pairs are looked up in the template indexes, so the cost doesn't grow quadratically.
+            """
+            descriptors = self.wildcard_match
+            first_pending = self._linked_wildcard_count
+            if first_pending == len(descriptors):
+                return
+
+            all_index = TypeNameTemplateIndex()
+            pending_index = TypeNameTemplateIndex()
+            for position, descriptor in enumerate(descriptors):
+                all_index.add(descriptor.name.type_name_template, position)
+                if position >= first_pending:
+                    pending_index.add(descriptor.name.type_name_template, position)
+
+            # preceding descriptors matched by the pending ones, in the order of the list
+            matched_preceding: Dict[int, List[TypeVizDescriptor]] = defaultdict(list)
+            for position, descriptor in enumerate(descriptors):
+                template = descriptor.name.type_name_template
+                for pending_position in pending_index.lookup(template):
+                    pending_template = descriptors[pending_position].name.type_name_template
+                    if pending_position > position and not template.match(pending_template, None, None):
+                        matched_preceding[pending_position].append(descriptor)
+
+            for position in range(first_pending, len(descriptors)):
+                descriptor = descriptors[position]
+                descriptor.more_specific_descriptors.extend(matched_preceding.get(position, ()))
+                for preceding_position in all_index.lookup(descriptor.name.type_name_template):
+                    if preceding_position < position:
+                        descriptors[preceding_position].more_specific_descriptors.append(descriptor)
+
+            self._linked_wildcard_count = len(descriptors)
+
+        def get_wildcard_matched_descriptors(self, type_name_template: TypeNameTemplate) -> List[TypeVizDescriptor]:
+            """
+            :return: wildcard descriptors matching the type name in the order of `wildcard_match`
+            """
+            self.ensure_descriptors_sorted()
+            if self._wildcard_index is None:
+                # Values are tagged with the position in the sorted list to restore priority and specificity order
+                index = TypeNameTemplateIndex()
+                for position, descriptor in enumerate(self.wildcard_match):
+                    index.add(descriptor.name.type_name_template, (position, descriptor))
+                self._wildcard_index = index
+
+            matched = self._wildcard_index.lookup(type_name_template)
+            matched.sort(key=lambda m: m[0])
+            return [descriptor for _, descriptor in matched]
+
     def __init__(self, logger=None):
         self._logger = logger
         self._types = defaultdict(TypeVizStorage.Item)
         self._top_level_methods: List[SyntheticMethodDefinition] = []
+        self._top_level_methods_collector: Optional[TypeVizTopLevelMethods] = None
 
-    @staticmethod
-    def _try_add_visualizer_to_descriptor(type_name: str, type_viz: TypeViz, descriptors: List[TypeVizDescriptor]) \
-            -> bool:
-        for descriptor in descriptors:
-            if descriptor.regex == type_name:
-                descriptor.visualizers.append(type_viz)
-                return True
-        return False
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_logger'] = None
+        return state
 
-    def add_type(self, type_viz: TypeViz):
+    def set_logger(self, logger):
+        self._logger = logger
+
+    def add_type(self, type_viz: TypeViz | LazyTypeViz):
         for type_viz_name in type_viz.type_viz_names:
             key: str = _build_key(type_viz_name.type_name_template)
             item = self._types[key]
             item.descriptors_was_sorted = False
             if type_viz_name.has_wildcard:
                 regex = f"^{_build_regex(type_viz_name.type_name_template)}$"
-                if self._try_add_visualizer_to_descriptor(regex, type_viz, item.wildcard_match):
-                    continue
-
-                descriptor_to_add = TypeVizDescriptor(type_viz_name, regex, type_viz)
-                for descriptor in item.wildcard_match:
-                    if descriptor.name.type_name_template.match(type_viz_name.type_name_template, None, None):
-                        descriptor.more_specific_descriptors.append(descriptor_to_add)
-                    elif type_viz_name.type_name_template.match(descriptor.name.type_name_template, None, None):
-                        descriptor_to_add.more_specific_descriptors.append(descriptor)
-
-                item.wildcard_match.append(descriptor_to_add)
+                descriptors, descriptors_by_regex = item.wildcard_match, item.wildcard_match_by_regex
             else:
-                type_name = str(type_viz_name.type_name_template)
-                if self._try_add_visualizer_to_descriptor(type_name, type_viz, item.exact_match):
-                    continue
+                regex = str(type_viz_name.type_name_template)
+                descriptors, descriptors_by_regex = item.exact_match, item.exact_match_by_regex
 
-                descriptor_to_add = TypeVizDescriptor(type_viz_name, type_name, type_viz)
-                item.exact_match.append(descriptor_to_add)
+            descriptor = descriptors_by_regex.get(regex)
+            if descriptor is not None:
+                descriptor.visualizers.append(type_viz)
+                continue
+
+            # more specific wildcard descriptors are linked on sorting
+            descriptor_to_add = TypeVizDescriptor(type_viz_name, regex, type_viz)
+            descriptors.append(descriptor_to_add)
+            descriptors_by_regex[regex] = descriptor_to_add
 
     def iterate_exactly_matched_type_viz(self) -> Iterator[Tuple[str, TypeViz, TypeVizName]]:
         for item in six.itervalues(self._types):
             item.ensure_descriptors_sorted()
             for descriptor in item.exact_match:
+                self._ensure_descriptor_materialized(descriptor)
                 for visualizer in descriptor.visualizers:
                     yield descriptor.regex, visualizer, descriptor.name
 
@@ -117,6 +196,7 @@ class TypeVizStorage(object):
         for item in six.itervalues(self._types):
             item.ensure_descriptors_sorted()
             for descriptor in item.wildcard_match:
+                self._ensure_descriptor_materialized(descriptor)
                 for visualizer in descriptor.visualizers:
                     yield descriptor.regex, visualizer, descriptor.name
 
@@ -128,14 +208,14 @@ class TypeVizStorage(object):
             req_type_name = str(type_name_template)
             for match in item.exact_match:
                 if req_type_name == match.regex:
+                    self._ensure_descriptor_materialized(match)
                     for visualizer in match.visualizers:
                         yield visualizer, match.name
 
-            for match in item.wildcard_match:
-                wildcard = match.name.type_name_template
-                if wildcard.match(type_name_template, None, self._logger):
-                    for visualizer in match.visualizers:
-                        yield visualizer, match.name
+            for match in item.get_wildcard_matched_descriptors(type_name_template):
+                self._ensure_descriptor_materialized(match)
+                for visualizer in match.visualizers:
+                    yield visualizer, match.name
 
     @staticmethod
     def _detach_alternative_type_visualizers(descriptor: TypeVizDescriptor):
@@ -155,21 +235,95 @@ class TypeVizStorage(object):
                 type_viz_copy.item_providers = copy.deepcopy(type_viz.item_providers)
                 descriptor.visualizers[i] = type_viz_copy
 
+    def _ensure_descriptor_materialized(self, descriptor: TypeVizDescriptor):
+        """
+        Parse lazy visualizers of the descriptor and collect their top-level methods.
+        Visualizers with invalid declarations are dropped.
+        """
+        if not descriptor.has_lazy_visualizers:
+            return
+
+        visualizers = []
+        materialized_indexes = []
+        for visualizer in descriptor.visualizers:
+            if isinstance(visualizer, LazyTypeViz):
+                visualizer = visualizer.get_materialized(self._logger)
+                if visualizer is None:
+                    continue
+                materialized_indexes.append(len(visualizers))
+            visualizers.append(visualizer)
+        descriptor.visualizers = visualizers
+
+        self._detach_alternative_type_visualizers(descriptor)
+        if self._top_level_methods_collector is not None:
+            for index in materialized_indexes:
+                self._top_level_methods_collector.collect_top_level_methods_from(descriptor.regex,
+                                                                                 descriptor.visualizers[index],
+                                                                                 descriptor.name)
+
     def generate_top_level_methods(self):
+        """
+        Collect top-level methods of all the visualizers.
+        Methods of lazy visualizers are appended to the list of top-level methods when they are materialized.
+        """
         top_level_methods = TypeVizTopLevelMethods()
         for type_item in self._types.values():
             type_item.ensure_descriptors_sorted()
             for descriptors in (type_item.exact_match, type_item.wildcard_match):
                 for descriptor in descriptors:
+                    if descriptor.has_lazy_visualizers:
+                        continue
                     self._detach_alternative_type_visualizers(descriptor)
                     for visualizer in descriptor.visualizers:
                         top_level_methods.collect_top_level_methods_from(descriptor.regex, visualizer, descriptor.name)
 
+        self._top_level_methods_collector = top_level_methods
         self._top_level_methods = top_level_methods.methods_definitions
 
     def get_top_level_methods(self) -> List[SyntheticMethodDefinition]:
         return self._top_level_methods
 
+    def get_type_keys(self) -> List[str]:
+        """
+        Keys of the buckets of the visualizers, comparable with `build_type_name_key`.
+        """
+        return [_normalize_key(key) for key in self._types.keys()]
+
+    def get_type_viz_names(self) -> List[TypeVizName]:
+        """
+        Names of all the visualizers in the storage, lazy visualizers are not materialized.
+        """
+        return [descriptor.name for item in self._types.values()
+                for descriptor in itertools.chain(item.exact_match, item.wildcard_match)]
+
+    def _collect_fingerprints(self) -> Dict[str, Tuple[TypeVizName, List[Optional[str]]]]:
+        result = {}
+        for item in self._types.values():
+            item.ensure_descriptors_sorted()
+            for descriptor in itertools.chain(item.exact_match, item.wildcard_match):
+                fingerprints = [visualizer.get_source_fingerprint() for visualizer in descriptor.visualizers]
+                result[descriptor.regex] = (descriptor.name, fingerprints)
+        return result
+
+    @staticmethod
+    def diff_type_viz_names(old_storage: TypeVizStorage, new_storage: TypeVizStorage) -> List[TypeVizName]:
+        """
+        Find type names whose visualizers were added, removed or changed in the new storage.
+        Visualizers without a source fingerprint are always considered as changed.
+        Names from both storages are returned, so the result can be matched against objects built from any of them.
+        """
+        old_fingerprints = old_storage._collect_fingerprints()
+        new_fingerprints = new_storage._collect_fingerprints()
+        changed_names = []
+        for regex in old_fingerprints.keys() | new_fingerprints.keys():
+            old_entry = old_fingerprints.get(regex)
+            new_entry = new_fingerprints.get(regex)
+            if old_entry is not None and new_entry is not None and old_entry[1] == new_entry[1] \
+                    and None not in new_entry[1]:
+                continue
+            changed_names.extend(entry[0] for entry in (old_entry, new_entry) if entry is not None)
+        return changed_names
+
 
 def _build_key(type_name_template: TypeNameTemplate):
     idx_prefix_end = type_name_template.name.find('<')
@@ -178,6 +332,21 @@ def _build_key(type_name_template: TypeNameTemplate):
     return type_name_template.name[:idx_prefix_end]
 
 
+def _normalize_key(key: str) -> str:
+    return ''.join(key.split())
+
+
+def build_type_name_key(type_name: str) -> str:
+    """
+    Build the key of the bucket the type name is looked up in without parsing the name.
+    Whitespace is dropped, the parser normalizes it.
+    """
+    idx_prefix_end = type_name.find('<')
+    if idx_prefix_end != -1:
+        type_name = type_name[:idx_prefix_end]
+    return _normalize_key(type_name)
+
+
 def _build_regex(type_name_template):
     if type_name_template.is_wildcard:
         return '(.*)'
@@ -17,3 +17,13 @@ def LLDBRemoveAllTopLevelLazyDeclarations(debugger: lldb.SBDebugger):
     if getattr(debugger, "RemoveAllTopLevelLazyDeclarations", None) is None:
         return
     debugger.RemoveAllTopLevelLazyDeclarations()
+
+
+def LLDBRemoveTopLevelLazyDeclaration(debugger: lldb.SBDebugger, name: str) -> bool:
+    """
+    :return: False if LLDB doesn't support removing of a single declaration
+    """
+    if getattr(debugger, "RemoveTopLevelLazyDeclaration", None) is None:
+        return False
+    debugger.RemoveTopLevelLazyDeclaration(name)
+    return True
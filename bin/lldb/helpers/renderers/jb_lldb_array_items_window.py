@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import struct
+from typing import Callable, List, Optional
+
+import lldb
+from renderers.jb_lldb_builtin_formatters import CharVisDescriptor, NumberVisDescriptor
+from renderers.jb_lldb_declarative_formatters_options import is_global_hex, is_global_hex_show_both
+from renderers.jb_lldb_logging import log
+from renderers.jb_lldb_memory_cache import ProcessMemoryCache
+from renderers.jb_lldb_string_utils import escape_chars
+from renderers.jb_lldb_utils import Stream
+
+# Number of array elements read from the process memory at once
+ARRAY_ITEMS_WINDOW_SIZE = 256
+
+# LLDB switches to the exponent notation when a float needs more zeros than this to be written in full
+_MAX_FLOAT_ZERO_PADDING = 6
+
+_SIGNED_INTEGER_BASIC_TYPES = {lldb.eBasicTypeShort, lldb.eBasicTypeInt, lldb.eBasicTypeLong, lldb.eBasicTypeLongLong}
+_UNSIGNED_INTEGER_BASIC_TYPES = {lldb.eBasicTypeUnsignedShort, lldb.eBasicTypeUnsignedInt, lldb.eBasicTypeUnsignedLong,
+                                 lldb.eBasicTypeUnsignedLongLong}
+_SIGNED_INTEGER_CODES = {2: 'h', 4: 'i', 8: 'q'}
+_UNSIGNED_INTEGER_CODES = {2: 'H', 4: 'I', 8: 'Q'}
+_SIGNED_CHAR_CODES = {1: 'b', 2: 'h', 4: 'i'}
+_UNSIGNED_CHAR_CODES = {1: 'B', 2: 'H', 4: 'I'}
+
+
+def _output_number(stream: Stream, text: str):
+    stream.output_number(text)
+
+
+def _output_keyword(stream: Stream, text: str):
+    stream.output_keyword(text)
+
+
+def _format_float(value: float, digits: int) -> Optional[str]:
+    # the shortest text that keeps all the digits of the type, as LLDB prints it
+    text = '{:.{}g}'.format(value, digits)
+    if 'e' in text or 'n' in text:
+        return None
+    if '.' not in text and len(text) - len(text.rstrip('0')) > _MAX_FLOAT_ZERO_PADDING:
+        return None
+    return text
+
+
+class ElementSummaryFormatter(object):
+    """
+    Formats the summaries of array elements of a builtin numeric or character type from the raw memory, the same way
+    NumberVisDescriptor and CharVisDescriptor format them from SBValue.
+    """
+
+    def __init__(self, code: str, is_integer: bool, byte_size: int, output: Callable[[Stream, str], None],
+                 to_text: Callable[[object], Optional[str]], char_descriptor: Optional[CharVisDescriptor] = None,
+                 hex_size: int = 0):
+        self.code = code
+        self.is_integer = is_integer
+        self.byte_size = byte_size
+        # the hex text is padded to the size NumberVisDescriptor assumes for the type name
+        self.hex_size = hex_size
+        self._output = output
+        self._to_text = to_text
+        # the characters are escaped for the whole window at once
+        self.char_descriptor = char_descriptor
+
+    @classmethod
+    def create(cls, elem_type: lldb.SBType) -> Optional[ElementSummaryFormatter]:
+        # typedefs and enums may have their own visualizers
+        if elem_type.GetTypeClass() != lldb.eTypeClassBuiltin:
+            return None
+
+        basic_type = elem_type.GetBasicType()
+        byte_size = elem_type.GetByteSize()
+        char_presentation_info = CharVisDescriptor.char_types.get(elem_type.GetName())
+        if char_presentation_info is not None:
+            if byte_size != char_presentation_info.char_size:
+                return None
+            is_signed = elem_type.GetTypeFlags() & lldb.eTypeIsSigned
+            code = (_SIGNED_CHAR_CODES if is_signed else _UNSIGNED_CHAR_CODES)[byte_size]
+            return cls(code, False, byte_size, _output_number, str, CharVisDescriptor(char_presentation_info))
+        if basic_type == lldb.eBasicTypeBool and byte_size == 1:
+            return cls('?', False, byte_size, _output_keyword, lambda v: 'true' if v else 'false')
+        integer_type_info = NumberVisDescriptor.integer_types.get(elem_type.GetName())
+        if integer_type_info is not None:
+            hex_size = integer_type_info[0]
+            if basic_type in _SIGNED_INTEGER_BASIC_TYPES and byte_size in _SIGNED_INTEGER_CODES:
+                return cls(_SIGNED_INTEGER_CODES[byte_size], True, byte_size, _output_number, str, hex_size=hex_size)
+            if basic_type in _UNSIGNED_INTEGER_BASIC_TYPES and byte_size in _UNSIGNED_INTEGER_CODES:
+                return cls(_UNSIGNED_INTEGER_CODES[byte_size], True, byte_size, _output_number, str, hex_size=hex_size)
+        if basic_type == lldb.eBasicTypeFloat and byte_size == 4:
+            return cls('f', False, byte_size, _output_number, lambda v: _format_float(v, 9))
+        if basic_type == lldb.eBasicTypeDouble and byte_size == 8:
+            return cls('d', False, byte_size, _output_number, lambda v: _format_float(v, 17))
+        return None
+
+    def escape_chars(self, raw: bytes, count: int, byte_order_prefix: str) -> List[str]:
+        codes = struct.unpack_from('{}{}{}'.format(byte_order_prefix, count, self.code), raw)
+        return escape_chars([CharVisDescriptor.to_ordinal(code) for code in codes], self.byte_size,
+                            self.char_descriptor.get_encoding())
+
+    def get_presenter(self, raw: bytes, offset: int, byte_order_prefix: str,
+                      escaped_char: Optional[str] = None) -> Optional[Callable[[Stream], None]]:
+        """
+        :return: function to output the summary of the element at the offset, None if it can't be formatted
+        """
+        value = struct.unpack_from(byte_order_prefix + self.code, raw, offset)[0]
+        if self.char_descriptor is not None:
+            return lambda stream: self.char_descriptor.output_char(value, stream, escaped_char)
+        if self.is_integer and is_global_hex():
+            unsigned_value = value & ((1 << (self.byte_size * 8)) - 1)
+            hex_text = '0x{:0{}x}'.format(unsigned_value, self.hex_size * 2)
+            if not is_global_hex_show_both():
+                return lambda stream: stream.output_number(hex_text)
+
+            def output_number_with_hex(stream: Stream):
+                stream.output_number(str(value))
+                stream.output(" [")
+                stream.output_number(hex_text)
+                stream.output("]")
+
+            return output_number_with_hex
+
+        text = self._to_text(value)
+        if text is None:
+            return None
+        return lambda stream: self._output(stream, text)
+
+
+class ArrayItemsWindow(object):
+    """
+    Contiguous range of array elements read from the process memory with a single read, the summaries of
+    the elements are formatted from it. The window belongs to the stop of the process it was read at.
+    """
+
+    def __init__(self, start: int, count: int, raw: bytes, elem_byte_size: int, byte_order: int, stop_id: int):
+        self.start = start
+        self.count = count
+        self.raw = raw
+        self.elem_byte_size = elem_byte_size
+        self.byte_order = byte_order
+        self.stop_id = stop_id
+        self._escaped_chars: Optional[List[str]] = None
+
+    @classmethod
+    def read(cls, value_pointer: lldb.SBValue, elem_byte_size: int, index: int,
+             size: int) -> Optional[ArrayItemsWindow]:
+        """
+        Read the window of the elements around the index.
+
+        :return: the window or None if the memory can't be read
+        """
+        process: lldb.SBProcess = value_pointer.GetProcess()
+        if not process.IsValid() or elem_byte_size <= 0:
+            return None
+        base_address = value_pointer.GetNonSyntheticValue().GetValueAsUnsigned()
+        if base_address == 0:
+            return None
+
+        start = index - index % ARRAY_ITEMS_WINDOW_SIZE
+        count = min(ARRAY_ITEMS_WINDOW_SIZE, size - start)
+        error = lldb.SBError()
+        raw = ProcessMemoryCache.read(process, base_address + start * elem_byte_size, count * elem_byte_size, error)
+        if error.Fail() or raw is None or len(raw) != count * elem_byte_size:
+            log("Can't read array elements [{}; {}): {}", start, start + count, str(error))
+            return None
+
+        target: lldb.SBTarget = value_pointer.GetTarget()
+        return cls(start, count, raw, elem_byte_size, target.GetByteOrder(), process.GetStopID(True))
+
+    def is_valid_for(self, index: int, process: lldb.SBProcess) -> bool:
+        return self.start <= index < self.start + self.count and self.stop_id == process.GetStopID(True)
+
+    def get_summary_presenter(self, index: int, formatter: ElementSummaryFormatter) -> Optional[Callable[[Stream], None]]:
+        byte_order_prefix = '>' if self.byte_order == lldb.eByteOrderBig else '<'
+        escaped_char = None
+        if formatter.char_descriptor is not None:
+            if self._escaped_chars is None:
+                self._escaped_chars = formatter.escape_chars(self.raw, self.count, byte_order_prefix)
+            escaped_char = self._escaped_chars[index - self.start]
+        return formatter.get_presenter(self.raw, (index - self.start) * self.elem_byte_size, byte_order_prefix,
+                                       escaped_char)
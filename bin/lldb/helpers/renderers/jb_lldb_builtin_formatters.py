@@ -183,23 +183,37 @@ class CharVisDescriptor(AbstractVisDescriptor):
         self.char_presentation_info = char_presentation_info
 
     def output_summary(self, value_non_synth: lldb.SBValue, stream: Stream):
-        enc = self.char_presentation_info.encoding
-        if enc == '__locale__':
-            enc = get_locale()
         err = SBError()
         code = value_non_synth.GetValueAsSigned(err)
         if err.Fail():
             stream.output('<error>')
             return
-        ordinal = code
-        if code < 0:
-            # convert signed to unsigned
-            if code >= -0x80:
-                ordinal = code & 0xff
-            elif code >= -0x8000:
-                ordinal = code & 0xffff
-            elif code >= -0x80000000:
-                ordinal = code & 0xffffffff
+        self.output_char(code, stream)
+
+    def get_encoding(self) -> str:
+        enc = self.char_presentation_info.encoding
+        if enc == '__locale__':
+            enc = get_locale()
+        return enc
+
+    @staticmethod
+    def to_ordinal(code: int) -> int:
+        # convert signed to unsigned
+        if code >= 0:
+            return code
+        if code >= -0x80:
+            return code & 0xff
+        if code >= -0x8000:
+            return code & 0xffff
+        if code >= -0x80000000:
+            return code & 0xffffffff
+        return code
+
+    def output_char(self, code: int, stream: Stream, escaped_char: Optional[str] = None):
+        """
+        :param escaped_char: the char escaped beforehand, e.g. together with the other elements of an array
+        """
+        ordinal = self.to_ordinal(code)
         if is_global_hex():
             if is_global_hex_show_both():
                 stream.output_number(str(code))
@@ -209,8 +223,9 @@ class CharVisDescriptor(AbstractVisDescriptor):
         else:
             stream.output_number(str(code))
         stream.output(" ")
+        if escaped_char is None:
+            escaped_char = escape_char(ordinal, self.char_presentation_info.char_size, self.get_encoding())
         # Unlike Visual Studio's behavior we present wchar_t as L'x' (for consistency with wide strings L"xxx")
-        escaped_char = escape_char(ordinal, self.char_presentation_info.char_size, enc)
         stream.output_string(f"{self.char_presentation_info.literal_prefix}'{escaped_char}'")
 
 
@@ -327,7 +342,7 @@ class GenericArrayVisDescriptor(AbstractVisDescriptor):
             for child_index in range(value_non_synth.GetNumChildren()):
                 if child_index != 0:
                     stream.output(", ")
-                if stream.length > get_max_string_length():
+                if stream.is_budget_exhausted():
                     stream.output("...")
                     break
 
@@ -426,7 +441,7 @@ class GenericPointerVisDescriptor(AbstractVisDescriptor):
             stream.output_object(ItemExpression.dereference(value_non_synth).GetNonSyntheticValue())
         else:
             stream.output('{')
-            if stream.length > get_max_string_length():
+            if stream.is_budget_exhausted():
                 stream.output("...")
             else:
                 stream.output_object(ItemExpression.dereference(value_non_synth).GetNonSyntheticValue())
@@ -473,25 +488,30 @@ class StructVisDescriptor(AbstractVisDescriptor):
         self.value_type = value_type
 
     def output_summary(self, value_non_synth: lldb.SBValue, stream: Stream):
+        stream.output("{")
+        if stream.level >= g_max_recursion_level or stream.is_budget_exhausted():
+            # the children aren't shown, don't retrieve them
+            stream.output('...')
+            stream.output("}")
+            return
+
         provider = self.prepare_children(value_non_synth)
-        num_children = provider.num_children()
 
         # Skip base structs in summary presentation
         base_classes_count = self.value_type.GetNumberOfDirectBaseClasses()
         # TODO: what about virtual bases?
         # TODO: there is bug with empty bases that are not presented
+        # the summary shows up to 3 fields, the 4th one tells whether they are followed by more
+        num_children, _ = provider.preview_children(base_classes_count + 4)
 
-        stream.output("{")
-        if stream.level >= g_max_recursion_level or stream.length > get_max_string_length():
-            stream.output('...')
-        elif num_children == base_classes_count:
+        if num_children == base_classes_count:
             stream.output('...')
         else:
             for child_index in range(base_classes_count, num_children):
                 if child_index != base_classes_count:
                     stream.output(", ")
 
-                if child_index > base_classes_count + 2 or stream.length > get_max_string_length():
+                if child_index > base_classes_count + 2 or stream.is_budget_exhausted():
                     stream.output("...")
                     break
 
@@ -500,7 +520,7 @@ class StructVisDescriptor(AbstractVisDescriptor):
                 child_name = child_non_synth.GetName() or ''
                 stream.output(child_name)
                 stream.output("=")
-                if stream.length > get_max_string_length():
+                if stream.is_budget_exhausted():
                     stream.output("...")
                     break
 
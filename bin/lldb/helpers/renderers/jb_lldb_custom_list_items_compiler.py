@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import re
+import struct
+from typing import List, Optional, Sequence, Set, Tuple
+
+import lldb
+from jb_declarative_formatters.type_viz_item_nodes import TypeVizItemBreakCodeBlockTypeNode, \
+    TypeVizItemElseCodeBlockTypeNode, TypeVizItemElseIfCodeBlockTypeNode, TypeVizItemExecCodeBlockTypeNode, \
+    TypeVizItemIfCodeBlockTypeNode, TypeVizItemItemCodeBlockTypeNode, TypeVizItemLoopCodeBlockTypeNode
+from jb_declarative_formatters.type_viz_item_providers import TypeVizItemProviderCustomListItems
+from renderers.jb_lldb_cache import LLDBCache
+from renderers.jb_lldb_evaluation_utils import EvalSettings, EvaluateError, resolve_type_wildcards
+from renderers.jb_lldb_logging import log
+from renderers.jb_lldb_utils import eval_expression
+
+# Minimal number of items collected by a single run of the compiled program
+COMPILED_CHUNK_SIZE = 256
+# The compiled program runs in the target, a broken container mustn't hang the debugger
+COMPILED_PROGRAM_TIMEOUT_US = 1000000
+
+_RESULT_HEADER_SIZE = 2
+
+
+class _NotCompilable(Exception):
+    pass
+
+
+class CompiledCustomListItems(object):
+    """
+    CustomListItems program compiled into a single expression. A run of the expression executes the whole
+    program in the target and returns the packed array of (item node index, item address) pairs of
+    the next chunk of items.
+    Every run starts the program from the beginning, so a chunk is at least as long as the items before it
+    and the runs collecting a long list take linear time in total.
+    """
+
+    def __init__(self, code_template: str, item_nodes: List[TypeVizItemItemCodeBlockTypeNode],
+                 item_types: List[lldb.SBType]):
+        self.code_template = code_template
+        self.item_nodes = item_nodes
+        self.item_types = item_types
+
+    def run(self, ctx_val: lldb.SBValue, first: int) -> Optional[Tuple[List[Tuple[int, int]], bool]]:
+        """
+        :return: (item node index, item address) pairs of the items starting from `first`, whether the program
+                 is finished; or None if the program failed
+        """
+        chunk_size = max(COMPILED_CHUNK_SIZE, first)
+        code = self.code_template.replace('__JB_FIRST__', str(first)).replace('__JB_CHUNK__', str(chunk_size))
+        try:
+            result = eval_expression(ctx_val, code, EvalSettings(options=_prepare_compiled_program_options()))
+        except EvaluateError as e:
+            log("Compiled CustomListItems program failed: {}", e)
+            return None
+        result_non_synth: lldb.SBValue = result.GetNonSyntheticValue()
+        if result_non_synth.GetError().Fail():
+            log("Compiled CustomListItems program failed: {}", str(result_non_synth.GetError()))
+            return None
+
+        data: lldb.SBData = result_non_synth.GetData()
+        err = lldb.SBError()
+        raw = data.ReadRawData(err, 0, data.GetByteSize())
+        if err.Fail() or raw is None:
+            log("Can't read the result of compiled CustomListItems program: {}", str(err))
+            return None
+
+        byte_order = '<' if data.GetByteOrder() == lldb.eByteOrderLittle else '>'
+        packed = struct.unpack(f'{byte_order}{len(raw) // 8}Q', raw)
+        count, finished = packed[0], packed[1] != 0
+        items = [(packed[i], packed[i + 1])
+                 for i in range(_RESULT_HEADER_SIZE, _RESULT_HEADER_SIZE + 2 * count, 2)]
+        return items, finished
+
+    def create_item(self, ctx_val: lldb.SBValue, name: str, item_node_index: int, address: int) -> lldb.SBValue:
+        item = ctx_val.CreateValueFromAddress(name, address, self.item_types[item_node_index])
+        item.SetPreferDynamicValue(lldb.eDynamicDontRunTarget)
+        item.SetPreferSyntheticValue(True)
+        return item
+
+
+class CustomListItemsCompiler:
+    """
+    CustomListItemsCompiler translates the `<CustomListItems>` program into a C++ statement sequence evaluated
+    as a single expression, instead of evaluating every instruction and loop iteration separately.
+    Programs with named items, items with array size or items stored in the program variables are not compiled.
+    The compiled forms are cached per module and cleared when modules are loaded or unloaded,
+    and when new symbols are loaded.
+    """
+    _lldb_cache = LLDBCache("lldb.CustomListItemsCompiler",
+                            lldb.SBTarget.eBroadcastBitModulesLoaded |
+                            lldb.SBTarget.eBroadcastBitModulesUnloaded |
+                            lldb.SBTarget.eBroadcastBitSymbolsLoaded)
+
+    @classmethod
+    def get_compiled(cls, items_provider: TypeVizItemProviderCustomListItems, ctx_val: lldb.SBValue,
+                     wildcards: Sequence[str]) -> Optional[CompiledCustomListItems]:
+        current_module_path = ctx_val.GetFrame().GetModule().GetPlatformFileSpec().fullpath or ''
+        current_process = ctx_val.GetProcess()
+        cache_key = (current_module_path, ctx_val.GetTypeName(), items_provider, tuple(wildcards))
+        compiled = cls._lldb_cache.get_for_process(current_process, cache_key)
+        if compiled is None:
+            try:
+                compiled = cls._compile(items_provider, ctx_val, wildcards)
+            except _NotCompilable as e:
+                log("CustomListItems program of '{}' is interpreted: {}", ctx_val.GetTypeName(), e)
+                compiled = False
+            cls._lldb_cache.set_for_process(current_process, cache_key, compiled)
+
+        return compiled or None
+
+    @classmethod
+    def _compile(cls, items_provider: TypeVizItemProviderCustomListItems, ctx_val: lldb.SBValue,
+                 wildcards: Sequence[str]) -> CompiledCustomListItems:
+        declarations = ''.join(
+            'auto {} = {};'.format(node.name, resolve_type_wildcards(node.initial_value, wildcards))
+            for node in items_provider.variables_nodes)
+
+        item_nodes: List[TypeVizItemItemCodeBlockTypeNode] = []
+        variable_names = {node.name for node in items_provider.variables_nodes}
+        program = _ProgramWriter(wildcards, item_nodes, variable_names).write_block(items_provider.code_block_nodes)
+        if not item_nodes:
+            raise _NotCompilable('no items')
+
+        item_types = []
+        for node in item_nodes:
+            expression = resolve_type_wildcards(node.expr.text, wildcards)
+            item_types.append(_get_item_type(ctx_val, declarations, expression))
+
+        code_template = (
+            f"{declarations}"
+            f"unsigned long long __jb_result[{_RESULT_HEADER_SIZE} + 2 * __JB_CHUNK__] = {{0}};"
+            f"const unsigned long long __jb_first = __JB_FIRST__;"
+            f"unsigned long long __jb_index = 0;"
+            f"{{{program}}}"
+            f"__jb_result[1] = 1;"
+            f"__jb_done: ;"
+            f"__jb_result;"
+        )
+        return CompiledCustomListItems(code_template, item_nodes, item_types)
+
+
+class _ProgramWriter(object):
+    def __init__(self, wildcards: Sequence[str], item_nodes: List[TypeVizItemItemCodeBlockTypeNode],
+                 variable_names: Set[str]):
+        self._wildcards = wildcards
+        self._item_nodes = item_nodes
+        self._variable_names = variable_names
+
+    def _resolve(self, code: str) -> str:
+        return resolve_type_wildcards(code, self._wildcards)
+
+    def _guarded(self, condition: Optional[str], statement: str) -> str:
+        if condition:
+            return f"if ((bool)({self._resolve(condition)})) {{{statement}}}"
+        return f"{{{statement}}}"
+
+    def write_block(self, block_nodes: List) -> str:
+        code = []
+        for node in block_nodes:
+            if isinstance(node, TypeVizItemExecCodeBlockTypeNode):
+                code.append(self._guarded(node.condition, f"{self._resolve(node.value)};"))
+            elif isinstance(node, TypeVizItemItemCodeBlockTypeNode):
+                code.append(self._guarded(node.condition, self._write_item(node)))
+            elif isinstance(node, TypeVizItemIfCodeBlockTypeNode):
+                code.append(f"if ((bool)({self._resolve(node.condition)})) {{{self.write_block(node.code_blocks)}}}")
+            elif isinstance(node, TypeVizItemElseIfCodeBlockTypeNode):
+                condition = self._resolve(node.condition) if node.condition else 'true'
+                code.append(f"else if ((bool)({condition})) {{{self.write_block(node.code_blocks)}}}")
+            elif isinstance(node, TypeVizItemElseCodeBlockTypeNode):
+                code.append(f"else {{{self.write_block(node.code_blocks)}}}")
+            elif isinstance(node, TypeVizItemLoopCodeBlockTypeNode):
+                condition = self._resolve(node.condition) if node.condition else 'true'
+                code.append(f"while ((bool)({condition})) {{{self.write_block(node.code_blocks)}}}")
+            elif isinstance(node, TypeVizItemBreakCodeBlockTypeNode):
+                code.append(f"if ((bool)({self._resolve(node.condition)})) break;" if node.condition else "break;")
+            else:
+                raise _NotCompilable(f'unsupported node {type(node).__name__}')
+        return ''.join(code)
+
+    def _write_item(self, node: TypeVizItemItemCodeBlockTypeNode) -> str:
+        if node.name:
+            raise _NotCompilable('named item')
+        if node.expr.view_options.array_size:
+            raise _NotCompilable('item with array size')
+
+        expression = self._resolve(node.expr.text)
+        variable_name = _find_variable_storage(expression, self._variable_names)
+        if variable_name is not None:
+            # the variables are the locals of the expression, their addresses are gone after the run
+            raise _NotCompilable(f'item \'{expression}\' is stored in variable \'{variable_name}\'')
+
+        item_node_index = len(self._item_nodes)
+        self._item_nodes.append(node)
+        return (
+            f"if (__jb_index >= __jb_first) {{"
+            f"unsigned long long __jb_slot = {_RESULT_HEADER_SIZE} + 2 * (__jb_index - __jb_first);"
+            f"__jb_result[__jb_slot] = {item_node_index};"
+            f"__jb_result[__jb_slot + 1] = (unsigned long long)__builtin_addressof({expression});"
+            f"if (++__jb_result[0] == __JB_CHUNK__) goto __jb_done;"
+            f"}}"
+            f"++__jb_index;"
+        )
+
+
+_TOKEN_PATTERN = re.compile(r'[A-Za-z_]\w*|\d\w*|->|::|\S')
+
+
+def _is_operand_end(token: Optional[str]) -> bool:
+    return token is not None and (token[0].isalnum() or token[0] == '_' or token in (')', ']'))
+
+
+def _find_variable_storage(expression: str, variable_names: Set[str]) -> Optional[str]:
+    """
+    :return: the name of the variable if the item may be stored in it, i.e. the variable is used outside
+             the subscripts and the call arguments and isn't dereferenced by `*` or `->`; None otherwise
+    """
+    tokens = _TOKEN_PATTERN.findall(expression)
+    if tokens and tokens[0] == '*':
+        # the item is the pointee of a pointer value
+        return None
+    # the brackets are either the subscripts and the calls, or the grouping parentheses
+    brackets: List[bool] = []
+    for index, token in enumerate(tokens):
+        prev_token = tokens[index - 1] if index > 0 else None
+        if token in ('(', '['):
+            brackets.append(token == '[' or _is_operand_end(prev_token))
+            continue
+        if token in (')', ']'):
+            if brackets:
+                brackets.pop()
+            continue
+        if token not in variable_names or any(brackets) or prev_token in ('.', '->', '::'):
+            continue
+
+        next_token = tokens[index + 1] if index + 1 < len(tokens) else None
+        if next_token == '->':
+            continue
+        if prev_token == '*' and not _is_operand_end(tokens[index - 2] if index > 1 else None):
+            continue
+        return token
+    return None
+
+
+def _get_item_type(ctx_val: lldb.SBValue, declarations: str, expression: str) -> lldb.SBType:
+    code = f"{declarations}(decltype(__builtin_addressof({expression})))nullptr"
+    try:
+        result = eval_expression(ctx_val, code)
+    except EvaluateError as e:
+        raise _NotCompilable(f'type of item \'{expression}\' is unknown: {e}')
+    result_non_synth: lldb.SBValue = result.GetNonSyntheticValue()
+    if result_non_synth.GetError().Fail():
+        raise _NotCompilable(f'type of item \'{expression}\' is unknown: {result_non_synth.GetError()}')
+    return result_non_synth.GetType().GetPointeeType()
+
+
+def _prepare_compiled_program_options() -> lldb.SBExpressionOptions:
+    options = lldb.SBExpressionOptions()
+    options.SetSuppressPersistentResult(True)
+    options.SetFetchDynamicValue(lldb.eNoDynamicValues)
+    options.SetTimeoutInMicroSeconds(COMPILED_PROGRAM_TIMEOUT_US)
+    options.SetTryAllThreads(False)
+    return options
@@ -2,21 +2,32 @@ import distutils.util
 import importlib
 import inspect
 import shlex
-from typing import Iterable
+from typing import Iterable, List
 
+from jb_declarative_formatters import TypeVizName
 from jb_declarative_formatters.parsers.cpp_parser import CppParser
 from jb_declarative_formatters.parsers.type_name_parser import parse_type_name_template
+from jb_declarative_formatters.type_name_template import TypeNameTemplate
+from jb_declarative_formatters.type_viz_storage import build_type_name_key
 from jb_declarative_formatters.type_viz_synthetic_method import SyntheticMethodDefinition
 from jb_lldb_polyfills import \
     LLDBRemoveAllTopLevelLazyDeclarations, \
+    LLDBRemoveTopLevelLazyDeclaration, \
     LLDBAddTopLevelLazyDeclarationByRegex, \
     LLDBAddTopLevelLazyDeclaration
 from renderers.jb_lldb_builtin_formatters import *
 from renderers.jb_lldb_declarative_formatters_loaders import *
 from renderers.jb_lldb_declarative_formatters_manager import *
+from renderers.jb_lldb_eval_result_cache import EvalResultCache
+from renderers.jb_lldb_fast_eval import FastEvalStatistics
 from renderers.jb_lldb_format import update_value_dynamic_state
 from renderers.jb_lldb_logging import get_suppress_errors
+from renderers.jb_lldb_memory_cache import ProcessMemoryCache
+from renderers.jb_lldb_natvis_cache import list_cache_entries, purge_cache
 from renderers.jb_lldb_natvis_formatters import NatVisDescriptor
+from renderers.jb_lldb_parse_error_cache import ParseErrorCache
+from renderers.jb_lldb_parallel_loading import load_files
+from renderers.jb_lldb_viz_descriptor_cache import VizDescriptorCache
 
 lldb_formatters_manager: FormattersManager
 
@@ -36,6 +47,18 @@ def __lldb_init_module(debugger: lldb.SBDebugger, internal_dict):
         make_absolute_name(__name__, '_cmd_reload_all'): 'jb_renderers_reload_all',
         make_absolute_name(__name__, '_cmd_remove_all'): 'jb_renderers_remove_all',
         make_absolute_name(__name__, '_cmd_list_all'):   'jb_renderers_list_all',
+        make_absolute_name(__name__, '_cmd_natvis_cache'): 'jb_renderers_natvis_cache',
+        make_absolute_name(__name__, '_cmd_set_load_jobs'): 'jb_renderers_set_load_jobs',
+        make_absolute_name(__name__, '_cmd_set_lazy_loading'): 'jb_renderers_set_lazy_loading',
+        make_absolute_name(__name__, '_cmd_fast_eval'): 'jb_renderers_fast_eval',
+        make_absolute_name(__name__, '_cmd_eval_cache'): 'jb_renderers_eval_cache',
+        make_absolute_name(__name__, '_cmd_viz_cache'): 'jb_renderers_viz_cache',
+        make_absolute_name(__name__, '_cmd_memory_cache'): 'jb_renderers_memory_cache',
+        make_absolute_name(__name__, '_cmd_set_custom_list_items_compilation'):
+            'jb_renderers_set_custom_list_items_compilation',
+        make_absolute_name(__name__, '_cmd_set_array_items_bulk_read'): 'jb_renderers_set_array_items_bulk_read',
+        make_absolute_name(__name__, '_cmd_set_index_list_items_patterns'): 'jb_renderers_set_index_list_items_patterns',
+        make_absolute_name(__name__, '_cmd_set_max_children'): 'jb_renderers_set_max_children',
 
         make_absolute_name(__name__, '_cmd_override_charset'): 'jb_renderers_override_charset',
         make_absolute_name(__name__, '_cmd_set_markup'): 'jb_renderers_set_markup',
@@ -48,12 +71,14 @@ def __lldb_init_module(debugger: lldb.SBDebugger, internal_dict):
     debugger.HandleCommand(f'type summary add -v -x ".*" -F {summary_func_name} -e --category jb_formatters')
     debugger.HandleCommand(f'type synthetic add -x ".*" -l {synth_class_name} --category jb_formatters')
 
-    global lldb_formatters_manager
-    lldb_formatters_manager = FormattersManager(summary_func_name, synth_class_name)
-
     viz_provider = VizDescriptorProvider()
     set_viz_descriptor_provider(viz_provider)
 
+    global lldb_formatters_manager
+    lldb_formatters_manager = FormattersManager(debugger, summary_func_name, synth_class_name)
+    lldb_formatters_manager.on_type_viz_names_changed = viz_provider.evict_type_viz_names
+    lldb_formatters_manager.on_all_type_viz_names_changed = viz_provider.clear_type_viz_names
+
 
 def _cmd_loaders_add(debugger, command, exe_ctx, result, internal_dict):
     # raise NotImplementedError("jb_renderers_loaders_add is not implemented yet")
@@ -125,13 +150,14 @@ def _cmd_load(debugger, command, exe_ctx, result, internal_dict):
         return
 
     file_paths = cmd[1:]
-    for filepath in file_paths:
-        try:
-            entry = lldb_formatters_manager.register(filepath, loader)
-            add_all_top_level_declarations(debugger, [entry])
-        except TypeVizLoaderException as e:
-            result.SetError('{}'.format(str(e)))
+    # Storages are merged in the order of the files regardless of the order the workers finish in
+    for load_result in load_files(file_paths, loader, get_natvis_load_jobs()):
+        if load_result.error is not None:
+            result.SetError('{}'.format(str(load_result.error)))
             return
+        log("Loaded '{}' in {:.1f} ms", load_result.filepath, load_result.elapsed * 1000)
+        entry = lldb_formatters_manager.register_loaded(load_result.filepath, loader, load_result.storage)
+        add_all_top_level_declarations(debugger, [entry])
 
 
 def _cmd_remove(debugger, command, exe_ctx, result, internal_dict):
@@ -166,6 +192,317 @@ def _cmd_list_all(debugger, command, exe_ctx, result, internal_dict):
     result.AppendMessage("\n".join(get_all_registered_files()))
 
 
+def _cmd_natvis_cache(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_natvis_cache info\n' \
+                   '       jb_renderers_natvis_cache purge [<natvis_file_path>...]\n' \
+                   '       jb_renderers_natvis_cache enable <value>\n' \
+                   '       jb_renderers_natvis_cache dir <cache_dir_path>'
+    cmd = shlex.split(command)
+    if len(cmd) < 1:
+        result.SetError('Subcommand expected.\n{}'.format(help_message))
+        return
+
+    subcommand, args = cmd[0], cmd[1:]
+    if subcommand == 'info':
+        result.AppendMessage('Natvis cache is {} in \'{}\''.format(
+            'enabled' if is_enabled_natvis_cache() else 'disabled', get_natvis_cache_dir()))
+        for cache_file_path, entry, is_up_to_date in list_cache_entries():
+            if entry is None:
+                result.AppendMessage('{}: unreadable'.format(cache_file_path))
+                continue
+            result.AppendMessage('{}: {} (size={}, sha256={}, parser version={}, {})'.format(
+                cache_file_path, entry.path, entry.size, entry.content_hash, entry.parser_version,
+                'up-to-date' if is_up_to_date else 'outdated'))
+
+    elif subcommand == 'purge':
+        removed = purge_cache(args or None)
+        result.AppendMessage('Removed {} natvis cache entries'.format(removed))
+
+    elif subcommand == 'enable':
+        try:
+            enable = bool(distutils.util.strtobool(args[0])) if len(args) == 1 else None
+        except ValueError:
+            enable = None
+        if enable is None:
+            result.SetError('Boolean value is expected.\n{}'.format(help_message))
+            return
+        enable_disable_natvis_cache(enable)
+
+    elif subcommand == 'dir':
+        if len(args) != 1:
+            result.SetError('Cache directory path is expected.\n{}'.format(help_message))
+            return
+        set_natvis_cache_dir(args[0])
+
+    else:
+        result.SetError('Unknown subcommand {}.\n{}'.format(subcommand, help_message))
+
+
+def _cmd_set_load_jobs(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_set_load_jobs <jobs>\n' \
+                   '       1 loads natvis files serially, 0 uses a worker process per CPU'
+    cmd = shlex.split(command)
+    if len(cmd) != 1:
+        result.SetError('Number of jobs is expected.\n{}'.format(help_message))
+        return
+
+    try:
+        jobs = int(cmd[0])
+    except ValueError:
+        jobs = -1
+    if jobs < 0:
+        result.SetError('Non-negative integer value is expected.\n{}'.format(help_message))
+        return
+
+    set_natvis_load_jobs(jobs)
+
+
+def _cmd_set_max_children(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_set_max_children <limit> [<type name>]\n' \
+                   '       jb_renderers_set_max_children default <type name>\n' \
+                   '       Limits the number of children of natvis containers without Size, of all or of the given type'
+    cmd = shlex.split(command)
+    if len(cmd) == 0:
+        result.AppendMessage('Max number of children: {}'.format(get_max_num_children()))
+        for type_name, type_limit in sorted(g_max_num_children_by_type.items()):
+            result.AppendMessage('    {}: {}'.format(type_name, type_limit))
+        return
+    if len(cmd) > 2:
+        result.SetError('Limit and optional type name are expected.\n{}'.format(help_message))
+        return
+
+    type_name = cmd[1] if len(cmd) == 2 else None
+    if cmd[0] == 'default':
+        if type_name is None:
+            result.SetError('Type name is expected.\n{}'.format(help_message))
+            return
+        reset_max_num_children(type_name)
+        return
+
+    try:
+        limit = int(cmd[0])
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        result.SetError('Positive integer value is expected.\n{}'.format(help_message))
+        return
+
+    set_max_num_children(limit, type_name)
+
+
+def _cmd_set_lazy_loading(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_set_lazy_loading <value>'
+    cmd = shlex.split(command)
+    if len(cmd) != 1:
+        result.SetError('Boolean value is expected.\n{}'.format(help_message))
+        return
+
+    try:
+        enable = bool(distutils.util.strtobool(cmd[0]))
+    except Exception as e:
+        result.SetError('Boolean value is expected.\n{}'.format(help_message))
+        return
+
+    enable_disable_natvis_lazy_loading(enable)
+
+
+def _cmd_set_custom_list_items_compilation(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_set_custom_list_items_compilation <value>'
+    cmd = shlex.split(command)
+    if len(cmd) != 1:
+        result.SetError('Boolean value is expected.\n{}'.format(help_message))
+        return
+
+    try:
+        enable = bool(distutils.util.strtobool(cmd[0]))
+    except Exception as e:
+        result.SetError('Boolean value is expected.\n{}'.format(help_message))
+        return
+
+    enable_disable_custom_list_items_compilation(enable)
+
+
+def _cmd_set_array_items_bulk_read(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_set_array_items_bulk_read <value>'
+    cmd = shlex.split(command)
+    if len(cmd) != 1:
+        result.SetError('Boolean value is expected.\n{}'.format(help_message))
+        return
+
+    try:
+        enable = bool(distutils.util.strtobool(cmd[0]))
+    except Exception as e:
+        result.SetError('Boolean value is expected.\n{}'.format(help_message))
+        return
+
+    enable_disable_array_items_bulk_read(enable)
+
+
+def _cmd_set_index_list_items_patterns(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_set_index_list_items_patterns <value>'
+    cmd = shlex.split(command)
+    if len(cmd) != 1:
+        result.SetError('Boolean value is expected.\n{}'.format(help_message))
+        return
+
+    try:
+        enable = bool(distutils.util.strtobool(cmd[0]))
+    except Exception as e:
+        result.SetError('Boolean value is expected.\n{}'.format(help_message))
+        return
+
+    enable_disable_index_list_items_patterns(enable)
+
+
+def _cmd_fast_eval(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_fast_eval stats\n' \
+                   '       jb_renderers_fast_eval reset\n' \
+                   '       jb_renderers_fast_eval enable <value>'
+    cmd = shlex.split(command)
+    if len(cmd) < 1:
+        result.SetError('Subcommand expected.\n{}'.format(help_message))
+        return
+
+    subcommand, args = cmd[0], cmd[1:]
+    if subcommand == 'stats':
+        result.AppendMessage('Fast evaluation is {}'.format('enabled' if is_enabled_fast_eval() else 'disabled'))
+        result.AppendMessage(FastEvalStatistics.format())
+
+    elif subcommand == 'reset':
+        FastEvalStatistics.reset()
+
+    elif subcommand == 'enable':
+        try:
+            enable = bool(distutils.util.strtobool(args[0])) if len(args) == 1 else None
+        except ValueError:
+            enable = None
+        if enable is None:
+            result.SetError('Boolean value is expected.\n{}'.format(help_message))
+            return
+        enable_disable_fast_eval(enable)
+
+    else:
+        result.SetError('Unknown subcommand {}.\n{}'.format(subcommand, help_message))
+
+
+def _cmd_eval_cache(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_eval_cache stats\n' \
+                   '       jb_renderers_eval_cache reset\n' \
+                   '       jb_renderers_eval_cache invalidate\n' \
+                   '       jb_renderers_eval_cache enable <value>'
+    cmd = shlex.split(command)
+    if len(cmd) < 1:
+        result.SetError('Subcommand expected.\n{}'.format(help_message))
+        return
+
+    subcommand, args = cmd[0], cmd[1:]
+    if subcommand == 'stats':
+        result.AppendMessage('Evaluation result cache is {}'.format(
+            'enabled' if is_enabled_eval_result_cache() else 'disabled'))
+        result.AppendMessage(EvalResultCache.format_statistics())
+        result.AppendMessage('Evaluations skipped on known parse errors: {}'.format(ParseErrorCache.hits))
+
+    elif subcommand == 'reset':
+        EvalResultCache.reset_statistics()
+        ParseErrorCache.hits = 0
+
+    elif subcommand == 'invalidate':
+        EvalResultCache.invalidate()
+        ProcessMemoryCache.invalidate()
+
+    elif subcommand == 'enable':
+        try:
+            enable = bool(distutils.util.strtobool(args[0])) if len(args) == 1 else None
+        except ValueError:
+            enable = None
+        if enable is None:
+            result.SetError('Boolean value is expected.\n{}'.format(help_message))
+            return
+        enable_disable_eval_result_cache(enable)
+        if not enable:
+            EvalResultCache.invalidate()
+
+    else:
+        result.SetError('Unknown subcommand {}.\n{}'.format(subcommand, help_message))
+
+
+def _cmd_memory_cache(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_memory_cache stats\n' \
+                   '       jb_renderers_memory_cache reset\n' \
+                   '       jb_renderers_memory_cache invalidate\n' \
+                   '       jb_renderers_memory_cache budget <bytes>\n' \
+                   '       0 bytes disables the cache'
+    cmd = shlex.split(command)
+    if len(cmd) < 1:
+        result.SetError('Subcommand expected.\n{}'.format(help_message))
+        return
+
+    subcommand, args = cmd[0], cmd[1:]
+    if subcommand == 'stats':
+        result.AppendMessage('Memory page cache budget is {} bytes'.format(get_memory_cache_budget()))
+        result.AppendMessage(ProcessMemoryCache.format_statistics())
+
+    elif subcommand == 'reset':
+        ProcessMemoryCache.reset_statistics()
+
+    elif subcommand == 'invalidate':
+        ProcessMemoryCache.invalidate()
+
+    elif subcommand == 'budget':
+        try:
+            budget = int(args[0]) if len(args) == 1 else -1
+        except ValueError:
+            budget = -1
+        if budget < 0:
+            result.SetError('Non-negative integer value is expected.\n{}'.format(help_message))
+            return
+        set_memory_cache_budget(budget)
+        ProcessMemoryCache.trim(budget)
+
+    else:
+        result.SetError('Unknown subcommand {}.\n{}'.format(subcommand, help_message))
+
+
+def _cmd_viz_cache(debugger, command, exe_ctx, result, internal_dict):
+    help_message = 'Usage: jb_renderers_viz_cache stats\n' \
+                   '       jb_renderers_viz_cache reset\n' \
+                   '       jb_renderers_viz_cache invalidate\n' \
+                   '       jb_renderers_viz_cache size <max_descriptors>'
+    cmd = shlex.split(command)
+    if len(cmd) < 1:
+        result.SetError('Subcommand expected.\n{}'.format(help_message))
+        return
+
+    viz_cache: VizDescriptorCache = get_viz_descriptor_provider().type_to_visualizer_cache
+    subcommand, args = cmd[0], cmd[1:]
+    if subcommand == 'stats':
+        result.AppendMessage(viz_cache.format_statistics('Visualizer descriptor cache'))
+        result.AppendMessage(_types_without_inherited_natvis.format_statistics('Types without inherited natvis'))
+
+    elif subcommand == 'reset':
+        viz_cache.reset_statistics()
+        _types_without_inherited_natvis.reset_statistics()
+
+    elif subcommand == 'invalidate':
+        viz_cache.clear()
+        _types_without_inherited_natvis.clear()
+
+    elif subcommand == 'size':
+        try:
+            size = int(args[0]) if len(args) == 1 else 0
+        except ValueError:
+            size = 0
+        if size <= 0:
+            result.SetError('Positive integer value is expected.\n{}'.format(help_message))
+            return
+        set_viz_descriptor_cache_size(size)
+        viz_cache.trim(size)
+        _types_without_inherited_natvis.trim(size)
+
+    else:
+        result.SetError('Unknown subcommand {}.\n{}'.format(subcommand, help_message))
+
+
 def _cmd_override_charset(debugger, command, exe_ctx, result, internal_dict):
     help_message = 'Usage: jb_renderers_override_charset <charset>'
     cmd = shlex.split(command)
@@ -232,36 +569,96 @@ def remove_file_list(debugger, files):
 
 
 def reload_file_list(debugger, files):
+    old_definitions: List[SyntheticMethodDefinition] = []
+    new_definitions: List[SyntheticMethodDefinition] = []
     for filepath in files:
-        lldb_formatters_manager.reload(filepath)
-    LLDBRemoveAllTopLevelLazyDeclarations(debugger)
-    add_all_top_level_declarations(debugger, lldb_formatters_manager.formatter_entries.values())
+        reloaded = lldb_formatters_manager.reload(filepath)
+        if reloaded is None:
+            continue
+        old_storage, new_storage = reloaded
+        old_definitions.extend(old_storage.get_top_level_methods())
+        new_definitions.extend(new_storage.get_top_level_methods())
+
+    update_top_level_declarations(debugger, old_definitions, new_definitions)
+    for entry in lldb_formatters_manager.formatter_entries.values():
+        entry.registered_top_level_methods_count = len(entry.storage.get_top_level_methods())
+
+
+def _top_level_declaration_key(definition: SyntheticMethodDefinition):
+    return definition.full_name, definition.body_substitution, definition.name_uses_regex
+
+
+def update_top_level_declarations(debugger: lldb.SBDebugger,
+                                  old_definitions: List[SyntheticMethodDefinition],
+                                  new_definitions: List[SyntheticMethodDefinition]):
+    """
+    Re-register only declarations which differ between the old and the new definitions of the reloaded files.
+    Falls back to re-registration of all the declarations if LLDB can't remove a single declaration.
+    """
+    old_keys = {_top_level_declaration_key(definition) for definition in old_definitions}
+    new_keys = {_top_level_declaration_key(definition) for definition in new_definitions}
+    if old_keys == new_keys:
+        return
+
+    all_definitions = [definition for entry in lldb_formatters_manager.formatter_entries.values()
+                       for definition in entry.storage.get_top_level_methods()]
+    all_keys = {_top_level_declaration_key(definition) for definition in all_definitions}
+    # The same declaration can be provided by several files, such declarations have to be kept
+    names_to_remove = {key[0] for key in old_keys - all_keys}
+    for name in names_to_remove:
+        if not LLDBRemoveTopLevelLazyDeclaration(debugger, name):
+            log("Removing of a single lazy declaration is not supported, re-registering all declarations")
+            LLDBRemoveAllTopLevelLazyDeclarations(debugger)
+            add_all_top_level_declarations(debugger, lldb_formatters_manager.formatter_entries.values())
+            return
+
+    # Declarations which share a name with the removed ones have to be re-added as well
+    add_top_level_declarations(debugger, [definition for definition in all_definitions
+                                          if _top_level_declaration_key(definition) not in old_keys or
+                                          definition.full_name in names_to_remove])
 
 
 def add_all_top_level_declarations(debugger: lldb.SBDebugger, entries: Iterable[FormattersManager.FormatterEntry]):
     for entry in entries:
-        top_level_methods: List[SyntheticMethodDefinition] = entry.storage.get_top_level_methods()
-        for top_level_method_definition in top_level_methods:
-            if top_level_method_definition.name_uses_regex:
-                error: lldb.SBError = LLDBAddTopLevelLazyDeclarationByRegex(
-                    debugger,
-                    top_level_method_definition.full_name,
-                    top_level_method_definition.body_substitution,
-                    eLanguageTypeC_plus_plus_14
-                )
-                if not error.Success():
-                    log(f"Can't add lazy declarations by regex for '{top_level_method_definition.full_name}': "
-                        f"{error.description}")
-            else:
-                error: lldb.SBError = LLDBAddTopLevelLazyDeclaration(
-                    debugger,
-                    top_level_method_definition.full_name,
-                    top_level_method_definition.body_substitution,
-                    eLanguageTypeC_plus_plus_14
-                )
-                if not error.Success():
-                    log(f"Can't add lazy declarations for '{top_level_method_definition.full_name}': "
-                        f"{error.description}")
+        top_level_methods = entry.storage.get_top_level_methods()
+        add_top_level_declarations(debugger, top_level_methods)
+        entry.registered_top_level_methods_count = len(top_level_methods)
+
+
+def add_pending_top_level_declarations(debugger: lldb.SBDebugger,
+                                       entries: Iterable[FormattersManager.FormatterEntry]):
+    """
+    Register top-level methods appended to the storages after their registration (by materialized lazy visualizers).
+    """
+    for entry in entries:
+        top_level_methods = entry.storage.get_top_level_methods()
+        if len(top_level_methods) > entry.registered_top_level_methods_count:
+            add_top_level_declarations(debugger, top_level_methods[entry.registered_top_level_methods_count:])
+            entry.registered_top_level_methods_count = len(top_level_methods)
+
+
+def add_top_level_declarations(debugger: lldb.SBDebugger, top_level_methods: Iterable[SyntheticMethodDefinition]):
+    for top_level_method_definition in top_level_methods:
+        if top_level_method_definition.name_uses_regex:
+            error: lldb.SBError = LLDBAddTopLevelLazyDeclarationByRegex(
+                debugger,
+                top_level_method_definition.full_name,
+                top_level_method_definition.body_substitution,
+                eLanguageTypeC_plus_plus_14
+            )
+            if not error.Success():
+                log(f"Can't add lazy declarations by regex for '{top_level_method_definition.full_name}': "
+                    f"{error.description}")
+        else:
+            error: lldb.SBError = LLDBAddTopLevelLazyDeclaration(
+                debugger,
+                top_level_method_definition.full_name,
+                top_level_method_definition.body_substitution,
+                eLanguageTypeC_plus_plus_14
+            )
+            if not error.Success():
+                log(f"Can't add lazy declarations for '{top_level_method_definition.full_name}': "
+                    f"{error.description}")
 
 
 def declarative_summary(val: lldb.SBValue, _):
@@ -271,6 +668,7 @@ def declarative_summary(val: lldb.SBValue, _):
         target = val_non_synth.GetTarget()
         is64bit: bool = target.GetAddressByteSize() == 8
         set_max_string_length(get_max_string_summary_length(target.GetDebugger()))
+        get_viz_descriptor_provider().watch_process(val_non_synth.GetProcess())
         stream_type = is_enabled_formatting() and FormattedStream or Stream
         stream: Stream = stream_type(is64bit, get_recursion_level())
         stream.output_object(val_non_synth)
@@ -310,6 +708,8 @@ class DeclarativeSynthProvider(object):
             self._create_children_provider()
         else:
             self.children_provider.try_update_size(self.val_non_synth)
+        # the containers without size are walked further only when more children are asked for
+        self.children_provider.request_children(max_children)
         return self.children_provider.num_children()
 
     def get_child_index(self, name: str) -> int:
@@ -379,6 +779,7 @@ class DeclarativeSynthProvider(object):
 
             format_spec = self.val_non_synth.GetFormat()
             provider = get_viz_descriptor_provider()
+            provider.watch_process(self.val_non_synth.GetProcess())
             vis_descriptor = provider.get_matched_visualizers(self.val_non_synth.GetType(), format_spec)
             if vis_descriptor:
                 self.children_provider = vis_descriptor.prepare_children(self.val_non_synth)
@@ -394,23 +795,88 @@ class DeclarativeSynthProvider(object):
             self.children_provider = StructChildrenProvider(self.val_non_synth)
 
 
+_NOT_CACHED = object()
+
+# Module paths and names of the types that have no inheritable natvis visualizers for themselves or any of their bases
+_types_without_inherited_natvis = VizDescriptorCache("lldb.TypesWithoutInheritedNatvisCache")
+
+
 class VizDescriptorProvider(AbstractVizDescriptorProvider):
     def __init__(self):
-        self.type_to_visualizer_cache = {}
+        self.type_to_visualizer_cache = VizDescriptorCache("lldb.VizDescriptorCache")
+
+    def watch_process(self, process: lldb.SBProcess):
+        self.type_to_visualizer_cache.watch_process(process)
+        _types_without_inherited_natvis.watch_process(process)
 
     def get_matched_visualizers(self, value_type: lldb.SBType, format_spec: int) -> AbstractVisDescriptor:
         basic_specs = format_spec & eFormatBasicSpecsMask
         natvis_enabled = not (format_spec & eFormatRawView)
         cache_key = (value_type.GetName(), basic_specs, natvis_enabled)
-        descriptor = self.type_to_visualizer_cache.get(cache_key, None)
-        if descriptor is not None:
+        descriptor = self.type_to_visualizer_cache.get(cache_key, _NOT_CACHED)
+        if descriptor is not _NOT_CACHED:
             return descriptor
 
         descriptor = _try_get_matched_visualizers(value_type, natvis_enabled, basic_specs)
-        self.type_to_visualizer_cache[cache_key] = descriptor
+        self.type_to_visualizer_cache.set(cache_key, descriptor)
 
         return descriptor
 
+    def evict_type_viz_names(self, type_viz_names: List[TypeVizName]):
+        """
+        Evict cached descriptors which were built from or could be matched by the given type visualizer names.
+        """
+        if not type_viz_names:
+            return
+
+        affected_type_viz_names = {id(type_viz_name) for type_viz_name in type_viz_names}
+        name_templates = [type_viz_name.type_name_template for type_viz_name in type_viz_names]
+        evicted = self.type_to_visualizer_cache.evict_if(
+            lambda cache_key, descriptor: _is_cached_descriptor_affected(cache_key[0], descriptor,
+                                                                         affected_type_viz_names, name_templates))
+        log("Evicted {} cached visualizer descriptors", evicted)
+        # New visualizers may be inherited by any type
+        _types_without_inherited_natvis.clear()
+
+    def clear_type_viz_names(self):
+        """
+        Drop all the cached descriptors, it is cheaper than the eviction when the visualizers of a whole file change.
+        """
+        self.type_to_visualizer_cache.clear()
+        _types_without_inherited_natvis.clear()
+
+
+def _iterate_base_type_names(value_type: lldb.SBType) -> Iterable[str]:
+    for index in range(value_type.GetNumberOfDirectBaseClasses()):
+        base_type = value_type.GetDirectBaseClassAtIndex(index).GetType()
+        yield base_type.GetName()
+        yield from _iterate_base_type_names(base_type)
+
+
+def _is_cached_descriptor_affected(type_name: str, descriptor: Optional[AbstractVisDescriptor],
+                                   affected_type_viz_names: set[int],
+                                   name_templates: List[TypeNameTemplate]) -> bool:
+    if isinstance(descriptor, NatVisDescriptor):
+        for _, type_viz_name, _ in descriptor.viz_candidates:
+            if id(type_viz_name) in affected_type_viz_names:
+                return True
+
+    # Types that are not visualized by natvis now may be matched by the new visualizers (even through their bases)
+    type_names = [type_name]
+    if isinstance(descriptor, StructVisDescriptor):
+        type_names.append(descriptor.value_type.GetName())
+        type_names.extend(_iterate_base_type_names(descriptor.value_type))
+
+    for name in type_names:
+        try:
+            type_name_template = parse_type_name_template(CppParser.remove_type_class_specifier(name))
+        except Exception:
+            return True
+        for name_template in name_templates:
+            if name_template.match(type_name_template, None, None):
+                return True
+    return False
+
 
 def _get_matched_type_visualizers(type_name_template, only_inherited=False):
     result = []
@@ -423,26 +889,49 @@ def _get_matched_type_visualizers(type_name_template, only_inherited=False):
         for type_viz_storage in lldb_formatters_manager.get_all_type_viz():
             result.extend(
                 [name_match_pair for name_match_pair in type_viz_storage.get_matched_types(type_name_template)])
+    if result:
+        add_pending_top_level_declarations(lldb_formatters_manager.debugger,
+                                           lldb_formatters_manager.formatter_entries.values())
     return result
 
 
+def _has_natvis_type_key(type_name: str) -> bool:
+    return lldb_formatters_manager.has_type_key(build_type_name_key(CppParser.remove_type_class_specifier(type_name)))
+
+
+def _get_type_module_path(sb_type: lldb.SBType) -> str:
+    """
+    :return: path of the module the type is defined in, empty if LLDB doesn't support SBType.GetModule
+    """
+    if getattr(sb_type, "GetModule", None) is None:
+        return ''
+    return sb_type.GetModule().GetPlatformFileSpec().fullpath or ''
+
+
 def _try_find_matched_natvis_visualizer_for_base(value_type: lldb.SBType) -> Optional[AbstractVisDescriptor]:
     for index in range(value_type.GetNumberOfDirectBaseClasses()):
         base_type = value_type.GetDirectBaseClassAtIndex(index).GetType()
         base_type_name = base_type.GetName()
-        try:
-            base_type_name_template = parse_type_name_template(base_type_name)
-        except Exception as e:
-            log('Parsing typename {} failed: {}', base_type_name, e)
-            raise
-
-        viz_candidates = _get_matched_type_visualizers(base_type_name_template, True)
-        if viz_candidates:
-            return NatVisDescriptor(viz_candidates, base_type_name_template)
+        # the modules may define the types of the same name with different bases
+        base_type_key = _get_type_module_path(base_type), base_type_name
+        if _types_without_inherited_natvis.get(base_type_key, _NOT_CACHED) is not _NOT_CACHED:
+            continue
+
+        if _has_natvis_type_key(base_type_name):
+            try:
+                base_type_name_template = parse_type_name_template(base_type_name)
+            except Exception as e:
+                log('Parsing typename {} failed: {}', base_type_name, e)
+                raise
+
+            viz_candidates = _get_matched_type_visualizers(base_type_name_template, True)
+            if viz_candidates:
+                return NatVisDescriptor(viz_candidates, base_type_name_template)
 
         deep_base = _try_find_matched_natvis_visualizer_for_base(base_type)
         if deep_base is not None:
             return deep_base
+        _types_without_inherited_natvis.set(base_type_key, None)
 
     return None
 
@@ -450,7 +939,7 @@ def _try_find_matched_natvis_visualizer_for_base(value_type: lldb.SBType) -> Opt
 def _try_get_matched_visualizers(value_type: lldb.SBType, natvis_enabled: bool, basic_fmt_spec: int) -> Optional[AbstractVisDescriptor]:
     value_type: lldb.SBType = value_type.GetUnqualifiedType()
 
-    if natvis_enabled:
+    if natvis_enabled and _has_natvis_type_key(value_type.GetName()):
         value_type_name = CppParser.remove_type_class_specifier(value_type.GetName())
         log("Trying to find natvis visualizer for type: '{}'...", value_type_name)
         try:
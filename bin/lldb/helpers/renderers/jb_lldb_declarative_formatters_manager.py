@@ -1,3 +1,7 @@
+from typing import Callable, List, Optional, Set
+
+from jb_declarative_formatters import TypeVizName
+from jb_declarative_formatters.type_viz_storage import TypeVizStorage
 from .jb_lldb_logging import log
 
 
@@ -8,11 +12,40 @@ class FormattersManager(object):
         def __init__(self, storage, loader):
             self.storage = storage
             self.loader = loader
+            # Storage can append top-level methods when its lazy visualizers are materialized
+            self.registered_top_level_methods_count = 0
 
-    def __init__(self, summary_func_name, synthetic_provider_class_name):
+    def __init__(self, debugger, summary_func_name, synthetic_provider_class_name):
+        self.debugger = debugger
         self.formatter_entries = {}
         self.summary_func_name = summary_func_name
         self.synthetic_provider_class_name = synthetic_provider_class_name
+        # Is called with the names of the visualizers which were changed by reloading a file
+        self.on_type_viz_names_changed: Optional[Callable[[List[TypeVizName]], None]] = None
+        # Is called when the visualizers of a whole file were registered or unregistered
+        self.on_all_type_viz_names_changed: Optional[Callable[[], None]] = None
+        # Keys of the buckets of all the registered storages, is built on demand
+        self._type_keys: Optional[Set[str]] = None
+
+    def has_type_key(self, key: str) -> bool:
+        """
+        :param key: the key built by `build_type_name_key`
+        :return: False if no registered visualizer can match the type names with the key
+        """
+        if self._type_keys is None:
+            self._type_keys = {type_key for entry in self.formatter_entries.values()
+                               for type_key in entry.storage.get_type_keys()}
+        return key in self._type_keys
+
+    def _notify_type_viz_names_changed(self, type_viz_names: List[TypeVizName]):
+        self._type_keys = None
+        if self.on_type_viz_names_changed is not None and type_viz_names:
+            self.on_type_viz_names_changed(type_viz_names)
+
+    def _notify_all_type_viz_names_changed(self):
+        self._type_keys = None
+        if self.on_all_type_viz_names_changed is not None:
+            self.on_all_type_viz_names_changed()
 
     def get_all_registered_files(self):
         return self.formatter_entries.keys()
@@ -23,23 +56,36 @@ class FormattersManager(object):
     def register(self, filepath, loader) -> FormatterEntry:
         log("Registering types storage for '{}'...", filepath)
         storage = loader(filepath)
+        return self.register_loaded(filepath, loader, storage)
+
+    def register_loaded(self, filepath, loader, storage) -> FormatterEntry:
         entry = self.FormatterEntry(storage, loader)
         self.formatter_entries[filepath] = entry
+        self._notify_all_type_viz_names_changed()
         return entry
 
     def unregister(self, filepath):
         log("Unregistering types storage for '{}'...", filepath)
         try:
-            del self.formatter_entries[filepath]
+            self.formatter_entries.pop(filepath)
         except KeyError:
             log("Key '{}' wasn't found in formatters storage...", filepath)
             return
+        self._notify_all_type_viz_names_changed()
 
     def reload(self, filepath):
+        """
+        :return: pair of the old and the new storages or None if the file wasn't registered
+        """
         try:
             entry = self.formatter_entries[filepath]
         except KeyError:
             log("Key '{}' wasn't found in formatters storage...", filepath)
-            return
+            return None
 
+        old_storage = entry.storage
         entry.storage = entry.loader(filepath)
+        changed_type_viz_names = TypeVizStorage.diff_type_viz_names(old_storage, entry.storage)
+        log("Reloading changed {} type names of '{}'", len(changed_type_viz_names), filepath)
+        self._notify_type_viz_names_changed(changed_type_viz_names)
+        return old_storage, entry.storage
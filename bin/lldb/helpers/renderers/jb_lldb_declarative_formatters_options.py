@@ -1,10 +1,16 @@
+import os
 from enum import Enum
+from typing import Optional
 
 from renderers.jb_lldb_logging import set_suppress_errors
 
 g_max_string_length = 250
 
 g_max_num_children = 10000
+# Limits of the number of children of natvis containers without Size by the type name of the container
+g_max_num_children_by_type: dict[str, int] = {}
+# Number of children of natvis containers without Size calculated before LLDB asks for more
+g_num_children_page_size = 256
 
 g_max_recursion_level = 50
 g_recursion_level = -1
@@ -13,6 +19,37 @@ g_enable_formatting = True
 g_global_hex = False
 g_global_hex_show_both = False
 
+# Number of worker processes used to load several natvis files at once, 1 means serial loading in the script thread
+g_natvis_load_jobs = 1
+
+# Parse bodies of natvis types on the first match instead of the loading time
+g_natvis_lazy_loading = False
+
+# Evaluate simple natvis expressions on SBValue API instead of the expression evaluator of LLDB
+g_fast_eval_enabled = True
+
+# Reuse the results of natvis expressions evaluated at the current stop of the process
+g_eval_result_cache_enabled = True
+
+# Run CustomListItems programs in the target as a single compiled expression
+g_custom_list_items_compilation_enabled = True
+
+# Read the primitive ArrayItems elements by windows of the process memory instead of one child value at a time
+g_array_items_bulk_read_enabled = True
+
+# Address IndexListItems elements in the memory when the index expression is affine in $i
+g_index_list_items_patterns_enabled = True
+
+# Number of visualizer descriptors matched to the types kept before the least recently used ones are evicted
+g_viz_descriptor_cache_size = 4096
+
+# Number of bytes of the process memory pages kept between the reads at one stop, 0 disables the cache
+g_memory_cache_budget = 1024 * 1024
+
+g_natvis_cache_enabled = True
+g_natvis_cache_dir = os.environ.get('JB_LLDB_NATVIS_CACHE_DIR') or \
+                     os.path.join(os.path.expanduser('~'), '.cache', 'JetBrains', 'lldb-natvis-cache')
+
 
 class DiagnosticsLevel(Enum):
     DISABLED = 0
@@ -73,6 +110,31 @@ def set_global_hex_show_both(val: bool):
     g_global_hex_show_both = val
 
 
+def set_max_num_children(limit: int, type_name: Optional[str] = None):
+    global g_max_num_children
+    if type_name is None:
+        g_max_num_children = limit
+    else:
+        g_max_num_children_by_type[type_name] = limit
+
+
+def reset_max_num_children(type_name: str):
+    g_max_num_children_by_type.pop(type_name, None)
+
+
+def get_max_num_children(type_name: Optional[str] = None) -> int:
+    if type_name is not None:
+        limit = g_max_num_children_by_type.get(type_name)
+        if limit is not None:
+            return limit
+    return g_max_num_children
+
+
+def get_num_children_page_size() -> int:
+    global g_num_children_page_size
+    return g_num_children_page_size
+
+
 def is_global_hex():
     global g_global_hex
     return g_global_hex
@@ -81,3 +143,113 @@ def is_global_hex():
 def is_global_hex_show_both():
     global g_global_hex_show_both
     return g_global_hex_show_both
+
+
+def enable_disable_natvis_cache(val: bool):
+    global g_natvis_cache_enabled
+    g_natvis_cache_enabled = val
+
+
+def is_enabled_natvis_cache() -> bool:
+    global g_natvis_cache_enabled
+    return g_natvis_cache_enabled
+
+
+def set_natvis_cache_dir(path: str):
+    global g_natvis_cache_dir
+    g_natvis_cache_dir = path
+
+
+def get_natvis_cache_dir() -> str:
+    global g_natvis_cache_dir
+    return g_natvis_cache_dir
+
+
+def set_natvis_load_jobs(jobs: int):
+    global g_natvis_load_jobs
+    g_natvis_load_jobs = jobs
+
+
+def get_natvis_load_jobs() -> int:
+    global g_natvis_load_jobs
+    return g_natvis_load_jobs
+
+
+def enable_disable_natvis_lazy_loading(val: bool):
+    global g_natvis_lazy_loading
+    g_natvis_lazy_loading = val
+
+
+def is_enabled_natvis_lazy_loading() -> bool:
+    global g_natvis_lazy_loading
+    return g_natvis_lazy_loading
+
+
+def enable_disable_fast_eval(val: bool):
+    global g_fast_eval_enabled
+    g_fast_eval_enabled = val
+
+
+def is_enabled_fast_eval() -> bool:
+    global g_fast_eval_enabled
+    return g_fast_eval_enabled
+
+
+def enable_disable_eval_result_cache(val: bool):
+    global g_eval_result_cache_enabled
+    g_eval_result_cache_enabled = val
+
+
+def is_enabled_eval_result_cache() -> bool:
+    global g_eval_result_cache_enabled
+    return g_eval_result_cache_enabled
+
+
+def enable_disable_custom_list_items_compilation(val: bool):
+    global g_custom_list_items_compilation_enabled
+    g_custom_list_items_compilation_enabled = val
+
+
+def is_enabled_custom_list_items_compilation() -> bool:
+    global g_custom_list_items_compilation_enabled
+    return g_custom_list_items_compilation_enabled
+
+
+def enable_disable_array_items_bulk_read(val: bool):
+    global g_array_items_bulk_read_enabled
+    g_array_items_bulk_read_enabled = val
+
+
+def is_enabled_array_items_bulk_read() -> bool:
+    global g_array_items_bulk_read_enabled
+    return g_array_items_bulk_read_enabled
+
+
+def enable_disable_index_list_items_patterns(val: bool):
+    global g_index_list_items_patterns_enabled
+    g_index_list_items_patterns_enabled = val
+
+
+def is_enabled_index_list_items_patterns() -> bool:
+    global g_index_list_items_patterns_enabled
+    return g_index_list_items_patterns_enabled
+
+
+def set_viz_descriptor_cache_size(size: int):
+    global g_viz_descriptor_cache_size
+    g_viz_descriptor_cache_size = size
+
+
+def get_viz_descriptor_cache_size() -> int:
+    global g_viz_descriptor_cache_size
+    return g_viz_descriptor_cache_size
+
+
+def set_memory_cache_budget(budget: int):
+    global g_memory_cache_budget
+    g_memory_cache_budget = budget
+
+
+def get_memory_cache_budget() -> int:
+    global g_memory_cache_budget
+    return g_memory_cache_budget
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import lldb
+from renderers.jb_lldb_evaluation_utils import EvalSettings
+from renderers.jb_lldb_fast_eval import has_side_effects
+from renderers.jb_lldb_item_expression import ItemExpression
+from renderers.jb_lldb_logging import log
+
+
+class _CachedResult(object):
+    __slots__ = ('name', 'value_type', 'address', 'data', 'metadata_code')
+
+    def __init__(self, name: Optional[str], value_type: lldb.SBType, address: int, data: Optional[lldb.SBData],
+                 metadata_code: str):
+        self.name = name
+        self.value_type = value_type
+        # the result in the process memory is recreated from its address, other results from their data
+        self.address = address
+        self.data = data
+        # the code the item expression metadata of the value was built from
+        self.metadata_code = metadata_code
+
+    def create_value(self, val: lldb.SBValue) -> lldb.SBValue:
+        if self.address != lldb.LLDB_INVALID_ADDRESS:
+            return val.CreateValueFromAddress(self.name, self.address, self.value_type)
+        return val.CreateValueFromData(self.name, self.data, self.value_type)
+
+
+class _CacheForProcess(object):
+    def __init__(self, stop_id: int):
+        self.stop_id = stop_id
+        self.results = {}
+
+
+class EvalResultCache:
+    """
+    EvalResultCache keeps the results of natvis expressions evaluated at the current stop of the process,
+    so summaries and children requested several times between two resumes (variables view, tooltips, watches,
+    inline values) don't evaluate the same expression on the same object again.
+    The results are keyed by the process, its stop ID counting the expression stops, the address and the type of
+    the context object and the expression. The cache is dropped when the stop ID changes: on resume, and after any
+    expression that ran the target; and by `jb_renderers_eval_cache invalidate`.
+    Expressions with side effects, persistent variables or an evaluation context are never cached.
+    Every hit creates a new value, so the name, the format and the metadata set by one consumer of the result
+    aren't seen by the others.
+    """
+    MAX_ENTRIES_PER_STOP = 65536
+
+    _caches_for_process: dict[int, _CacheForProcess] = {}
+
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @classmethod
+    def make_key(cls, val: lldb.SBValue, expr: str, settings: Optional[EvalSettings],
+                 intrinsics_prolog: str) -> Optional[tuple]:
+        """
+        :return: cache key of the evaluation or None if its result mustn't be cached
+        """
+        if settings is not None and not settings.has_default_options():
+            return None
+        if '$' in expr or has_side_effects(expr):
+            return None
+        address = val.GetLoadAddress()
+        if address == lldb.LLDB_INVALID_ADDRESS:
+            return None
+
+        name = settings.name if settings is not None else None
+        save_expression_in_metadata = settings is not None and settings.save_expression_in_metadata
+        return address, val.GetTypeName(), expr, name, save_expression_in_metadata, intrinsics_prolog
+
+    @classmethod
+    def get(cls, val: lldb.SBValue, key: tuple, settings: Optional[EvalSettings]) -> Optional[lldb.SBValue]:
+        process = val.GetProcess()
+        if not process.IsValid():
+            return None
+        cache_for_process = cls._sync_cache_for_process(process)
+        cached = cache_for_process.results.get(key)
+        if cached is None:
+            cls.misses += 1
+            return None
+
+        result = cached.create_value(val)
+        if not result.IsValid():
+            cls.misses += 1
+            return None
+
+        cls.hits += 1
+        # the item expression is relative to the context object, that may be reached by another path
+        if settings is not None and settings.save_expression_in_metadata:
+            ItemExpression.update_item_expression(result, val, cached.metadata_code, settings.getter_call)
+        elif settings is not None and settings.name is not None:
+            ItemExpression.invalidate_item_expression(result)
+        return result
+
+    @classmethod
+    def set(cls, val: lldb.SBValue, key: tuple, result: lldb.SBValue, metadata_code: str):
+        result_non_synth: lldb.SBValue = result.GetNonSyntheticValue()
+        if result_non_synth.GetError().Fail():
+            return
+        result_type: lldb.SBType = result_non_synth.GetType()
+        if result_type.IsReferenceType():
+            return
+        address = result_non_synth.GetLoadAddress()
+        data = None
+        if address == lldb.LLDB_INVALID_ADDRESS:
+            data = result_non_synth.GetData()
+            if not data.IsValid() or data.GetByteSize() != result_type.GetByteSize():
+                return
+        process = val.GetProcess()
+        if not process.IsValid():
+            return
+        # the evaluation itself may have run the target, the result belongs to the stop after it
+        cache_for_process = cls._sync_cache_for_process(process)
+        if len(cache_for_process.results) >= cls.MAX_ENTRIES_PER_STOP:
+            cache_for_process.results = {}
+        cache_for_process.results[key] = _CachedResult(result.GetName(), result_type, address, data, metadata_code)
+
+    @classmethod
+    def invalidate(cls, process: Optional[lldb.SBProcess] = None):
+        """
+        Drop the cached results of the process or of all the processes.
+        """
+        if process is None:
+            if cls._caches_for_process:
+                cls.invalidations += 1
+            cls._caches_for_process = {}
+        elif process.IsValid() and cls._caches_for_process.pop(process.GetUniqueID(), None) is not None:
+            cls.invalidations += 1
+
+    @classmethod
+    def _sync_cache_for_process(cls, process: lldb.SBProcess) -> _CacheForProcess:
+        process_id = process.GetUniqueID()
+        stop_id = process.GetStopID(True)
+        cache_for_process = cls._caches_for_process.get(process_id)
+        if cache_for_process is None or cache_for_process.stop_id != stop_id:
+            if cache_for_process is not None:
+                log("Stop ID of process {} changed, drop {} cached evaluation results",
+                    process_id, len(cache_for_process.results))
+                cls.invalidations += 1
+            cache_for_process = _CacheForProcess(stop_id)
+            cls._caches_for_process[process_id] = cache_for_process
+        return cache_for_process
+
+    @classmethod
+    def reset_statistics(cls):
+        cls.hits = 0
+        cls.misses = 0
+        cls.invalidations = 0
+
+    @classmethod
+    def format_statistics(cls) -> str:
+        total = cls.hits + cls.misses
+        hit_rate = 100.0 * cls.hits / total if total else 0.0
+        cached = sum(len(cache_for_process.results) for cache_for_process in cls._caches_for_process.values())
+        return 'Evaluation result cache: {} hits, {} misses ({:.1f}% hit rate), {} invalidations, ' \
+               '{} cached results'.format(cls.hits, cls.misses, hit_rate, cls.invalidations, cached)
@@ -49,6 +49,9 @@ class EvalSettings:
         self.save_expression_in_metadata = save_expression_in_metadata
         self.getter_call = getter_call
 
+    def has_default_options(self) -> bool:
+        return self.options is self._DEFAULT_EXPRESSION_OPTIONS
+
     @staticmethod
     def with_metadata(name: Optional[str] = None, synthetic_getter: Optional[SyntheticMethod] = None,
                       synthetic_getter_args: Optional[List[str]] = None) -> EvalSettings:
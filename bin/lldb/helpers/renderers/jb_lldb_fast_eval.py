@@ -0,0 +1,742 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import lldb
+from renderers.jb_lldb_evaluation_utils import EvalSettings
+from renderers.jb_lldb_item_expression import ItemExpression
+from renderers.jb_lldb_logging import log
+
+
+class FastEvalStatistics(object):
+    hits: int = 0
+    unsupported: int = 0
+    fallbacks: int = 0
+
+    @classmethod
+    def reset(cls):
+        cls.hits = 0
+        cls.unsupported = 0
+        cls.fallbacks = 0
+
+    @classmethod
+    def total(cls) -> int:
+        return cls.hits + cls.unsupported + cls.fallbacks
+
+    @classmethod
+    def format(cls) -> str:
+        total = cls.total()
+        hit_rate = 100.0 * cls.hits / total if total else 0.0
+        return 'Fast evaluation: {} of {} expressions ({:.1f}%), ' \
+               'unsupported expressions: {}, fallbacks on evaluation: {}'.format(cls.hits, total, hit_rate,
+                                                                                  cls.unsupported, cls.fallbacks)
+
+
+class _Unsupported(Exception):
+    """
+    The expression or its operands are out of the supported subset, the expression is evaluated by LLDB.
+    """
+    pass
+
+
+def try_fast_eval(val: lldb.SBValue, expr: str, settings: Optional[EvalSettings],
+                  intrinsics_prolog: str) -> Optional[lldb.SBValue]:
+    """
+    Evaluate a simple expression (member paths, `->`, `[n]`, integer arithmetic, comparisons, logical operators
+    and casts to builtin types) directly on SBValue API without running the expression evaluator of LLDB.
+
+    :return: evaluation result or None if the expression must be evaluated by LLDB
+    """
+    parsed = _parse_expression(expr)
+    if parsed is None:
+        FastEvalStatistics.unsupported += 1
+        return None
+
+    ast, identifiers = parsed
+    # local names of the intrinsics prolog shadow the members of the object
+    if intrinsics_prolog and not identifiers.isdisjoint(_get_prolog_identifiers(intrinsics_prolog)):
+        FastEvalStatistics.unsupported += 1
+        return None
+
+    # noinspection PyBroadException
+    try:
+        evaluator = _Evaluator(val)
+        result = evaluator.make_result(evaluator.evaluate(ast), settings, expr)
+    except _Unsupported as e:
+        log("Fast evaluation of '{}' falls back to LLDB: {}", expr, e)
+        FastEvalStatistics.fallbacks += 1
+        return None
+    except Exception as e:
+        log("Fast evaluation of '{}' failed, falls back to LLDB: {}", expr, e)
+        FastEvalStatistics.fallbacks += 1
+        return None
+
+    eval_settings = settings or EvalSettings()
+    if eval_settings.save_expression_in_metadata:
+        ItemExpression.update_item_expression(result, val, expr, eval_settings.getter_call)
+    elif eval_settings.name is not None:
+        ItemExpression.invalidate_item_expression(result)
+
+    FastEvalStatistics.hits += 1
+    return result
+
+
+# Parsing
+
+_TOKEN_REGEX = re.compile(r'''\s*(?:
+    (?P<number>(?:0[xX][0-9a-fA-F]+|0[bB][01]+|[0-9]+)(?P<suffix>[uUlL]*)(?![\w.']))
+  | (?P<ident>[A-Za-z_]\w*)
+  | (?P<op>->|<<|>>|<=|>=|==|!=|&&|\|\||[-+*/%<>!~&|^.\[\]()?:])
+)''', re.VERBOSE)
+
+# Assignments, increments and decrements are never evaluated here
+_SIDE_EFFECTS_REGEX = re.compile(r'\+\+|--|<<=|>>=|(?<![=!<>])=(?!=)')
+
+
+def has_side_effects(expr: str) -> bool:
+    """
+    Conservative check: the expression contains an assignment, an increment or a decrement.
+    """
+    return _SIDE_EFFECTS_REGEX.search(expr) is not None
+
+_BINARY_PRECEDENCE = {
+    '||': 1,
+    '&&': 2,
+    '|': 3,
+    '^': 4,
+    '&': 5,
+    '==': 6, '!=': 6,
+    '<': 7, '<=': 7, '>': 7, '>=': 7,
+    '<<': 8, '>>': 8,
+    '+': 9, '-': 9,
+    '*': 10, '/': 10, '%': 10,
+}
+
+_KEYWORDS = {'this', 'true', 'false', 'nullptr'}
+
+# Builtin integral types allowed in casts
+_BUILTIN_TYPES = {
+    'bool': lldb.eBasicTypeBool,
+    'char': lldb.eBasicTypeChar,
+    'signed char': lldb.eBasicTypeSignedChar,
+    'unsigned char': lldb.eBasicTypeUnsignedChar,
+    'wchar_t': lldb.eBasicTypeWChar,
+    'char16_t': lldb.eBasicTypeChar16,
+    'char32_t': lldb.eBasicTypeChar32,
+    'short': lldb.eBasicTypeShort,
+    'short int': lldb.eBasicTypeShort,
+    'unsigned short': lldb.eBasicTypeUnsignedShort,
+    'unsigned short int': lldb.eBasicTypeUnsignedShort,
+    'int': lldb.eBasicTypeInt,
+    'signed': lldb.eBasicTypeInt,
+    'signed int': lldb.eBasicTypeInt,
+    'unsigned': lldb.eBasicTypeUnsignedInt,
+    'unsigned int': lldb.eBasicTypeUnsignedInt,
+    'long': lldb.eBasicTypeLong,
+    'long int': lldb.eBasicTypeLong,
+    'unsigned long': lldb.eBasicTypeUnsignedLong,
+    'unsigned long int': lldb.eBasicTypeUnsignedLong,
+    'long long': lldb.eBasicTypeLongLong,
+    'long long int': lldb.eBasicTypeLongLong,
+    'unsigned long long': lldb.eBasicTypeUnsignedLongLong,
+    'unsigned long long int': lldb.eBasicTypeUnsignedLongLong,
+    '__int64': lldb.eBasicTypeLongLong,
+    'unsigned __int64': lldb.eBasicTypeUnsignedLongLong,
+}
+_TYPE_WORDS = {word for type_name in _BUILTIN_TYPES for word in type_name.split()}
+
+_PARSE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def _parse_expression(expr: str) -> Optional[Tuple[tuple, frozenset]]:
+    """
+    :return: AST of the expression and identifiers used in it, or None if the expression is out of the supported subset
+    """
+    if has_side_effects(expr):
+        return None
+    try:
+        parser = _Parser(expr)
+        return parser.parse(), frozenset(parser.identifiers)
+    except (_Unsupported, RecursionError):
+        return None
+
+
+@lru_cache(maxsize=64)
+def _get_prolog_identifiers(prolog: str) -> frozenset:
+    return frozenset(re.findall(r'[A-Za-z_]\w*', prolog))
+
+
+class _Parser(object):
+    def __init__(self, expr: str):
+        self.tokens = self._tokenize(expr)
+        self.pos = 0
+        self.identifiers = set()
+
+    @staticmethod
+    def _tokenize(expr: str) -> list[tuple[str, str]]:
+        tokens = []
+        pos = 0
+        expr = expr.rstrip()
+        while pos < len(expr):
+            m = _TOKEN_REGEX.match(expr, pos)
+            if m is None:
+                raise _Unsupported(f"unexpected character at {pos}")
+            pos = m.end()
+            if m.group('number') is not None:
+                tokens.append(('number', m.group('number')))
+            elif m.group('ident') is not None:
+                tokens.append(('ident', m.group('ident')))
+            else:
+                tokens.append(('op', m.group('op')))
+        return tokens
+
+    def peek(self, offset: int = 0) -> tuple[str, str]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else ('end', '')
+
+    def next(self) -> tuple[str, str]:
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, op: str):
+        if self.next() != ('op', op):
+            raise _Unsupported(f"'{op}' expected")
+
+    def parse(self) -> tuple:
+        ast = self.parse_conditional()
+        if self.peek()[0] != 'end':
+            raise _Unsupported("unexpected token")
+        return ast
+
+    def parse_conditional(self) -> tuple:
+        condition = self.parse_binary(1)
+        if self.peek() != ('op', '?'):
+            return condition
+        self.next()
+        when_true = self.parse_conditional()
+        self.expect(':')
+        when_false = self.parse_conditional()
+        return 'cond', condition, when_true, when_false
+
+    def parse_binary(self, min_precedence: int) -> tuple:
+        left = self.parse_unary()
+        while True:
+            kind, text = self.peek()
+            precedence = _BINARY_PRECEDENCE.get(text) if kind == 'op' else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.next()
+            right = self.parse_binary(precedence + 1)
+            left = 'binary', text, left, right
+
+    def parse_unary(self) -> tuple:
+        kind, text = self.peek()
+        if kind == 'op' and text in ('!', '~', '-', '+', '*', '&'):
+            self.next()
+            return 'unary', text, self.parse_unary()
+        if kind == 'op' and text == '(':
+            type_name = self._try_parse_cast_type()
+            if type_name is not None:
+                return 'cast', type_name, self.parse_unary()
+        return self.parse_postfix()
+
+    def _try_parse_cast_type(self) -> Optional[str]:
+        words = []
+        offset = 1
+        while self.peek(offset)[0] == 'ident' and self.peek(offset)[1] in _TYPE_WORDS:
+            words.append(self.peek(offset)[1])
+            offset += 1
+        if not words or self.peek(offset) != ('op', ')'):
+            return None
+        type_name = ' '.join(words)
+        if type_name not in _BUILTIN_TYPES:
+            raise _Unsupported(f"cast to '{type_name}'")
+        self.pos += offset + 1
+        return type_name
+
+    def parse_postfix(self) -> tuple:
+        ast = self.parse_primary()
+        while True:
+            kind, text = self.peek()
+            if kind != 'op':
+                return ast
+            if text in ('.', '->'):
+                self.next()
+                member_kind, member = self.next()
+                if member_kind != 'ident' or member in _KEYWORDS:
+                    raise _Unsupported("member name expected")
+                ast = 'member', ast, member, text == '->'
+            elif text == '[':
+                self.next()
+                index = self.parse_conditional()
+                self.expect(']')
+                ast = 'index', ast, index
+            elif text == '(':
+                raise _Unsupported("function call")
+            else:
+                return ast
+
+    def parse_primary(self) -> tuple:
+        kind, text = self.next()
+        if kind == 'number':
+            return self._parse_number(text)
+        if kind == 'ident':
+            if text in ('true', 'false'):
+                return 'bool', text == 'true'
+            if text == 'nullptr':
+                return 'nullptr',
+            if text == 'this':
+                return 'this',
+            if text in _TYPE_WORDS:
+                raise _Unsupported(f"unexpected type name '{text}'")
+            self.identifiers.add(text)
+            return 'id', text
+        if (kind, text) == ('op', '('):
+            ast = self.parse_conditional()
+            self.expect(')')
+            return ast
+        raise _Unsupported("operand expected")
+
+    @staticmethod
+    def _parse_number(text: str) -> tuple:
+        m = re.match(r'(0[xX][0-9a-fA-F]+|0[bB][01]+|[0-9]+)([uUlL]*)$', text)
+        digits, suffix = m.group(1), m.group(2).lower()
+        if suffix not in ('', 'u', 'l', 'ul', 'lu', 'll', 'ull', 'llu'):
+            raise _Unsupported(f"literal suffix '{suffix}'")
+        is_decimal = not (digits[0] == '0' and len(digits) > 1)
+        if digits[:2] in ('0x', '0X'):
+            value = int(digits[2:], 16)
+        elif digits[:2] in ('0b', '0B'):
+            value = int(digits[2:], 2)
+        elif not is_decimal:
+            value = int(digits, 8)
+        else:
+            value = int(digits)
+        return 'number', value, 'u' in suffix, suffix.count('l'), is_decimal
+
+
+# Evaluation
+
+class _IntType(object):
+    __slots__ = ('size', 'signed', 'is_bool')
+
+    def __init__(self, size: int, signed: bool, is_bool: bool = False):
+        self.size = size
+        self.signed = signed
+        self.is_bool = is_bool
+
+    def normalize(self, value: int) -> int:
+        if self.is_bool:
+            return 1 if value else 0
+        bits = self.size * 8
+        value &= (1 << bits) - 1
+        if self.signed and value >> (bits - 1):
+            value -= 1 << bits
+        return value
+
+
+_BOOL = _IntType(1, False, True)
+_INT = _IntType(4, True)
+
+
+class _LValue(object):
+    """
+    Object in the memory of the debuggee.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value: lldb.SBValue):
+        self.value = value
+
+
+class _Scalar(object):
+    __slots__ = ('value', 'int_type', 'sb_type')
+
+    def __init__(self, value: int, int_type: _IntType, sb_type: Optional[lldb.SBType] = None):
+        self.value = int_type.normalize(value)
+        self.int_type = int_type
+        # type of the result of a cast, other results have the basic type of the same size and signedness
+        self.sb_type = sb_type
+
+
+class _Pointer(object):
+    __slots__ = ('address', 'pointer_type')
+
+    def __init__(self, address: int, pointer_type: Optional[lldb.SBType]):
+        self.address = address
+        # None for nullptr
+        self.pointer_type = pointer_type
+
+
+_STRUCT_TYPE_CLASSES = (lldb.eTypeClassClass, lldb.eTypeClassStruct, lldb.eTypeClassUnion)
+
+
+class _Evaluator(object):
+    def __init__(self, ctx: lldb.SBValue):
+        self.ctx = ctx.GetNonSyntheticValue()
+        self.target: lldb.SBTarget = self.ctx.GetTarget()
+        self.pointer_size = self.target.GetAddressByteSize()
+        self.long_size = self.target.GetBasicType(lldb.eBasicTypeLong).GetByteSize()
+
+    def evaluate(self, ast: tuple):
+        kind = ast[0]
+        if kind == 'number':
+            return self._evaluate_number(*ast[1:])
+        if kind == 'bool':
+            return _Scalar(int(ast[1]), _BOOL)
+        if kind == 'nullptr':
+            return _Pointer(0, None)
+        if kind == 'this':
+            return self._address_of(_LValue(self.ctx))
+        if kind == 'id':
+            return self._member(_LValue(self.ctx), ast[1])
+        if kind == 'member':
+            obj = self.evaluate(ast[1])
+            if ast[3]:
+                obj = self._dereference(obj)
+            return self._member(obj, ast[2])
+        if kind == 'index':
+            return self._index(self.evaluate(ast[1]), self._integer(self.evaluate(ast[2])))
+        if kind == 'unary':
+            return self._unary(ast[1], self.evaluate(ast[2]))
+        if kind == 'cast':
+            return self._cast(ast[1], self.evaluate(ast[2]))
+        if kind == 'binary':
+            return self._binary(ast[1], ast[2], ast[3])
+        if kind == 'cond':
+            if self._to_bool(self.evaluate(ast[1])):
+                return self._rvalue(self.evaluate(ast[2]))
+            return self._rvalue(self.evaluate(ast[3]))
+        raise _Unsupported(f"unknown node '{kind}'")
+
+    # Values
+
+    def _evaluate_number(self, value: int, is_unsigned: bool, long_count: int, is_decimal: bool) -> _Scalar:
+        sizes = [4, self.long_size, 8][long_count:]
+        for size in sizes:
+            for signed in (False,) if is_unsigned else (True,) if is_decimal else (True, False):
+                if value < 1 << (size * 8 - (1 if signed else 0)):
+                    return _Scalar(value, _IntType(size, signed))
+        raise _Unsupported("integer literal is too large")
+
+    @staticmethod
+    def _type_class(sb_type: lldb.SBType) -> int:
+        return sb_type.GetCanonicalType().GetTypeClass()
+
+    def _lvalue(self, value: lldb.SBValue) -> _LValue:
+        if not value.IsValid() or value.GetError().Fail():
+            raise _Unsupported("invalid value")
+        if self._type_class(value.GetType()) == lldb.eTypeClassReference:
+            value = value.Dereference()
+            if not value.IsValid():
+                raise _Unsupported("invalid reference")
+        return _LValue(value.GetNonSyntheticValue())
+
+    def _rvalue(self, operand) -> _Scalar | _Pointer:
+        if not isinstance(operand, _LValue):
+            return operand
+
+        value = operand.value
+        value_type: lldb.SBType = value.GetType().GetCanonicalType()
+        type_class = value_type.GetTypeClass()
+        if type_class == lldb.eTypeClassPointer:
+            return _Pointer(self._read_unsigned(value), value_type)
+        if type_class == lldb.eTypeClassArray:
+            return _Pointer(self._load_address(value), value_type.GetArrayElementType().GetPointerType())
+        if type_class == lldb.eTypeClassBuiltin:
+            int_type = self._int_type_of(value_type)
+            return _Scalar(self._read_unsigned(value), int_type)
+        raise _Unsupported(f"operand of type '{value.GetTypeName()}'")
+
+    @staticmethod
+    def _int_type_of(value_type: lldb.SBType) -> _IntType:
+        basic_type = value_type.GetBasicType()
+        if basic_type == lldb.eBasicTypeBool:
+            return _BOOL
+        if not value_type.GetTypeFlags() & lldb.eTypeIsInteger:
+            raise _Unsupported(f"non-integral type '{value_type.GetName()}'")
+        return _IntType(value_type.GetByteSize(), bool(value_type.GetTypeFlags() & lldb.eTypeIsSigned))
+
+    @staticmethod
+    def _read_unsigned(value: lldb.SBValue) -> int:
+        error = lldb.SBError()
+        result = value.GetValueAsUnsigned(error, 0)
+        if error.Fail():
+            raise _Unsupported(f"can't read value: {error}")
+        return result
+
+    @staticmethod
+    def _load_address(value: lldb.SBValue) -> int:
+        address = value.GetLoadAddress()
+        if address == lldb.LLDB_INVALID_ADDRESS:
+            raise _Unsupported("value is not in memory")
+        return address
+
+    # Operations
+
+    def _member(self, obj, name: str) -> _LValue:
+        if not isinstance(obj, _LValue) or self._type_class(obj.value.GetType()) not in _STRUCT_TYPE_CLASSES:
+            raise _Unsupported(f"member '{name}' of non-class value")
+        if self._is_bitfield(obj.value.GetType(), name):
+            raise _Unsupported(f"bitfield member '{name}'")
+        return self._lvalue(obj.value.GetChildMemberWithName(name))
+
+    def _is_bitfield(self, struct_type: lldb.SBType, name: str) -> bool:
+        types = [struct_type.GetCanonicalType()]
+        while types:
+            current = types.pop()
+            for i in range(current.GetNumberOfFields()):
+                field: lldb.SBTypeMember = current.GetFieldAtIndex(i)
+                if field.GetName() == name:
+                    return field.IsBitfield()
+                if not field.GetName() and self._type_class(field.GetType()) in _STRUCT_TYPE_CLASSES:
+                    # members of anonymous structs and unions
+                    types.append(field.GetType().GetCanonicalType())
+            for i in range(current.GetNumberOfDirectBaseClasses()):
+                types.append(current.GetDirectBaseClassAtIndex(i).GetType().GetCanonicalType())
+        return False
+
+    def _dereference(self, operand) -> _LValue:
+        pointer = self._rvalue(operand)
+        if not isinstance(pointer, _Pointer) or pointer.pointer_type is None:
+            raise _Unsupported("dereference of non-pointer value")
+        if pointer.address == 0:
+            raise _Unsupported("dereference of null pointer")
+        if isinstance(operand, _LValue) and self._type_class(operand.value.GetType()) == lldb.eTypeClassPointer:
+            return self._lvalue(operand.value.Dereference())
+        return self._value_at(pointer.address, pointer.pointer_type.GetPointeeType())
+
+    def _value_at(self, address: int, value_type: lldb.SBType, name: str = '') -> _LValue:
+        if value_type.GetByteSize() == 0:
+            raise _Unsupported(f"incomplete type '{value_type.GetName()}'")
+        return self._lvalue(self.ctx.CreateValueFromAddress(name, address, value_type))
+
+    def _address_of(self, operand) -> _Pointer:
+        if not isinstance(operand, _LValue):
+            raise _Unsupported("address of rvalue")
+        value_type: lldb.SBType = operand.value.GetType()
+        return _Pointer(self._load_address(operand.value), value_type.GetPointerType())
+
+    def _index(self, obj, index: int) -> _LValue:
+        pointer = self._rvalue(obj)
+        if not isinstance(pointer, _Pointer) or pointer.pointer_type is None or pointer.address == 0:
+            raise _Unsupported("subscript of non-pointer value")
+        element_type = pointer.pointer_type.GetPointeeType()
+        element_size = element_type.GetByteSize()
+        address = (pointer.address + index * element_size) & ((1 << (self.pointer_size * 8)) - 1)
+        return self._value_at(address, element_type, f'[{index}]')
+
+    def _integer(self, operand) -> int:
+        scalar = self._rvalue(operand)
+        if not isinstance(scalar, _Scalar):
+            raise _Unsupported("integer operand expected")
+        return scalar.value
+
+    def _to_bool(self, operand) -> bool:
+        value = self._rvalue(operand)
+        if isinstance(value, _Pointer):
+            return value.address != 0
+        return value.value != 0
+
+    def _unary(self, op: str, operand):
+        if op == '*':
+            return self._dereference(operand)
+        if op == '&':
+            return self._address_of(operand)
+        if op == '!':
+            return _Scalar(int(not self._to_bool(operand)), _BOOL)
+
+        scalar = self._rvalue(operand)
+        if not isinstance(scalar, _Scalar):
+            raise _Unsupported(f"operator '{op}' on pointer")
+        int_type = self._promote(scalar.int_type)
+        if op == '-':
+            return _Scalar(-scalar.value, int_type)
+        if op == '~':
+            return _Scalar(~scalar.value, int_type)
+        return _Scalar(scalar.value, int_type)
+
+    def _cast(self, type_name: str, operand) -> _Scalar:
+        value = self._rvalue(operand)
+        raw_value = value.address if isinstance(value, _Pointer) else value.value
+        if type_name == 'bool':
+            return _Scalar(int(raw_value != 0), _BOOL)
+        sb_type = self.target.GetBasicType(_BUILTIN_TYPES[type_name])
+        if not sb_type.IsValid():
+            raise _Unsupported(f"unknown type '{type_name}'")
+        return _Scalar(raw_value, self._int_type_of(sb_type), sb_type)
+
+    def _binary(self, op: str, left_ast: tuple, right_ast: tuple):
+        if op == '&&':
+            return _Scalar(int(self._to_bool(self.evaluate(left_ast)) and self._to_bool(self.evaluate(right_ast))),
+                           _BOOL)
+        if op == '||':
+            return _Scalar(int(self._to_bool(self.evaluate(left_ast)) or self._to_bool(self.evaluate(right_ast))),
+                           _BOOL)
+
+        left = self._rvalue(self.evaluate(left_ast))
+        right = self._rvalue(self.evaluate(right_ast))
+        if isinstance(left, _Pointer) or isinstance(right, _Pointer):
+            return self._pointer_binary(op, left, right)
+
+        if op in ('<<', '>>'):
+            int_type = self._promote(left.int_type)
+            shift = right.value
+            if shift < 0 or shift >= int_type.size * 8:
+                raise _Unsupported("shift out of range")
+            return _Scalar(left.value << shift if op == '<<' else left.value >> shift, int_type)
+
+        int_type = self._common_type(left.int_type, right.int_type)
+        a = int_type.normalize(left.value)
+        b = int_type.normalize(right.value)
+        match op:
+            case '+':
+                return _Scalar(a + b, int_type)
+            case '-':
+                return _Scalar(a - b, int_type)
+            case '*':
+                return _Scalar(a * b, int_type)
+            case '/' | '%':
+                if b == 0:
+                    raise _Unsupported("division by zero")
+                # C division truncates toward zero
+                quotient = abs(a) // abs(b) * (1 if (a < 0) == (b < 0) else -1)
+                return _Scalar(quotient if op == '/' else a - quotient * b, int_type)
+            case '&':
+                return _Scalar(a & b, int_type)
+            case '|':
+                return _Scalar(a | b, int_type)
+            case '^':
+                return _Scalar(a ^ b, int_type)
+        return _Scalar(int(self._compare(op, a, b)), _BOOL)
+
+    def _pointer_binary(self, op: str, left, right):
+        if op in ('==', '!=', '<', '<=', '>', '>='):
+            return _Scalar(int(self._compare(op, self._address(left), self._address(right))), _BOOL)
+
+        if op == '-' and isinstance(left, _Pointer) and isinstance(right, _Pointer):
+            element_size = self._pointee_size(left)
+            if right.pointer_type is None or self._pointee_size(right) != element_size or \
+                    left.pointer_type.GetCanonicalType().GetName() != right.pointer_type.GetCanonicalType().GetName():
+                raise _Unsupported("difference of unrelated pointers")
+            difference = _IntType(self.pointer_size, True).normalize(left.address - right.address)
+            # C division truncates toward zero
+            quotient = difference // element_size if difference >= 0 else -(-difference // element_size)
+            return _Scalar(quotient, _IntType(self.pointer_size, True))
+
+        if op in ('+', '-') and isinstance(left, _Pointer) and isinstance(right, _Scalar):
+            offset = right.value * self._pointee_size(left)
+            address = left.address + offset if op == '+' else left.address - offset
+            return _Pointer(address & ((1 << (self.pointer_size * 8)) - 1), left.pointer_type)
+        if op == '+' and isinstance(left, _Scalar) and isinstance(right, _Pointer):
+            return self._pointer_binary(op, right, left)
+
+        raise _Unsupported(f"operator '{op}' on pointers")
+
+    @staticmethod
+    def _pointee_size(pointer: _Pointer) -> int:
+        if pointer.pointer_type is None:
+            raise _Unsupported("arithmetic on nullptr")
+        size = pointer.pointer_type.GetPointeeType().GetByteSize()
+        if size == 0:
+            raise _Unsupported("arithmetic on pointer to incomplete type")
+        return size
+
+    @staticmethod
+    def _address(operand) -> int:
+        if isinstance(operand, _Pointer):
+            return operand.address
+        # only null pointer constants are comparable with pointers
+        if operand.value != 0:
+            raise _Unsupported("comparison of pointer and integer")
+        return 0
+
+    @staticmethod
+    def _compare(op: str, a: int, b: int) -> bool:
+        match op:
+            case '==':
+                return a == b
+            case '!=':
+                return a != b
+            case '<':
+                return a < b
+            case '<=':
+                return a <= b
+            case '>':
+                return a > b
+            case '>=':
+                return a >= b
+        raise _Unsupported(f"unknown operator '{op}'")
+
+    @staticmethod
+    def _promote(int_type: _IntType) -> _IntType:
+        if int_type.is_bool or int_type.size < _INT.size:
+            return _INT
+        return int_type
+
+    def _common_type(self, left: _IntType, right: _IntType) -> _IntType:
+        left = self._promote(left)
+        right = self._promote(right)
+        if left.signed == right.signed:
+            return left if left.size >= right.size else right
+        unsigned, signed = (left, right) if right.signed else (right, left)
+        if unsigned.size >= signed.size:
+            return unsigned
+        return signed
+
+    # Result
+
+    def make_result(self, result, settings: Optional[EvalSettings], expr: str) -> lldb.SBValue:
+        eval_settings = settings or EvalSettings()
+        name = eval_settings.name if eval_settings.name is not None else expr
+
+        if isinstance(result, _LValue):
+            value = result.value
+            value = self.ctx.CreateValueFromAddress(name, self._load_address(value), value.GetType())
+        elif isinstance(result, _Pointer):
+            if result.pointer_type is None:
+                raise _Unsupported("nullptr result")
+            value = self.ctx.CreateValueFromData(name, self._make_data(result.address, self.pointer_size),
+                                                 result.pointer_type)
+        else:
+            value = self.ctx.CreateValueFromData(name, self._make_data(result.value, result.int_type.size),
+                                                 result.sb_type or self._basic_type_of(result.int_type))
+
+        if not value.IsValid() or value.GetError().Fail():
+            raise _Unsupported("can't create the result value")
+        value.SetPreferDynamicValue(eval_settings.options.GetFetchDynamicValue())
+        value.SetPreferSyntheticValue(True)
+        return value
+
+    def _make_data(self, value: int, size: int) -> lldb.SBData:
+        byte_order = self.target.GetByteOrder()
+        raw = (value & ((1 << (size * 8)) - 1)).to_bytes(size, 'big' if byte_order == lldb.eByteOrderBig else 'little')
+        error = lldb.SBError()
+        data = lldb.SBData()
+        data.SetData(error, raw, byte_order, self.pointer_size)
+        if error.Fail():
+            raise _Unsupported(f"can't create data: {error}")
+        return data
+
+    def _basic_type_of(self, int_type: _IntType) -> lldb.SBType:
+        if int_type.is_bool:
+            basic_type = lldb.eBasicTypeBool
+        elif int_type.size == 1:
+            basic_type = lldb.eBasicTypeSignedChar if int_type.signed else lldb.eBasicTypeUnsignedChar
+        elif int_type.size == 2:
+            basic_type = lldb.eBasicTypeShort if int_type.signed else lldb.eBasicTypeUnsignedShort
+        elif int_type.size == 4:
+            basic_type = lldb.eBasicTypeInt if int_type.signed else lldb.eBasicTypeUnsignedInt
+        elif int_type.size == self.long_size:
+            basic_type = lldb.eBasicTypeLong if int_type.signed else lldb.eBasicTypeUnsignedLong
+        else:
+            basic_type = lldb.eBasicTypeLongLong if int_type.signed else lldb.eBasicTypeUnsignedLongLong
+
+        sb_type = self.target.GetBasicType(basic_type)
+        if not sb_type.IsValid() or sb_type.GetByteSize() != int_type.size:
+            raise _Unsupported("no basic type for the result")
+        return sb_type
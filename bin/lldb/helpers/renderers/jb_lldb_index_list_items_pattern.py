@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Tuple
+
+import lldb
+from jb_declarative_formatters.parsers.cpp_parser import CppParser
+from jb_declarative_formatters.type_viz_synthetic_method import SyntheticMethod
+from renderers.jb_lldb_evaluation_utils import EvaluateError
+from renderers.jb_lldb_item_expression import ItemExpression
+from renderers.jb_lldb_logging import log
+from renderers.jb_lldb_utils import eval_expression
+
+_REGEX_IDENT = r"[A-Za-z_]\w*"
+_REGEX_SUBSCRIPT = r"\[[^\[\]$]*\]"
+# The array or the pointer the elements are addressed in: m_impl->data, this->buf[0], ns::table
+_PATTERN_BASE = re.compile(fr"^{_REGEX_IDENT}(?:\s*{_REGEX_SUBSCRIPT})*"
+                           fr"(?:\s*(?:\.|->|::)\s*{_REGEX_IDENT}(?:\s*{_REGEX_SUBSCRIPT})*)*$")
+_PATTERN_MEMBERS = re.compile(fr"^(?:\s*\.\s*{_REGEX_IDENT})*\s*$")
+_PATTERN_MEMBER_NAME = re.compile(_REGEX_IDENT)
+_PATTERN_NUMBER = re.compile(r"^\d\w*$")
+
+_INDEX_VARIABLE = '$i'
+
+
+def _split_top_level(expr: str, operators: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    Split the expression by the binary operators outside of parentheses and subscripts.
+
+    :return: (operator, operand) pairs, the operator of the first operand is empty; None for unsupported syntax
+    """
+    parts = []
+    depth = 0
+    operator = ''
+    start = 0
+    prev_char = ''
+    for pos, char in enumerate(expr):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+            if depth < 0:
+                return None
+        elif depth == 0 and char in operators:
+            next_char = expr[pos + 1] if pos + 1 < len(expr) else ''
+            if char == '-' and next_char == '>':
+                pass
+            elif next_char == '=' or (next_char == char and char in '+-'):
+                # assignments and increments
+                return None
+            elif prev_char and (prev_char.isalnum() or prev_char in ')]_$'):
+                parts.append((operator, expr[start:pos].strip()))
+                operator = char
+                start = pos + 1
+        if not char.isspace():
+            prev_char = char
+    if depth != 0:
+        return None
+    parts.append((operator, expr[start:].strip()))
+    return parts
+
+
+def _parse_affine_index(index_expr: str) -> Optional[Tuple[str, str]]:
+    """
+    Parse the index affine in `$i`: `$i`, `$i + offset`, `offset - $i`, `step * $i + offset`.
+
+    :return: texts of the coefficient and the offset expressions
+    """
+    terms = _split_top_level(CppParser.try_remove_outer_parentheses(index_expr), '+-')
+    if terms is None:
+        return None
+
+    coefficient = None
+    offset_terms = []
+    for sign, term in terms:
+        if _INDEX_VARIABLE not in term:
+            offset_terms.append(f"{sign}({term})")
+            continue
+        if coefficient is not None:
+            return None
+        factors = _split_top_level(CppParser.try_remove_outer_parentheses(term), '*/%')
+        if factors is None or any(operator not in ('', '*') for operator, _ in factors):
+            # the division and the remainder truncate, the coefficient of the index isn't constant
+            return None
+        factor_texts = [factor for _, factor in factors]
+        index_factors = [factor for factor in factor_texts if _INDEX_VARIABLE in factor]
+        if len(index_factors) != 1 or CppParser.try_remove_outer_parentheses(index_factors[0]) != _INDEX_VARIABLE:
+            return None
+        other_factors = [f"({factor})" for factor in factor_texts if factor is not index_factors[0]]
+        coefficient = f"{'-' if sign == '-' else ''}({'*'.join(other_factors) or '1'})"
+
+    if coefficient is None:
+        return None
+    return coefficient, ''.join(offset_terms) or '0'
+
+
+def _split_modulo(index_expr: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Split the index `affine % modulo` where the remainder is the outermost operator and the modulo is
+    a primary expression.
+
+    :return: the affine part and the modulo, the modulo is None if there is no remainder;
+             (None, None) if the remainder isn't the outermost operator
+    """
+    index_expr = CppParser.try_remove_outer_parentheses(index_expr)
+    terms = _split_top_level(index_expr, '+-')
+    if terms is None or len(terms) != 1:
+        return index_expr, None
+    factors = _split_top_level(index_expr, '*/%')
+    if factors is None or all(operator != '%' for operator, _ in factors):
+        return index_expr, None
+    if len(factors) != 2:
+        # `%` shares the precedence with `*` and `/`, `$i % n * 2` isn't a remainder of the index
+        return None, None
+
+    (_, affine), (_, modulo) = factors
+    if _INDEX_VARIABLE in modulo:
+        return None, None
+    if not _PATTERN_BASE.match(modulo) and not _PATTERN_NUMBER.match(modulo) and \
+            not CppParser.is_outer_parentheses_balanced(modulo):
+        return None, None
+    return affine, modulo
+
+
+class IndexListItemsPattern(object):
+    """
+    The `<ValueNode>` expression of IndexListItems that addresses the elements of an array by the index affine
+    in `$i`, optionally modulo a value: `data[$i]`, `buf[(head + $i) % capacity]`, `ptr[$i].value`.
+    """
+
+    def __init__(self, base: str, coefficient: str, offset: str, modulo: Optional[str], members: List[str]):
+        self.base = base
+        self.coefficient = coefficient
+        self.offset = offset
+        self.modulo = modulo
+        self.members = members
+
+    @classmethod
+    def parse(cls, expression: str) -> Optional[IndexListItemsPattern]:
+        expression = CppParser.simplify_cpp_expression(expression)
+        index_pos = expression.find(_INDEX_VARIABLE)
+        if index_pos == -1 or expression.find(_INDEX_VARIABLE, index_pos + 1) != -1:
+            return None
+
+        # the subscript the index is in
+        depth = 0
+        open_pos = index_pos
+        while open_pos > 0:
+            open_pos -= 1
+            char = expression[open_pos]
+            if char in ')]':
+                depth += 1
+            elif char in '([':
+                if depth > 0:
+                    depth -= 1
+                elif char == '[':
+                    break
+        else:
+            return None
+        close_pos = open_pos
+        depth = 0
+        for close_pos in range(open_pos, len(expression)):
+            char = expression[close_pos]
+            if char in '([':
+                depth += 1
+            elif char in ')]':
+                depth -= 1
+                if depth == 0:
+                    break
+        if expression[close_pos] != ']':
+            return None
+
+        base = expression[:open_pos].strip()
+        members_expr = expression[close_pos + 1:]
+        if not _PATTERN_MEMBERS.match(members_expr):
+            return None
+        if not _PATTERN_BASE.match(base) and not CppParser.is_outer_parentheses_balanced(base):
+            return None
+
+        index_expr, modulo = _split_modulo(expression[open_pos + 1:close_pos])
+        if index_expr is None:
+            return None
+
+        affine_index = _parse_affine_index(index_expr)
+        if affine_index is None:
+            return None
+        coefficient, offset = affine_index
+        return cls(base, coefficient, offset, modulo, _PATTERN_MEMBER_NAME.findall(members_expr))
+
+    def bind(self, ctx_val: lldb.SBValue) -> Optional[BoundIndexListItemsPattern]:
+        """
+        Evaluate the parts of the pattern that don't depend on the index in the context of the value.
+
+        :return: the pattern bound to the value or None if the elements can't be addressed in the memory
+        """
+        try:
+            base_value: lldb.SBValue = eval_expression(ctx_val, self.base)
+            coefficient = self._eval_integer(ctx_val, self.coefficient)
+            offset = self._eval_integer(ctx_val, self.offset)
+            modulo = self._eval_integer(ctx_val, self.modulo) if self.modulo is not None else None
+        except EvaluateError as e:
+            log("IndexListItems pattern '{}' can't be bound: {}", self.base, e)
+            return None
+        if modulo is not None and modulo <= 0:
+            return None
+
+        base_non_synth: lldb.SBValue = base_value.GetNonSyntheticValue()
+        base_type: lldb.SBType = base_non_synth.GetType()
+        if base_type.IsPointerType():
+            elem_type = base_type.GetPointeeType()
+            base_pointer = base_non_synth
+        elif base_type.IsArrayType():
+            elem_type = base_type.GetArrayElementType()
+            base_pointer = ItemExpression.array_address_of(base_non_synth)
+        else:
+            # a class with the subscript operator
+            return None
+        elem_byte_size = elem_type.GetByteSize()
+        if elem_byte_size == 0 or not base_pointer.IsValid() or base_pointer.GetValueAsUnsigned() == 0:
+            return None
+
+        member_offset = 0
+        item_type = elem_type
+        for member_name in self.members:
+            member = _find_field(item_type, member_name)
+            if member is None:
+                return None
+            member_offset += member.GetOffsetInBytes()
+            item_type = member.GetType()
+
+        return BoundIndexListItemsPattern(base_pointer, elem_byte_size, coefficient, offset, modulo,
+                                          member_offset, item_type)
+
+    @staticmethod
+    def _eval_integer(ctx_val: lldb.SBValue, expr: str) -> int:
+        value: lldb.SBValue = eval_expression(ctx_val, f"(long long)({expr})")
+        error: lldb.SBError = value.GetError()
+        if error.Fail():
+            raise EvaluateError(str(error))
+        return value.GetValueAsSigned()
+
+
+def _find_field(struct_type: lldb.SBType, name: str) -> Optional[lldb.SBTypeMember]:
+    struct_type = struct_type.GetCanonicalType()
+    for i in range(struct_type.GetNumberOfFields()):
+        field: lldb.SBTypeMember = struct_type.GetFieldAtIndex(i)
+        if field.GetName() == name:
+            return field if not field.IsBitfield() else None
+    return None
+
+
+class BoundIndexListItemsPattern(object):
+    def __init__(self, base_pointer: lldb.SBValue, elem_byte_size: int, coefficient: int, offset: int,
+                 modulo: Optional[int], member_offset: int, item_type: lldb.SBType):
+        self.base_pointer = base_pointer
+        self.elem_byte_size = elem_byte_size
+        self.coefficient = coefficient
+        self.offset = offset
+        self.modulo = modulo
+        self.member_offset = member_offset
+        self.item_type = item_type
+
+    def create_item(self, ctx_val: lldb.SBValue, expression: str, idx: int, name: str,
+                    element_getter: Optional[SyntheticMethod]) -> Optional[lldb.SBValue]:
+        """
+        :return: the item at the address computed by the pattern, None if the index is out of its domain
+        """
+        elem_index = self.coefficient * idx + self.offset
+        if self.modulo is not None:
+            if elem_index < 0:
+                # C++ remainder of negative values differs
+                return None
+            elem_index %= self.modulo
+
+        item = self.base_pointer.CreateChildAtOffset(name, elem_index * self.elem_byte_size + self.member_offset,
+                                                     self.item_type)
+        if not item.IsValid():
+            return None
+        getter_call = element_getter.method_call([str(idx)]) if element_getter is not None else None
+        ItemExpression.update_item_expression(item, ctx_val, expression.replace(_INDEX_VARIABLE, str(idx)), getter_call)
+        return item
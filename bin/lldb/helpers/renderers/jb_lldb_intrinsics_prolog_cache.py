@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import hashlib
 from typing import Sequence
 
 import lldb
 from jb_declarative_formatters.type_viz_intrinsic import TypeVizIntrinsic, IntrinsicsScope
 from renderers.jb_lldb_cache import LLDBCache
 from renderers.jb_lldb_logging import log
+from renderers.jb_lldb_natvis_cache import load_intrinsics_validation, store_intrinsics_validation
 from renderers.jb_lldb_evaluation_utils import EvaluateError, prepare_default_lldb_expression_options, resolve_type_wildcards
 
 
@@ -15,6 +17,8 @@ class IntrinsicsPrologCache:
     a specific type in the current module before the expression is evaluated.
     It caches the calculated prologs and clears them when
     modules are loaded or unloaded, and when new symbols are loaded.
+    The intrinsics are validated by a single probe expression, and the outcome of the validation is persisted
+    across debugger sessions by the module UUID, the type name and the hash of the probe.
     """
     _lldb_cache = LLDBCache("lldb.IntrinsicsPrologCache",
                             lldb.SBTarget.eBroadcastBitModulesLoaded |
@@ -46,36 +50,24 @@ class IntrinsicsPrologCache:
 
         return True, None
 
-    @classmethod
-    def _fill_intrinsic_list_from_scope(cls, lldb_val: lldb.SBValue, scope: IntrinsicsScope | None,
-                                        skip_unused: bool, result_intrinsics: list[TypeVizIntrinsic]) -> None:
+    @staticmethod
+    def _collect_validation_candidates(scope: IntrinsicsScope | None, skip_unused: bool,
+                                       candidates: list[TypeVizIntrinsic]) -> None:
         if not scope:
             return
 
         for intrinsic in scope.sorted_list:
             if skip_unused and not intrinsic.is_used:
                 continue  # like VS, we can skip the global intrinsic
-
-            dependencies_init_code = cls._build_prolog_from_intrinsic_list(result_intrinsics)
-            intrinsic_check_code = intrinsic.get_code_for_validate(dependencies_init_code)
-            if not intrinsic_check_code:
+            if not intrinsic.get_code_for_validate(''):
                 continue
+            candidates.append(intrinsic)
 
-            code = resolve_type_wildcards(f"{intrinsic_check_code}; 1", cls._type_wildcards)
-            result: lldb.SBValue = lldb_val.EvaluateExpression(code, prepare_default_lldb_expression_options())
-
-            success, error = cls._validate_error(result)
-            if not success:
-                type_name = lldb_val.GetTypeName()
-                if intrinsic.optional:
-                    log("Ignoring error on evaluating optional the intrinsic '{}' with expression '{}' on object '{}'."
-                        " Error: {}",
-                        intrinsic.name, intrinsic.expression, type_name, str(error))
-                    continue
-                log("Error on evaluating the intrinsic '{}' with expression '{}' on object '{}'. Error: {}",
-                    intrinsic.name, intrinsic.expression, type_name, str(error))
-                raise EvaluateError(error)
-
+    @staticmethod
+    def _get_accepted_intrinsics(candidates: list[TypeVizIntrinsic], accepted: list[int]) -> list[TypeVizIntrinsic]:
+        result_intrinsics: list[TypeVizIntrinsic] = []
+        for index in accepted:
+            intrinsic = candidates[index]
             replaced = False
             for idx, item in enumerate(result_intrinsics):
                 if intrinsic.name == item.name:
@@ -83,17 +75,106 @@ class IntrinsicsPrologCache:
                     replaced = True
             if not replaced:
                 result_intrinsics.append(intrinsic)
+        return result_intrinsics
 
     @classmethod
-    def _prepare_intrinsics_prolog(cls, val: lldb.SBValue) -> str:
-        type_intrinsics: list[TypeVizIntrinsic] = []
+    def _build_probe_code(cls, candidates: list[TypeVizIntrinsic], accepted: list[int], pending: list[int]) -> str:
+        # The intrinsics are macros, so a definition is visible to all the checks following it in the probe
+        code = [cls._build_prolog_from_intrinsic_list(cls._get_accepted_intrinsics(candidates, accepted))]
+        for index in pending:
+            intrinsic = candidates[index]
+            code.append(f"{intrinsic.get_code_for_validate('')};")
+            code.append(f"\n#undef {intrinsic.INTRINSIC_NAME_PREFIX}{intrinsic.name}")
+            code.append(intrinsic.get_definition_code())
+        code.append("1")
+        return resolve_type_wildcards('\n'.join(code), cls._type_wildcards)
 
-        cls._fill_intrinsic_list_from_scope(val, cls._global_intrinsic_scope,
-                                            skip_unused=True, result_intrinsics=type_intrinsics)
-        cls._fill_intrinsic_list_from_scope(val, cls._type_intrinsic_scope,
-                                            skip_unused=False, result_intrinsics=type_intrinsics)
+    @classmethod
+    def _evaluate_probe(cls, lldb_val: lldb.SBValue, code: str) -> tuple[bool, lldb.SBError | None, bool]:
+        """
+        :return: success, error, whether the outcome depends only on the code
+        """
+        result: lldb.SBValue = lldb_val.EvaluateExpression(code, prepare_default_lldb_expression_options())
+        success, error = cls._validate_error(result)
+        return success, error, result is not None
 
-        return cls._build_prolog_from_intrinsic_list(type_intrinsics)
+    @classmethod
+    def _validate_intrinsics(cls, lldb_val: lldb.SBValue, candidates: list[TypeVizIntrinsic],
+                             probe_code: str) -> tuple[tuple[int, ...], str | None, bool]:
+        """
+        Validate all the intrinsics with a single probe expression. If it fails, the first failed intrinsic
+        is found by bisection: the checks of the intrinsics preceding it compile in the same probe.
+
+        :return: indexes of the accepted intrinsics, error of the failed required intrinsic or None,
+                 whether the outcome may be persisted
+        """
+        accepted: list[int] = []
+        pending = list(range(len(candidates)))
+        persistable = True
+        while pending:
+            success, error, is_definite = cls._evaluate_probe(lldb_val, probe_code)
+            persistable = persistable and is_definite
+            if success:
+                accepted.extend(pending)
+                break
+
+            passed_count, failed_count = 0, len(pending)
+            while failed_count - passed_count > 1:
+                middle = (passed_count + failed_count) // 2
+                middle_success, middle_error, is_definite = cls._evaluate_probe(
+                    lldb_val, cls._build_probe_code(candidates, accepted, pending[:middle]))
+                persistable = persistable and is_definite
+                if middle_success:
+                    passed_count = middle
+                else:
+                    failed_count, error = middle, middle_error
+
+            accepted.extend(pending[:passed_count])
+            intrinsic = candidates[pending[passed_count]]
+            type_name = lldb_val.GetTypeName()
+            if not intrinsic.optional:
+                log("Error on evaluating the intrinsic '{}' with expression '{}' on object '{}'. Error: {}",
+                    intrinsic.name, intrinsic.expression, type_name, str(error))
+                return tuple(accepted), str(error), persistable
+
+            log("Ignoring error on evaluating optional the intrinsic '{}' with expression '{}' on object '{}'."
+                " Error: {}",
+                intrinsic.name, intrinsic.expression, type_name, str(error))
+            pending = pending[passed_count + 1:]
+            if pending:
+                probe_code = cls._build_probe_code(candidates, accepted, pending)
+
+        return tuple(accepted), None, persistable
+
+    @classmethod
+    def _prepare_intrinsics_prolog(cls, val: lldb.SBValue) -> str:
+        candidates: list[TypeVizIntrinsic] = []
+        cls._collect_validation_candidates(cls._global_intrinsic_scope, skip_unused=True, candidates=candidates)
+        cls._collect_validation_candidates(cls._type_intrinsic_scope, skip_unused=False, candidates=candidates)
+        if not candidates:
+            return ''
+
+        probe_code = cls._build_probe_code(candidates, [], list(range(len(candidates))))
+        module_uuid = val.GetFrame().GetModule().GetUUIDString() or ''
+        persistent_key = None
+        if module_uuid:
+            optional_flags = ''.join('1' if intrinsic.optional else '0' for intrinsic in candidates)
+            code_hash = hashlib.sha256(f'{optional_flags}\n{probe_code}'.encode('utf-8')).hexdigest()
+            persistent_key = (module_uuid, val.GetTypeName(), code_hash)
+
+        outcome = load_intrinsics_validation(persistent_key) if persistent_key else None
+        if outcome is None:
+            accepted, error, persistable = cls._validate_intrinsics(val, candidates, probe_code)
+            if persistent_key and persistable:
+                store_intrinsics_validation(persistent_key, (accepted, error))
+        else:
+            accepted, error = outcome
+            log("Intrinsics validation outcome for '{}' is loaded from the cache", val.GetTypeName())
+
+        if error is not None:
+            raise EvaluateError(error)
+
+        return cls._build_prolog_from_intrinsic_list(cls._get_accepted_intrinsics(candidates, list(accepted)))
 
     @classmethod
     def update_current_intrinsics_scope(cls, global_intrinsic_scope: IntrinsicsScope | None,
@@ -116,11 +197,11 @@ class IntrinsicsPrologCache:
         cls._type_wildcards = cls._previous_type_wildcards
 
     @classmethod
-    def add_intrinsics_prolog(cls, val: lldb.SBValue, expression: str) -> str:
+    def get_intrinsics_prolog(cls, val: lldb.SBValue) -> str:
         has_global_intrinsics = bool(cls._global_intrinsic_scope and cls._global_intrinsic_scope.sorted_list)
         has_type_intrinsics = bool(cls._type_intrinsic_scope and cls._type_intrinsic_scope.sorted_list)
         if not has_global_intrinsics and not has_type_intrinsics:
-            return expression
+            return ''
 
         current_module_path = val.GetFrame().GetModule().GetPlatformFileSpec().fullpath or ''
         current_process = val.GetProcess()
@@ -132,6 +213,14 @@ class IntrinsicsPrologCache:
             intrinsic_prolog = resolve_type_wildcards(intrinsic_prolog_raw, cls._type_wildcards)
             cls._lldb_cache.set_for_process(current_process, cache_key, intrinsic_prolog)
 
+        return intrinsic_prolog
+
+    @classmethod
+    def add_intrinsics_prolog(cls, val: lldb.SBValue, expression: str) -> str:
+        return cls.add_prolog(cls.get_intrinsics_prolog(val), expression)
+
+    @staticmethod
+    def add_prolog(intrinsic_prolog: str, expression: str) -> str:
         if intrinsic_prolog:
             expression = f"{intrinsic_prolog}\n\n{expression}"
 
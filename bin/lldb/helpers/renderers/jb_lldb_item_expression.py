@@ -235,6 +235,35 @@ class ItemExpression:
         if non_synthetic.IsValid():
             cls._save_item_expression(non_synthetic, cls.INVALID_EXPRESSION)
 
+    @classmethod
+    def get_context_reference(cls, context_value: lldb.SBValue) -> Optional[str]:
+        """
+        :return: the reference the item expressions of the context value are built on, None if the value is invalid
+        """
+        non_synthetic_context_value: lldb.SBValue = context_value.GetNonSyntheticValue()
+        if not non_synthetic_context_value.IsValid():
+            return None
+        return cls._get_this_reference(non_synthetic_context_value)
+
+    @classmethod
+    def update_subscript_item_expression(cls, item_value: lldb.SBValue, context_reference: Optional[str], index: int,
+                                         getter_call: Optional[SyntheticMethod.Call] = None):
+        """
+        Same as `update_item_expression` with the `[index]` expression, the context reference is got once
+        by `get_context_reference` for all the items.
+        """
+        non_synthetic_item_value: lldb.SBValue = item_value.GetNonSyntheticValue()
+        if context_reference is None or not non_synthetic_item_value.IsValid():
+            return
+
+        if context_reference == cls.INVALID_EXPRESSION:
+            cls._save_item_expression(non_synthetic_item_value, cls._as_raw_reference(non_synthetic_item_value))
+            return
+        if getter_call is not None:
+            cls._save_item_expression(non_synthetic_item_value, getter_call.make_call_expr(context_reference))
+            return
+        cls._save_item_expression(non_synthetic_item_value, f"{context_reference}[{index}]")
+
     @classmethod
     def update_item_expression(cls, item_value: lldb.SBValue, context_value: lldb.SBValue, expression: str,
                                getter_call: Optional[SyntheticMethod.Call] = None):
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import lldb
+from renderers.jb_lldb_declarative_formatters_options import get_memory_cache_budget
+from renderers.jb_lldb_logging import log
+
+MEMORY_PAGE_SIZE = 4096
+
+
+class _PagesForProcess(object):
+    def __init__(self, stop_id: int):
+        self.stop_id = stop_id
+        # page index -> content of the page, None for the pages that can't be read
+        self.pages: OrderedDict[int, Optional[bytes]] = OrderedDict()
+
+
+class ProcessMemoryCache:
+    """
+    ProcessMemoryCache keeps the pages of the process memory read by the renderers at the current stop,
+    so the container headers and the string buffers shared by many values are read from the target once.
+    Missing adjacent pages of a request are read with a single read. The least recently used pages are dropped
+    when the cached pages exceed the byte budget.
+    The pages are keyed by the process and its stop ID counting the expression stops, they are dropped when
+    the stop ID changes and by `jb_renderers_memory_cache invalidate`.
+    """
+    _caches_for_process: dict[int, _PagesForProcess] = {}
+
+    bytes_requested: int = 0
+    bytes_read: int = 0
+    target_reads: int = 0
+    invalidations: int = 0
+
+    @classmethod
+    def read(cls, process: lldb.SBProcess, address: int, size: int, err: lldb.SBError) -> Optional[bytes]:
+        """
+        Read the memory the same way as SBProcess.ReadMemory does.
+
+        :return: the content, it is shorter than the size if the tail can't be read; None if the start can't be read
+        """
+        cls.bytes_requested += size
+        budget = get_memory_cache_budget()
+        first_page = address // MEMORY_PAGE_SIZE
+        last_page = (address + size - 1) // MEMORY_PAGE_SIZE
+        if size <= 0 or not process.IsValid() or (last_page - first_page + 1) * MEMORY_PAGE_SIZE > budget:
+            return cls._read_from_target(process, address, size, err)
+
+        cache_for_process = cls._sync_cache_for_process(process)
+        pages = cache_for_process.pages
+        for start_page, end_page in cls._find_missing_page_runs(pages, first_page, last_page):
+            cls._read_pages(process, pages, start_page, end_page)
+
+        result = bytearray()
+        for page_index in range(first_page, last_page + 1):
+            content = pages[page_index]
+            pages.move_to_end(page_index)
+            if content is None:
+                break
+            result += content
+        cls._trim(pages, budget)
+
+        offset = address - first_page * MEMORY_PAGE_SIZE
+        content = bytes(result[offset:offset + size])
+        if not content:
+            err.SetErrorString("memory read failed for 0x{:x}".format(address))
+            return None
+        return content
+
+    @staticmethod
+    def _find_missing_page_runs(pages: OrderedDict[int, Optional[bytes]], first_page: int,
+                                last_page: int) -> List[Tuple[int, int]]:
+        runs = []
+        for page_index in range(first_page, last_page + 1):
+            if page_index in pages:
+                continue
+            if runs and runs[-1][1] == page_index - 1:
+                runs[-1] = (runs[-1][0], page_index)
+            else:
+                runs.append((page_index, page_index))
+        return runs
+
+    @classmethod
+    def _read_pages(cls, process: lldb.SBProcess, pages: OrderedDict[int, Optional[bytes]], start_page: int,
+                    end_page: int):
+        error = lldb.SBError()
+        count = end_page - start_page + 1
+        content = cls._read_from_target(process, start_page * MEMORY_PAGE_SIZE, count * MEMORY_PAGE_SIZE, error)
+        if content is not None and len(content) == count * MEMORY_PAGE_SIZE:
+            for index in range(count):
+                pages[start_page + index] = content[index * MEMORY_PAGE_SIZE:(index + 1) * MEMORY_PAGE_SIZE]
+            return
+
+        # some of the pages aren't mapped, find them
+        for page_index in range(start_page, end_page + 1):
+            if count == 1:
+                pages[page_index] = None
+                break
+            error.Clear()
+            content = cls._read_from_target(process, page_index * MEMORY_PAGE_SIZE, MEMORY_PAGE_SIZE, error)
+            pages[page_index] = content if content is not None and len(content) == MEMORY_PAGE_SIZE else None
+
+    @classmethod
+    def _read_from_target(cls, process: lldb.SBProcess, address: int, size: int,
+                          err: lldb.SBError) -> Optional[bytes]:
+        cls.target_reads += 1
+        content = process.ReadMemory(address, size, err)
+        if err.Success() and content:
+            cls.bytes_read += len(content)
+            return content
+        if err.Success():
+            err.SetErrorString("memory read failed for 0x{:x}".format(address))
+        return None
+
+    @staticmethod
+    def _trim(pages: OrderedDict[int, Optional[bytes]], budget: int):
+        while len(pages) * MEMORY_PAGE_SIZE > budget:
+            pages.popitem(last=False)
+
+    @classmethod
+    def invalidate(cls, process: Optional[lldb.SBProcess] = None):
+        """
+        Drop the cached pages of the process or of all the processes.
+        """
+        if process is None:
+            if cls._caches_for_process:
+                cls.invalidations += 1
+            cls._caches_for_process = {}
+        elif process.IsValid() and cls._caches_for_process.pop(process.GetUniqueID(), None) is not None:
+            cls.invalidations += 1
+
+    @classmethod
+    def _sync_cache_for_process(cls, process: lldb.SBProcess) -> _PagesForProcess:
+        process_id = process.GetUniqueID()
+        stop_id = process.GetStopID(True)
+        cache_for_process = cls._caches_for_process.get(process_id)
+        if cache_for_process is None or cache_for_process.stop_id != stop_id:
+            if cache_for_process is not None:
+                log("Stop ID of process {} changed, drop {} cached memory pages",
+                    process_id, len(cache_for_process.pages))
+                cls.invalidations += 1
+            cache_for_process = _PagesForProcess(stop_id)
+            cls._caches_for_process[process_id] = cache_for_process
+        return cache_for_process
+
+    @classmethod
+    def trim(cls, budget: int):
+        for cache_for_process in cls._caches_for_process.values():
+            cls._trim(cache_for_process.pages, budget)
+
+    @classmethod
+    def reset_statistics(cls):
+        cls.bytes_requested = 0
+        cls.bytes_read = 0
+        cls.target_reads = 0
+        cls.invalidations = 0
+
+    @classmethod
+    def format_statistics(cls) -> str:
+        cached = sum(len(cache_for_process.pages) for cache_for_process in cls._caches_for_process.values())
+        return 'Memory page cache: {} bytes requested, {} bytes read from the target by {} reads, ' \
+               '{} invalidations, {} cached pages'.format(cls.bytes_requested, cls.bytes_read, cls.target_reads,
+                                                          cls.invalidations, cached)
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import sys
+from typing import Optional, Iterable
+
+from jb_declarative_formatters.parsers.natvis import NATVIS_PARSER_VERSION
+from jb_declarative_formatters.type_viz_storage import TypeVizStorage
+from renderers.jb_lldb_declarative_formatters_options import get_natvis_cache_dir, is_enabled_natvis_cache
+from renderers.jb_lldb_logging import log
+
+# Version of the cache file layout. Bump it on every change of the header or of the way the storage is serialized.
+NATVIS_CACHE_FORMAT_VERSION = 4
+
+_CACHE_FILE_EXTENSION = '.natvis-cache'
+
+# Outcomes of the intrinsics validation, shared by all the natvis files
+_INTRINSICS_VALIDATION_FILE_NAME = 'intrinsics-validation.cache'
+_INTRINSICS_VALIDATION_MAX_ENTRIES = 4096
+
+g_intrinsics_validation_entries: Optional[dict] = None
+
+
+class NatvisCacheEntry(object):
+    """
+    Header of the cache file. It is stored in front of the pickled storage, so the entry can be validated
+    (or listed) without unpickling the whole storage.
+    """
+
+    def __init__(self, path: str, lazy: bool, size: int, mtime_ns: int, content_hash: str):
+        self.format_version = NATVIS_CACHE_FORMAT_VERSION
+        self.parser_version = NATVIS_PARSER_VERSION
+        self.python_version = tuple(sys.version_info[:2])
+        self.path = path
+        self.lazy = lazy
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.content_hash = content_hash
+
+    def as_key(self) -> tuple:
+        return (self.format_version, self.parser_version, self.python_version,
+                self.path, self.lazy, self.size, self.mtime_ns, self.content_hash)
+
+    @staticmethod
+    def from_source_file(filepath: str, lazy: bool) -> NatvisCacheEntry:
+        path = _normalize_path(filepath)
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        return NatvisCacheEntry(path, lazy, stat.st_size, stat.st_mtime_ns, content_hash)
+
+
+def get_source_cache_entry(filepath: str, lazy: bool) -> Optional[NatvisCacheEntry]:
+    """
+    Read the key of the source file before it is parsed, so a storage parsed from the file saved
+    during the parsing is never stored under the key of the new content.
+
+    :return: the entry or None if the cache is disabled or the file can't be read
+    """
+    if not is_enabled_natvis_cache():
+        return None
+
+    # noinspection PyBroadException
+    try:
+        return NatvisCacheEntry.from_source_file(filepath, lazy)
+    except Exception as e:
+        log("Can't read natvis file '{}' for the cache: {}", filepath, e)
+        return None
+
+
+def load_cached_storage(actual_entry: Optional[NatvisCacheEntry]) -> Optional[TypeVizStorage]:
+    if actual_entry is None or not is_enabled_natvis_cache():
+        return None
+
+    filepath = actual_entry.path
+    lazy = actual_entry.lazy
+    # noinspection PyBroadException
+    try:
+        cache_file_path = _get_cache_file_path(actual_entry.path, lazy)
+        if not os.path.isfile(cache_file_path):
+            log("Natvis cache miss for '{}'", filepath)
+            return None
+
+        with open(cache_file_path, 'rb') as f:
+            cached_entry = pickle.load(f)
+            if not isinstance(cached_entry, NatvisCacheEntry) or cached_entry.as_key() != actual_entry.as_key():
+                log("Natvis cache entry for '{}' is outdated", filepath)
+                return None
+            storage = pickle.load(f)
+
+        log("Natvis cache hit for '{}'", filepath)
+        return storage
+
+    except Exception as e:
+        log("Can't load natvis cache entry for '{}': {}", filepath, e)
+        return None
+
+
+def store_cached_storage(entry: Optional[NatvisCacheEntry], storage: TypeVizStorage):
+    """
+    :param entry: the entry got by `get_source_cache_entry` before the storage was parsed
+    """
+    if entry is None or not is_enabled_natvis_cache():
+        return
+
+    filepath = entry.path
+    # noinspection PyBroadException
+    try:
+        cache_file_path = _get_cache_file_path(entry.path, entry.lazy)
+        os.makedirs(os.path.dirname(cache_file_path), exist_ok=True)
+
+        # Write to a temporary file first, so concurrent debugger sessions never observe a partially written entry
+        tmp_file_path = f'{cache_file_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_file_path, 'wb') as f:
+                pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(storage, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file_path, cache_file_path)
+        finally:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+
+        log("Natvis cache entry for '{}' stored into '{}'", filepath, cache_file_path)
+
+    except Exception as e:
+        log("Can't store natvis cache entry for '{}': {}", filepath, e)
+
+
+def load_intrinsics_validation(key: tuple) -> Optional[tuple]:
+    """
+    :return: outcome of the intrinsics validation stored by a previous debugger session or None
+    """
+    if not is_enabled_natvis_cache():
+        return None
+
+    global g_intrinsics_validation_entries
+    if g_intrinsics_validation_entries is None:
+        g_intrinsics_validation_entries = _read_intrinsics_validation_entries()
+    return g_intrinsics_validation_entries.get(key)
+
+
+def store_intrinsics_validation(key: tuple, outcome: tuple):
+    if not is_enabled_natvis_cache():
+        return
+
+    global g_intrinsics_validation_entries
+    # noinspection PyBroadException
+    try:
+        # merge with the entries stored by concurrent debugger sessions
+        entries = _read_intrinsics_validation_entries()
+        entries.pop(key, None)
+        entries[key] = outcome
+        while len(entries) > _INTRINSICS_VALIDATION_MAX_ENTRIES:
+            del entries[next(iter(entries))]
+        g_intrinsics_validation_entries = entries
+
+        cache_file_path = os.path.join(get_natvis_cache_dir(), _INTRINSICS_VALIDATION_FILE_NAME)
+        os.makedirs(os.path.dirname(cache_file_path), exist_ok=True)
+        tmp_file_path = f'{cache_file_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_file_path, 'wb') as f:
+                pickle.dump(_get_intrinsics_validation_header(), f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(entries, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file_path, cache_file_path)
+        finally:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+
+    except Exception as e:
+        log("Can't store intrinsics validation cache: {}", e)
+
+
+def _get_intrinsics_validation_header() -> tuple:
+    return NATVIS_CACHE_FORMAT_VERSION, tuple(sys.version_info[:2])
+
+
+def _read_intrinsics_validation_entries() -> dict:
+    cache_file_path = os.path.join(get_natvis_cache_dir(), _INTRINSICS_VALIDATION_FILE_NAME)
+    if not os.path.isfile(cache_file_path):
+        return {}
+
+    # noinspection PyBroadException
+    try:
+        with open(cache_file_path, 'rb') as f:
+            if pickle.load(f) != _get_intrinsics_validation_header():
+                log("Intrinsics validation cache is outdated")
+                return {}
+            entries = pickle.load(f)
+        return entries if isinstance(entries, dict) else {}
+
+    except Exception as e:
+        log("Can't load intrinsics validation cache: {}", e)
+        return {}
+
+
+def list_cache_entries() -> list[tuple[str, NatvisCacheEntry | None, bool]]:
+    """
+    :return: list of (cache file path, cache entry header or None if it is unreadable, whether the entry is up-to-date)
+    """
+    result = []
+    for cache_file_path in _iterate_cache_files():
+        # noinspection PyBroadException
+        try:
+            with open(cache_file_path, 'rb') as f:
+                cached_entry = pickle.load(f)
+            if not isinstance(cached_entry, NatvisCacheEntry):
+                result.append((cache_file_path, None, False))
+                continue
+        except Exception:
+            result.append((cache_file_path, None, False))
+            continue
+
+        # noinspection PyBroadException
+        try:
+            actual_entry = NatvisCacheEntry.from_source_file(cached_entry.path, cached_entry.lazy)
+            is_up_to_date = actual_entry.as_key() == cached_entry.as_key()
+        except Exception:
+            is_up_to_date = False
+        result.append((cache_file_path, cached_entry, is_up_to_date))
+
+    return result
+
+
+def purge_cache(filepaths: Iterable[str] | None = None) -> int:
+    """
+    Remove cache entries of the given natvis files or all the cache entries (including the intrinsics validation
+    cache) if no files are specified.
+
+    :return: number of removed cache files
+    """
+    if filepaths is None:
+        cache_files = list(_iterate_cache_files())
+        global g_intrinsics_validation_entries
+        g_intrinsics_validation_entries = None
+        cache_files.append(os.path.join(get_natvis_cache_dir(), _INTRINSICS_VALIDATION_FILE_NAME))
+    else:
+        cache_files = [_get_cache_file_path(_normalize_path(filepath), lazy)
+                       for filepath in filepaths for lazy in (False, True)]
+
+    removed = 0
+    for cache_file_path in cache_files:
+        try:
+            os.remove(cache_file_path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _iterate_cache_files() -> Iterable[str]:
+    cache_dir = get_natvis_cache_dir()
+    if not os.path.isdir(cache_dir):
+        return
+    for file_name in sorted(os.listdir(cache_dir)):
+        if file_name.endswith(_CACHE_FILE_EXTENSION):
+            yield os.path.join(cache_dir, file_name)
+
+
+def _normalize_path(filepath: str) -> str:
+    return os.path.normcase(os.path.abspath(filepath))
+
+
+def _get_cache_file_path(normalized_path: str, lazy: bool) -> str:
+    # Lazily and eagerly parsed storages of the same file are cached separately
+    file_name = hashlib.sha256(normalized_path.encode('utf-8')).hexdigest()[:32] + ('.lazy' if lazy else '') + \
+                _CACHE_FILE_EXTENSION
+    return os.path.join(get_natvis_cache_dir(), file_name)
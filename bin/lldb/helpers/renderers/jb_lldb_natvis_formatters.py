@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import bisect
 import re
 from typing import List, Tuple, Sequence, Any, Callable
 
@@ -12,11 +13,14 @@ from jb_declarative_formatters.type_viz_item_nodes import TypeVizItemExecCodeBlo
     TypeVizItemElseIfCodeBlockTypeNode, TypeVizItemLoopCodeBlockTypeNode, TypeVizItemBreakCodeBlockTypeNode, \
     TypeVizItemVariableTypeNode
 from jb_declarative_formatters.type_viz_synthetic_method import SyntheticMethod
+from renderers.jb_lldb_array_items_window import ArrayItemsWindow, ElementSummaryFormatter
 from renderers.jb_lldb_builtin_formatters import StructChildrenProvider
+from renderers.jb_lldb_custom_list_items_compiler import CompiledCustomListItems, CustomListItemsCompiler
 from renderers.jb_lldb_declarative_formatters_options import *
 from renderers.jb_lldb_evaluation_utils import resolve_type_wildcards
 from renderers.jb_lldb_format import overlay_child_format, update_value_dynamic_state, overlay_summary_format
 from renderers.jb_lldb_format_specs import *
+from renderers.jb_lldb_index_list_items_pattern import BoundIndexListItemsPattern, IndexListItemsPattern
 from renderers.jb_lldb_logging import get_suppress_errors
 from renderers.jb_lldb_utils import *
 
@@ -62,34 +66,46 @@ class NatVisDescriptor(AbstractVisDescriptor):
 
     def output_summary_from_children(self, value_non_synth, stream):
         children_provider = self.prepare_children(value_non_synth)
-        num_children = children_provider.num_children()
+        # the summary shows up to 3 children, the 4th one tells whether the last shown child is followed by more
+        num_children, has_more = children_provider.preview_children(4)
 
         stream.output("{")
-        if stream.length > get_max_string_length():
+        if stream.is_budget_exhausted():
             stream.output('...')
         elif num_children == 0:
             stream.output('...')
         else:
             for child_index in range(num_children):
-                child: lldb.SBValue = children_provider.get_child_at_index(child_index)
-                child_non_synth = child.GetNonSyntheticValue()
-                child_name = child_non_synth.GetName() or ''
-                if child_name == RAW_VIEW_ITEM_NAME:
-                    continue
+                # the only child that may be skipped is the raw view, so a hidden child remains unless it's the last one
+                is_last_child = child_index == num_children - 1 and not has_more
+                if (child_index > 2 or stream.is_budget_exhausted()) and not is_last_child:
+                    stream.output(", ...")
+                    break
+
+                child_summary_presenter = children_provider.get_child_summary_presenter(child_index)
+                if child_summary_presenter is not None:
+                    child_name, output_child_summary = child_summary_presenter
+                else:
+                    child: lldb.SBValue = children_provider.get_child_at_index(child_index)
+                    child_non_synth = child.GetNonSyntheticValue()
+                    child_name = child_non_synth.GetName() or ''
+                    if child_name == RAW_VIEW_ITEM_NAME:
+                        continue
+                    output_child_summary = lambda s, c=child_non_synth: s.output_object(c)
                 if child_index != 0:
                     stream.output(", ")
 
-                if child_index > 2 or stream.length > get_max_string_length():
+                if child_index > 2 or stream.is_budget_exhausted():
                     stream.output("...")
                     break
 
                 stream.output(child_name)
                 stream.output("=")
-                if stream.length > get_max_string_length():
+                if stream.is_budget_exhausted():
                     stream.output("...")
                     break
 
-                stream.output_object(child_non_synth)
+                output_child_summary(stream)
 
         stream.output("}")
 
@@ -100,7 +116,6 @@ class NatVisDescriptor(AbstractVisDescriptor):
 
         viz = None
         providers = None
-        start_indexes = None
         matches: Tuple[str, ...] = ()
         level = get_recursion_level()
         if level >= g_max_recursion_level - 1:
@@ -121,8 +136,6 @@ class NatVisDescriptor(AbstractVisDescriptor):
                         try:
                             set_recursion_level(level + 1)
                             providers = _try_create_child_providers(value_non_synth, viz, type_viz_name, self.type_name_template)
-                            if providers:
-                                start_indexes = _calculate_child_providers_start_indexes(providers)
                         finally:
                             set_recursion_level(level)
                             IntrinsicsPrologCache.rollback_current_intrinsics_scope()
@@ -136,17 +149,18 @@ class NatVisDescriptor(AbstractVisDescriptor):
             log("No child provider found for '{}'", value_non_synth.GetType().GetName())
             return StructChildrenProvider(value_non_synth)
 
-        return NatVisChildrenProvider(value_non_synth, viz, providers, start_indexes, matches)
+        return NatVisChildrenProvider(value_non_synth, viz, providers, matches)
 
 
 class NatVisChildrenProvider(AbstractChildrenProvider):
     def __init__(self, value_non_synth: lldb.SBValue, viz: TypeViz, providers: list[AbstractChildrenProvider],
-                 child_providers_start_indexes: list[int], wildcards: Sequence[str]):
+                 wildcards: Sequence[str]):
         self.viz: TypeViz = viz
         self.child_providers: list[AbstractChildrenProvider] = providers
-        self.child_providers_start_indexes: list[int] = child_providers_start_indexes
         self.format_spec: int = value_non_synth.GetFormat()
         self.wildcards = wildcards
+        # end indexes of the first providers whose children are all counted, the others are previewed on lookups
+        self._child_providers_end_indexes: list[int] = []
 
     def num_children(self):
         return sum(child_prov.num_children() for child_prov in self.child_providers)
@@ -179,6 +193,10 @@ class NatVisChildrenProvider(AbstractChildrenProvider):
             return None
 
         child_provider, relative_index = self._find_child_provider(index)
+        if not child_provider:
+            # the child of a later page of a container without size
+            self.request_children(index + 1)
+            child_provider, relative_index = self._find_child_provider(index)
         if not child_provider:
             return None
 
@@ -201,33 +219,70 @@ class NatVisChildrenProvider(AbstractChildrenProvider):
         finally:
             IntrinsicsPrologCache.rollback_current_intrinsics_scope()
 
+    def request_children(self, max_children: int) -> ChildrenProviderUpdateResult:
+        change = ChildrenProviderUpdateResult.NONE
+        start_index = 0
+        for child_provider in self.child_providers:
+            if start_index >= max_children:
+                break
+            change |= child_provider.request_children(max_children - start_index)
+            start_index += child_provider.num_children()
+        if ChildrenProviderUpdateResult.SIZE_UPDATED in change:
+            self._child_providers_end_indexes = []
+        return change
+
+    def preview_children(self, max_children: int) -> Tuple[int, bool]:
+        num_children = 0
+        for child_provider in self.child_providers:
+            num_provider_children, has_more = child_provider.preview_children(max_children - num_children)
+            num_children += num_provider_children
+            if has_more:
+                return num_children, True
+        return num_children, False
+
+    def get_child_summary_presenter(self, index: int) -> Optional[Tuple[str, Callable[[Stream], None]]]:
+        if not self.child_providers or self.format_spec & eFormatBasicSpecsMask != lldb.eFormatDefault:
+            return None
+
+        child_provider, relative_index = self._find_child_provider(index)
+        if not child_provider:
+            return None
+
+        # noinspection PyBroadException
+        try:
+            return child_provider.get_child_summary_presenter(relative_index)
+        except Exception:
+            # some unexpected error happened
+            if not get_suppress_errors():
+                raise
+            return None
+
     def try_update_size(self, value_non_synth: lldb.SBValue) -> ChildrenProviderUpdateResult:
         old_size = self.num_children()
         change = ChildrenProviderUpdateResult.NONE
         for child_provider in self.child_providers:
             change |= child_provider.try_update_size(value_non_synth)
-        if ChildrenProviderUpdateResult.SIZE_UPDATED in change:
-            self.child_providers_start_indexes = _calculate_child_providers_start_indexes(self.child_providers)
+        self._child_providers_end_indexes = []
         return ChildrenProviderUpdateResult.SIZE_UPDATED if old_size != self.num_children() else ChildrenProviderUpdateResult.NONE
 
     def _find_child_provider(self, index):
-        # TODO: binary search, not linear
-        for i, start_idx in enumerate(self.child_providers_start_indexes):
-            if start_idx > index:
-                # return previous provider
-                prov_index = i - 1
-                break
-        else:
-            # last provider
-            prov_index = len(self.child_providers) - 1
+        end_indexes = self._child_providers_end_indexes
+        prov_index = bisect.bisect_right(end_indexes, index)
+        child_start_idx = end_indexes[prov_index - 1] if prov_index > 0 else 0
+        if prov_index < len(end_indexes):
+            return self.child_providers[prov_index], (index - child_start_idx)
 
-        if prov_index == -1:
-            return None, index
+        # the providers whose first page isn't calculated yet calculate only the children up to the index
+        for prov in self.child_providers[prov_index:]:
+            num_provider_children, has_more = prov.preview_children(index - child_start_idx + 1)
+            if index - child_start_idx < num_provider_children:
+                return prov, (index - child_start_idx)
+            child_start_idx += num_provider_children
+            if not has_more and prov_index == len(end_indexes):
+                end_indexes.append(child_start_idx)
+            prov_index += 1
 
-        prov = self.child_providers[prov_index]
-        child_start_idx = self.child_providers_start_indexes[prov_index]
-
-        return prov, (index - child_start_idx)
+        return None, index
 
 
 def _match_type_viz_template(type_viz_type_name_template: TypeNameTemplate,
@@ -261,15 +316,13 @@ def _evaluate_interpolated_string_to_stream(stream: Stream,
                                             ctx_val: lldb.SBValue,
                                             wildcards=None,
                                             context=None):
-    max_stream_length = get_max_string_length()
-
     nested_stream = stream.create_nested()
     for (s, expr) in interp_string.parts_list:
-        if nested_stream.length > max_stream_length:
+        if nested_stream.is_budget_exhausted():
             break
         nested_stream.output(s)
         if expr is not None:
-            if nested_stream.length > max_stream_length:
+            if nested_stream.is_budget_exhausted():
                 break
             _eval_display_string_expression(nested_stream, ctx_val, expr, wildcards, context)
 
@@ -331,16 +384,6 @@ def _try_create_child_providers(val_obj_non_synth: lldb.SBValue, viz: TypeViz, t
     return child_providers
 
 
-def _calculate_child_providers_start_indexes(child_providers: list[AbstractChildrenProvider]) -> list[int]:
-    start_idx = 0
-    child_providers_start_indexes = []
-    for prov in child_providers:
-        child_providers_start_indexes.append(start_idx)
-        start_idx += prov.num_children()
-
-    return child_providers_start_indexes
-
-
 def _check_condition(val: lldb.SBValue, condition: Optional[str], context: Optional[EvaluationContext] = None) -> bool:
     if not condition:
         # None or empty - means there is no condition
@@ -625,6 +668,11 @@ class ArrayItemsProvider(AbstractChildrenProvider):
         self.elem_byte_size: int = elem_type.GetByteSize()
         self.wildcards: Sequence[str] = wildcards
         self.element_getter: Optional[SyntheticMethod] = element_getter
+        # the item expressions of all the children are built on the same reference to the value pointer
+        self._value_pointer_reference: Optional[str] = ItemExpression.get_context_reference(value_pointer)
+        # the summaries of the elements of builtin numeric types are formatted from the memory read by windows
+        self._summary_formatter: Optional[ElementSummaryFormatter] = ElementSummaryFormatter.create(elem_type)
+        self._window: Optional[ArrayItemsWindow] = None
 
     def num_children(self):
         return self.size
@@ -640,18 +688,34 @@ class ArrayItemsProvider(AbstractChildrenProvider):
         offset = index * self.elem_byte_size
         child = self.value_pointer.CreateChildAtOffset(child_name, offset, self.elem_type)
         getter_call = self.element_getter.method_call([str(index)]) if self.element_getter is not None else None
-        ItemExpression.update_item_expression(child, self.value_pointer, child_name, getter_call)
+        ItemExpression.update_subscript_item_expression(child, self._value_pointer_reference, index, getter_call)
         return child
 
+    def get_child_summary_presenter(self, index: int) -> Optional[Tuple[str, Callable[[Stream], None]]]:
+        window = self._get_window(index)
+        if window is None:
+            return None
+        presenter = window.get_summary_presenter(index, self._summary_formatter)
+        return ("[{}]".format(index), presenter) if presenter is not None else None
+
+    def _get_window(self, index: int) -> Optional[ArrayItemsWindow]:
+        if self._summary_formatter is None or not is_enabled_array_items_bulk_read() or not 0 <= index < self.size:
+            return None
+        if self._window is None or not self._window.is_valid_for(index, self.value_pointer.GetProcess()):
+            self._window = ArrayItemsWindow.read(self.value_pointer, self.elem_byte_size, index, self.size)
+        return self._window
+
     def try_update_size(self, value_non_synth: lldb.SBValue) -> ChildrenProviderUpdateResult:
         new_provider = _create_array_items_provider(self.items_provider, value_non_synth, self.wildcards)
         if new_provider is None:
             # That probably means that this provider is no longer valid, and we should rebuild all providers. But that should be rare case.
             return ChildrenProviderUpdateResult.NONE
 
+        self._window = None
         old_size = self.size
         self.size = new_provider.size
         self.value_pointer = new_provider.value_pointer
+        self._value_pointer_reference = new_provider._value_pointer_reference
         assert self.elem_type == new_provider.elem_type
         self.elem_type = new_provider.elem_type
         self.elem_byte_size = new_provider.elem_type.GetByteSize()
@@ -700,6 +764,8 @@ LIST_ITEM_SUBSCRIPT_INDEX_REGEX = re.compile(r'\s*\[\s*\$i\s*]\s*')
 
 g_cache_subscript_is_missing = dict[str, dict[str, str]]()
 
+g_cache_index_list_items_patterns = dict[str, Optional[IndexListItemsPattern]]()
+
 
 def _trying_eval_list_item_indexed_value(expression: str, ctx_val: lldb.SBValue, idx: int, name: str,
                                          element_getter: Optional[SyntheticMethod]) -> Tuple[Optional[lldb.SBValue], Optional[str]]:
@@ -786,6 +852,9 @@ class IndexListItemsProvider(AbstractChildrenProvider):
         self.items_provider: TypeVizItemProviderIndexListItems = items_provider
         self.ctx_val: lldb.SBValue = ctx_val
         self.wildcards: Sequence[str] = wildcards
+        # the pattern of the first value node is bound on the first request of an item
+        self._bound_pattern: Optional[BoundIndexListItemsPattern] = None
+        self._is_pattern_bound: bool = False
 
         IndexListItemsProvider.types_with_index_list_items.add(ctx_val.type.name)
 
@@ -800,7 +869,10 @@ class IndexListItemsProvider(AbstractChildrenProvider):
 
     def get_child_at_index(self, index):
         name = "[{}]".format(index)
-        value = None
+        value = self._try_create_item_by_pattern(index, name)
+        if value is not None:
+            return value
+
         for value_node_node in self.items_provider.value_node_nodes:
             element_getter = value_node_node.synthetic_getter or self.items_provider.synthetic_getter
             value = _node_processor_index_list_items_value_node(index, name, value_node_node, self.ctx_val, self.wildcards, element_getter)
@@ -810,8 +882,33 @@ class IndexListItemsProvider(AbstractChildrenProvider):
         # TODO: show some error value on None
         return value
 
+    def _try_create_item_by_pattern(self, index: int, name: str) -> Optional[lldb.SBValue]:
+        if not is_enabled_index_list_items_patterns() or not self.items_provider.value_node_nodes:
+            return None
+        value_node_node = self.items_provider.value_node_nodes[0]
+        if value_node_node.condition:
+            return None
+
+        expression = resolve_type_wildcards(value_node_node.expr.text, self.wildcards)
+        if not self._is_pattern_bound:
+            self._is_pattern_bound = True
+            if expression not in g_cache_index_list_items_patterns:
+                g_cache_index_list_items_patterns[expression] = IndexListItemsPattern.parse(expression)
+            pattern = g_cache_index_list_items_patterns[expression]
+            self._bound_pattern = pattern.bind(self.ctx_val) if pattern is not None else None
+        if self._bound_pattern is None:
+            return None
+
+        element_getter = value_node_node.synthetic_getter or self.items_provider.synthetic_getter
+        value = self._bound_pattern.create_item(self.ctx_val, expression, index, name, element_getter)
+        if value is None:
+            return None
+        return _apply_value_formatting(value, value_node_node.expr.view_options, self.ctx_val, self.wildcards)
+
     def try_update_size(self, value_non_synth: lldb.SBValue) -> ChildrenProviderUpdateResult:
         old_size = self.size
+        self._bound_pattern = None
+        self._is_pattern_bound = False
         self.size = _calculate_items_provider_size(self.items_provider.size_nodes, self.ctx_val, self.wildcards)
         return ChildrenProviderUpdateResult.SIZE_UPDATED if old_size != self.size else ChildrenProviderUpdateResult.NONE
 
@@ -856,23 +953,42 @@ class NodesProvider(object):
         self._next_node_index: int = 0
         self.cache: list[Optional[lldb.SBValue]] = []
         self.cache_size: int = 0
+        # whether the container without size has more nodes than calculated
         self.has_more: bool = False
+        self._max_num_children: int = 0
         self.names: Optional[list[str]] = None
         self.name2index: Optional[dict[str, int]] = None
+        # index of the first node that repeats a node before it, the nodes are not walked further
+        self.cycle_index: Optional[int] = None
+        # the first page of the container without size is walked when the children are requested,
+        # the summary walks only the nodes it shows
+        self._first_page_pending: bool = False
+        self._synthetic_getter_ctx: Optional[lldb.SBValue] = None
 
     def ensure_node_calculated(self, index: int) -> None:
         cached_node = self.cache[index]
         if cached_node is None:
             self._calculate_cached_nodes(index)
             cached_node = self.cache[index]
-            ItemExpression.copy_item_expression(self._ctx_val, cached_node)
+            if cached_node is not None:
+                ItemExpression.copy_item_expression(self._ctx_val, cached_node)
+
+    def create_cycle_diagnostic(self) -> lldb.SBValue:
+        return _create_diagnostic_value(self._ctx_val, CYCLE_DIAGNOSTIC_ITEM_NAME,
+                                        "cycle detected at index {}".format(self.cycle_index))
 
     def update_cache_for_synthetic_getter(self, this_ctx: lldb.SBValue,
                                           type_viz_node: TypeVizItemSyntheticGetterNodeMixin) -> None:
         if type_viz_node.synthetic_getter is not None:
-            for cached_node in self.cache:
-                if cached_node is not None:
-                    ItemExpression.copy_item_expression(this_ctx, cached_node)
+            self._synthetic_getter_ctx = this_ctx
+            self._copy_synthetic_getter_item_expression()
+
+    def _copy_synthetic_getter_item_expression(self) -> None:
+        if self._synthetic_getter_ctx is None:
+            return
+        for cached_node in self.cache:
+            if cached_node is not None:
+                ItemExpression.copy_item_expression(self._synthetic_getter_ctx, cached_node)
 
     def _prepare_cache(self, known_size: Optional[int]) -> None:
         if known_size is not None:
@@ -883,15 +999,57 @@ class NodesProvider(object):
             return
 
         self.cache = []
-        self._calculate_cached_nodes(g_max_num_children)
-        self._has_more = self._has_non_calculated_nodes() and self._next_node_index > g_max_num_children
-        self.cache_size = len(self.cache)
+        self.has_more = True
+        self._max_num_children = get_max_num_children(self._ctx_val.GetTypeName())
+        self._first_page_pending = True
+
+    def ensure_first_page(self) -> None:
+        if not self._first_page_pending:
+            return
+        self._first_page_pending = False
+        self.extend_cache(get_num_children_page_size())
+        self._copy_synthetic_getter_item_expression()
+
+    def extend_first_nodes(self, num_children: int) -> None:
+        """
+        Walk up to `num_children` first nodes of the container without size if its first page isn't walked yet.
+        """
+        if self._first_page_pending:
+            self.extend_cache(num_children)
+
+    def extend_cache(self, num_children: int) -> bool:
+        """
+        Walk the nodes of the container without size until there are `num_children` of them.
+
+        :return: whether the number of the calculated nodes changed
+        """
+        num_children = min(num_children, self._max_num_children)
+        if not self.has_more or num_children <= self.cache_size:
+            return False
+
+        # one more node tells whether the container has more nodes
+        self._calculate_cached_nodes(num_children)
+        if self.cycle_index is not None:
+            del self.cache[self.cycle_index:]
+        self.has_more = len(self.cache) > num_children
+        old_size = self.cache_size
+        self.cache_size = min(len(self.cache), num_children)
+        if self._first_page_pending:
+            self._copy_synthetic_getter_item_expression()
+        return old_size != self.cache_size
+
+    def has_more_nodes(self) -> bool:
+        """
+        :return: whether the container without size has more nodes to show than calculated
+        """
+        return self.cycle_index is None and self.has_more and self.cache_size < self._max_num_children
 
     def _set_calculated_node(self, next_value: lldb.SBValue) -> None:
         self._process_node_name(next_value, self._next_node_index)
         if self._next_node_index < len(self.cache):
-            assert self.cache[self._next_node_index] is None
-            self.cache[self._next_node_index] = next_value
+            # the node may be already created by a walk from the end of the container
+            if self.cache[self._next_node_index] is None:
+                self.cache[self._next_node_index] = next_value
         else:
             assert self._next_node_index == len(self.cache)
             self.cache.append(next_value)
@@ -900,6 +1058,19 @@ class NodesProvider(object):
     def _process_node_name(self, node: lldb.SBValue, index: int) -> None:
         pass
 
+    def _stop_at_cycle(self, cycle_index: int) -> None:
+        """
+        Stop the walk of the nodes and drop the calculated nodes from the cycle index on.
+        """
+        log("Cycle detected at node {} of '{}'", cycle_index, self._ctx_val.GetTypeName())
+        self.cycle_index = cycle_index
+        for index in range(cycle_index, min(self._next_node_index, len(self.cache))):
+            self.cache[index] = None
+        self._next_node_index = min(self._next_node_index, cycle_index)
+        if self.names is not None:
+            del self.names[cycle_index:]
+            self.name2index = {name: index for index, name in enumerate(self.names)}
+
     def _calculate_cached_nodes(self, stop_at: int) -> None:
         raise NotImplementedError
 
@@ -907,6 +1078,26 @@ class NodesProvider(object):
         raise NotImplementedError
 
 
+CYCLE_DIAGNOSTIC_ITEM_NAME = "[Diagnostic]"
+
+
+def _create_diagnostic_value(value: lldb.SBValue, name: str, message: str) -> lldb.SBValue:
+    """
+    Create the child with the message shown as a string, without any evaluation in the target.
+    """
+    target: lldb.SBTarget = value.GetTarget()
+    raw = message.encode('utf-8') + b'\0'
+    error = lldb.SBError()
+    data = lldb.SBData()
+    data.SetData(error, raw, target.GetByteOrder(), target.GetAddressByteSize())
+    char_array_type = target.GetBasicType(lldb.eBasicTypeChar).GetArrayType(len(raw))
+    return value.CreateValueFromData(name, data, char_array_type)
+
+
+class _CycleDetected(Exception):
+    pass
+
+
 class CustomItemsProvider(AbstractChildrenProvider):
     def __init__(self, items_provider: TypeVizItemProviderTreeItems | TypeVizItemProviderLinkedListItems, nodes_provider: NodesProvider,
                  value_expression: str, value_opts: TypeVizFormatOptions, wildcards: Sequence[str],
@@ -921,9 +1112,31 @@ class CustomItemsProvider(AbstractChildrenProvider):
         self.element_getter: Optional[SyntheticMethod] = element_getter
 
     def num_children(self) -> int:
+        self.nodes_provider.ensure_first_page()
+        return self._num_calculated_children()
+
+    def _num_calculated_children(self) -> int:
+        if self.nodes_provider.cycle_index is not None:
+            # the nodes from the cycle on are replaced with the diagnostic child
+            return self.nodes_provider.cycle_index + 1
         return self.nodes_provider.cache_size
 
+    def request_children(self, max_children: int) -> ChildrenProviderUpdateResult:
+        self.nodes_provider.ensure_first_page()
+        if self.nodes_provider.extend_cache(max_children):
+            return ChildrenProviderUpdateResult.SIZE_UPDATED
+        return ChildrenProviderUpdateResult.NONE
+
+    def preview_children(self, max_children: int) -> Tuple[int, bool]:
+        # one node tells whether there are more children even if none is asked for
+        self.nodes_provider.extend_first_nodes(max(max_children, 1))
+        num_children = self._num_calculated_children()
+        return min(num_children, max_children), num_children > max_children or self.nodes_provider.has_more_nodes()
+
     def get_child_index(self, name: str) -> int:
+        self.nodes_provider.ensure_first_page()
+        if name == CYCLE_DIAGNOSTIC_ITEM_NAME and self.nodes_provider.cycle_index is not None:
+            return self.nodes_provider.cycle_index
         if self.nodes_provider.name2index:
             return self.nodes_provider.name2index.get(name, INVALID_CHILD_INDEX)
 
@@ -933,10 +1146,17 @@ class CustomItemsProvider(AbstractChildrenProvider):
             return INVALID_CHILD_INDEX
 
     def get_child_at_index(self, index: int) -> lldb.SBValue:
-        if index < 0 or index >= self.nodes_provider.cache_size:
-            raise IndexError(f"Index {index} is out of range [0; {self.nodes_provider.cache_size})")
+        if self.nodes_provider.cycle_index is None or index < self.nodes_provider.cycle_index:
+            if index < 0 or index >= self.nodes_provider.cache_size:
+                raise IndexError(f"Index {index} is out of range [0; {self.nodes_provider.cache_size})")
+            # the walk to the node may find the cycle before it
+            self.nodes_provider.ensure_node_calculated(index)
+
+        cycle_index = self.nodes_provider.cycle_index
+        if cycle_index is not None and index >= cycle_index:
+            # the nodes after the cycle index may be requested before the cycle is found
+            return self.nodes_provider.create_cycle_diagnostic() if index == cycle_index else None
 
-        self.nodes_provider.ensure_node_calculated(index)
         node_value: Optional[lldb.SBValue] = self.nodes_provider.cache[index]
         if node_value is None:
             raise EvaluateError(f"Node {index} was not evaluated")
@@ -979,23 +1199,199 @@ class LinkedListIterator(object):
         return eval_expression(self.cur_value(), self.next_expression, EvalSettings.with_metadata())
 
 
+class NodeOffsetWalker(object):
+    """
+    Follows the pointers between list or tree nodes with process memory reads, when the pointer expressions are
+    plain members of the node type at fixed offsets. LLDB caches the read memory lines for the current stop.
+    """
+
+    def __init__(self, process: lldb.SBProcess, node_type: lldb.SBType, offsets: List[int]):
+        self.process: lldb.SBProcess = process
+        # the declared pointee type, so the nodes match the natvis types as the dereferenced head pointer does
+        self.node_type: lldb.SBType = node_type
+        self.offsets: List[int] = offsets
+
+    def read_pointer(self, node_address: int, offset: int) -> int:
+        """
+        :return: address of the pointed node, 0 if the pointer is null or the memory is unreadable
+        """
+        err = lldb.SBError()
+        next_address = self.process.ReadPointerFromMemory(node_address + offset, err)
+        return 0 if err.Fail() else next_address
+
+    def create_node_value(self, head_pointer: lldb.SBValue, name: str, node_address: int) -> lldb.SBValue:
+        node_value = head_pointer.CreateValueFromAddress(name, node_address, self.node_type)
+        node_value.SetPreferDynamicValue(lldb.eDynamicDontRunTarget)
+        return node_value
+
+    @classmethod
+    def create(cls, head_pointer: lldb.SBValue, pointer_expressions: List[str]) -> Optional[NodeOffsetWalker]:
+        if any(not CppParser.is_identifier(expression) or expression == 'this' for expression in pointer_expressions):
+            return None
+        head_pointer_non_synth: lldb.SBValue = head_pointer.GetNonSyntheticValue()
+        if not head_pointer_non_synth.IsValid() or head_pointer_non_synth.GetError().Fail():
+            return None
+        process: lldb.SBProcess = head_pointer_non_synth.GetProcess()
+        if not process.IsValid():
+            return None
+
+        pointer_type: lldb.SBType = head_pointer_non_synth.GetType()
+        canonical_pointer_type: lldb.SBType = pointer_type.GetCanonicalType()
+        if not canonical_pointer_type.IsPointerType():
+            return None
+        canonical_node_type: lldb.SBType = canonical_pointer_type.GetPointeeType().GetCanonicalType()
+        if canonical_node_type.GetTypeClass() not in (lldb.eTypeClassStruct, lldb.eTypeClassClass):
+            return None
+        # a typedef of the pointer type has no pointee type
+        node_type: lldb.SBType = pointer_type.GetPointeeType() if pointer_type.IsPointerType() \
+            else canonical_pointer_type.GetPointeeType()
+
+        offsets = []
+        for expression in pointer_expressions:
+            offset = _find_node_pointer_member_offset(canonical_node_type, canonical_node_type, expression)
+            if offset is None:
+                return None
+            offsets.append(offset)
+        return cls(process, node_type, offsets)
+
+
+def _find_node_pointer_member_offset(struct_type: lldb.SBType, node_type: lldb.SBType, name: str) -> Optional[int]:
+    """
+    :return: offset of the unambiguous non-bitfield member of type `node_type *` or None
+    """
+    if struct_type.GetNumberOfVirtualBaseClasses() > 0:
+        return None
+
+    for i in range(struct_type.GetNumberOfFields()):
+        field: lldb.SBTypeMember = struct_type.GetFieldAtIndex(i)
+        if field.GetName() != name:
+            continue
+        if field.IsBitfield():
+            return None
+        field_type: lldb.SBType = field.GetType().GetCanonicalType()
+        if not field_type.IsPointerType() or field_type.GetPointeeType().GetCanonicalType() != node_type:
+            return None
+        return field.GetOffsetInBytes()
+
+    found_offset = None
+    for i in range(struct_type.GetNumberOfDirectBaseClasses()):
+        base: lldb.SBTypeMember = struct_type.GetDirectBaseClassAtIndex(i)
+        base_offset = _find_node_pointer_member_offset(base.GetType().GetCanonicalType(), node_type, name)
+        if base_offset is None:
+            continue
+        if found_offset is not None:
+            return None
+        found_offset = base.GetOffsetInBytes() + base_offset
+    return found_offset
+
+
 class LinkedListNodesProvider(NodesProvider):
+    # whether the value of every visited node is needed, not only of the displayed ones
+    _node_values_required: bool = False
+
     def __init__(self, ctx_val: lldb.SBValue, head_pointer: lldb.SBValue, next_expression: str):
         super().__init__(ctx_val)
         self._iterator = LinkedListIterator(head_pointer, next_expression)
         self._head_node_value = _get_ptr_value(self._iterator.node_value)
 
+        self._walker: Optional[NodeOffsetWalker] = NodeOffsetWalker.create(head_pointer, [next_expression]) \
+            if self._head_node_value else None
+        self._node_addresses: list[int] = []
+        # address of the next node to visit by the walker, 0 if the list is over
+        self._walker_address: int = self._head_node_value
+        self._is_circular_list_over: bool = False
+        # Brent's cycle detection: the node saved at the last power of two step and its index,
+        # the current power of two and the number of the nodes visited since the node was saved
+        self._saved_node_address: int = 0
+        self._saved_node_index: int = 0
+        self._power: int = 1
+        self._steps: int = 0
+
     def _calculate_cached_nodes(self, stop_at: int) -> None:
+        if self._walker is not None:
+            self._calculate_cached_node_addresses(stop_at)
+            return
+
         # iterate list nodes and cache them
         while self._has_non_calculated_nodes() and self._next_node_index <= stop_at:
+            node_address = self._iterator.cur_ptr()
+            if self._is_cycle_closed(node_address):
+                break
+            self._node_addresses.append(node_address)
             next_value = self._iterator.cur_value()
             self._set_calculated_node(next_value)
             self._iterator.move_to_next()
             if self._iterator and _get_ptr_value(self._iterator.node_value) == self._head_node_value:
-                # TODO: This loop detection is not entirely correct
+                # circular list, the last node points to the head
+                self._is_circular_list_over = True
+                break
+
+    def _calculate_cached_node_addresses(self, stop_at: int) -> None:
+        # only node addresses are collected, node values are created for the requested nodes
+        while self._walker_address and self._next_node_index <= stop_at:
+            if self._is_cycle_closed(self._walker_address):
+                self._walker_address = 0
                 break
+            index = self._next_node_index
+            self._node_addresses.append(self._walker_address)
+            node_value = self._create_node_value(index) if self._node_values_required or index == stop_at else None
+            self._set_calculated_node(node_value)
+            self._walker_address = self._walker.read_pointer(self._walker_address, self._walker.offsets[0])
+            if self._walker_address == self._head_node_value:
+                # circular list, the last node points to the head
+                self._walker_address = 0
+
+        if stop_at < len(self._node_addresses) and self.cache[stop_at] is None:
+            self.cache[stop_at] = self._create_node_value(stop_at)
+
+    def _create_node_value(self, index: int) -> lldb.SBValue:
+        if index == 0:
+            return self._iterator.cur_value()
+        return self._walker.create_node_value(self._iterator.node_value, "[{}]".format(index),
+                                              self._node_addresses[index])
+
+    def _is_cycle_closed(self, node_address: int) -> bool:
+        """
+        Brent's cycle detection, the next node is compared with the node saved at the last power of two step.
+
+        :return: True if the node was visited before, the walk is stopped at the first repeated node then
+        """
+        index = len(self._node_addresses)
+        if node_address == self._saved_node_address:
+            self._stop_at_cycle(self._find_cycle_index(node_address, index - self._saved_node_index))
+            return True
+
+        self._steps += 1
+        if self._steps == self._power:
+            self._saved_node_address = node_address
+            self._saved_node_index = index
+            self._power *= 2
+            self._steps = 0
+        return False
+
+    def _find_cycle_index(self, node_address: int, period_multiple: int) -> int:
+        """
+        :return: index of the first node that repeats a node before it
+        """
+        addresses = self._node_addresses
+
+        def address_at(i: int) -> int:
+            return addresses[i] if i < len(addresses) else node_address
+
+        cycle_start = next(i for i in range(len(addresses)) if address_at(i) == address_at(i + period_multiple))
+        cycle_length = next(length for length in range(1, period_multiple + 1)
+                            if address_at(cycle_start + length) == address_at(cycle_start))
+        return cycle_start + cycle_length
+
+    def _stop_at_cycle(self, cycle_index: int) -> None:
+        super()._stop_at_cycle(cycle_index)
+        del self._node_addresses[cycle_index:]
 
     def _has_non_calculated_nodes(self) -> bool:
+        if self.cycle_index is not None or self._is_circular_list_over:
+            return False
+        if self._walker is not None:
+            return self._walker_address != 0
         return bool(self._iterator)
 
 
@@ -1006,6 +1402,8 @@ class LinkedListIndexedNodesProvider(LinkedListNodesProvider):
 
 
 class LinkedListCustomNameNodesProvider(LinkedListNodesProvider):
+    _node_values_required = True
+
     def __init__(self, ctx_val: lldb.SBValue, size: Optional[int], head_pointer: lldb.SBValue, next_expression: str,
                  custom_value_name: TypeVizInterpolatedString, wildcards: Sequence[str]):
         super().__init__(ctx_val, head_pointer, next_expression)
@@ -1083,6 +1481,11 @@ def _process_item_provider_linked_list_items(items_provider: TypeVizItemProvider
 
 
 class BinaryTreeNodesProvider(NodesProvider):
+    # whether the value of every visited node is needed, not only of the displayed ones
+    _node_values_required: bool = False
+    # depth of the parent nodes stack, ~2^100 nodes can't be true - something went wrong
+    _MAX_TREE_DEPTH = 100
+
     def __init__(self, ctx_val: lldb.SBValue, head_pointer: lldb.SBValue, left_expression: str, right_expression: str,
                  node_condition: Optional[str]):
         super().__init__(ctx_val)
@@ -1092,12 +1495,47 @@ class BinaryTreeNodesProvider(NodesProvider):
         self._right_expression: str = right_expression
         self._node_condition: Optional[str] = node_condition
 
+        self._head_pointer: lldb.SBValue = head_pointer
+        head_address = _get_ptr_value(head_pointer)
+        self._walker: Optional[NodeOffsetWalker] = \
+            NodeOffsetWalker.create(head_pointer, [left_expression, right_expression]) if head_address else None
+        # in-order walk by the walker
+        self._node_addresses: List[int] = []
+        self._walker_address: int = head_address
+        self._walker_stack: List[int] = []
+        # reverse in-order walk by the walker, from the last node
+        self._reverse_node_addresses: List[int] = []
+        self._reverse_walker_address: int = head_address
+        self._reverse_walker_stack: List[int] = []
+        self._node_condition_results: dict[int, bool] = {}
+        # every node is descended into once by a walk, a visited node is reached again only by a cycle
+        self._visited_addresses: set[int] = set()
+        self._reverse_visited_addresses: set[int] = set()
+
+    def ensure_node_calculated(self, index: int) -> None:
+        if self._walker is not None and not self._node_values_required and self.cache[index] is None:
+            # with the known size the nodes at the end are reached faster by the walk from the last node
+            index_from_end = len(self.cache) - 1 - index
+            if index_from_end < index - self._next_node_index and self._calculate_node_from_end(index, index_from_end):
+                ItemExpression.copy_item_expression(self._ctx_val, self.cache[index])
+                return
+        super().ensure_node_calculated(index)
+
     def _calculate_cached_nodes(self, stop_at: int) -> None:
+        if self._walker is not None:
+            self._calculate_cached_node_addresses(stop_at)
+            return
+
         # iterate list nodes and cache them
         while self._has_non_calculated_nodes() and self._next_node_index <= stop_at:
             while _get_ptr_value(self._next_node_pointer) != 0 and self._check_node_condition(self._next_node_pointer):
-                if len(self._parent_nodes_stack) > 100:  # ~2^100 nodes can't be true - something went wrong
+                if len(self._parent_nodes_stack) > self._MAX_TREE_DEPTH:
                     raise Exception("Invalid tree")
+                node_address = _get_ptr_value(self._next_node_pointer)
+                if node_address in self._visited_addresses:
+                    self._stop_at_cycle(self._next_node_index)
+                    return
+                self._visited_addresses.add(node_address)
 
                 self._parent_nodes_stack.append(self._next_node_pointer)
                 next_dereferenced = ItemExpression.dereference(self._next_node_pointer.GetNonSyntheticValue())
@@ -1108,7 +1546,79 @@ class BinaryTreeNodesProvider(NodesProvider):
             self._set_calculated_node(next_dereferenced)
             self._next_node_pointer = eval_expression(next_dereferenced, self._right_expression, EvalSettings.with_metadata())
 
+    def _calculate_cached_node_addresses(self, stop_at: int) -> None:
+        # only node addresses are collected, node values are created for the requested nodes
+        left_offset, right_offset = self._walker.offsets
+        while self._next_node_index <= stop_at:
+            try:
+                address = self._walk_to_next_node(self._walker_address, self._walker_stack, left_offset,
+                                                  self._visited_addresses)
+            except _CycleDetected:
+                self._stop_at_cycle(self._next_node_index)
+                break
+            if not address:
+                break
+            self._node_addresses.append(address)
+            index = self._next_node_index
+            node_value = self._create_node_value(address, index) if self._node_values_required or index == stop_at else None
+            self._set_calculated_node(node_value)
+            self._walker_address = self._walker.read_pointer(address, right_offset)
+
+        if stop_at < len(self._node_addresses) and self.cache[stop_at] is None:
+            self.cache[stop_at] = self._create_node_value(self._node_addresses[stop_at], stop_at)
+
+    def _calculate_node_from_end(self, index: int, index_from_end: int) -> bool:
+        left_offset, right_offset = self._walker.offsets
+        while len(self._reverse_node_addresses) <= index_from_end:
+            try:
+                address = self._walk_to_next_node(self._reverse_walker_address, self._reverse_walker_stack, right_offset,
+                                                  self._reverse_visited_addresses)
+            except _CycleDetected:
+                # the forward walk reports the cycle at its index
+                address = 0
+            if not address:
+                return False
+            self._reverse_node_addresses.append(address)
+            self._reverse_walker_address = self._walker.read_pointer(address, left_offset)
+
+        self.cache[index] = self._create_node_value(self._reverse_node_addresses[index_from_end], index)
+        return True
+
+    def _walk_to_next_node(self, address: int, stack: List[int], child_offset: int, visited: set[int]) -> int:
+        """
+        Descend from the node by the child pointers at the offset and pop the next node of the walk.
+
+        :return: address of the next node or 0 if the walk is over
+        :raises _CycleDetected: if the walk reaches a node visited before
+        """
+        while address and self._check_node_condition_at(address):
+            if len(stack) > self._MAX_TREE_DEPTH:
+                raise Exception("Invalid tree")
+            if address in visited:
+                raise _CycleDetected()
+            visited.add(address)
+            stack.append(address)
+            address = self._walker.read_pointer(address, child_offset)
+        return stack.pop() if stack else 0
+
+    def _create_node_value(self, address: int, index: int) -> lldb.SBValue:
+        return self._walker.create_node_value(self._head_pointer, "[{}]".format(index), address)
+
+    def _check_node_condition_at(self, address: int) -> bool:
+        if not self._node_condition:
+            return True
+        result = self._node_condition_results.get(address)
+        if result is None:
+            node_value = self._walker.create_node_value(self._head_pointer, "node", address)
+            result = self._node_condition_results[address] = _check_condition(node_value, self._node_condition)
+        return result
+
     def _has_non_calculated_nodes(self) -> bool:
+        if self.cycle_index is not None:
+            return False
+        if self._walker is not None:
+            return bool(self._walker_address and self._check_node_condition_at(self._walker_address) or
+                        self._walker_stack)
         return (_get_ptr_value(self._next_node_pointer) != 0 and self._check_node_condition(self._next_node_pointer) or
                 self._parent_nodes_stack)
 
@@ -1124,6 +1634,8 @@ class BinaryTreeIndexedNodesProvider(BinaryTreeNodesProvider):
 
 
 class BinaryTreeCustomNamesNodesProvider(BinaryTreeNodesProvider):
+    _node_values_required = True
+
     def __init__(self, ctx_val: lldb.SBValue, size: Optional[int], head_pointer: lldb.SBValue, left_expression: str, right_expression: str,
                  node_condition: Optional[str], custom_value_name: TypeVizInterpolatedString, wildcards: Sequence[str]):
         super().__init__(ctx_val, head_pointer, left_expression, right_expression, node_condition)
@@ -1321,34 +1833,102 @@ def _process_variables_nodes(variable_nodes: List[TypeVizItemVariableTypeNode],
 
 class CustomListItemsProvider(AbstractChildrenProvider):
     def __init__(self, items_provider: TypeVizItemProviderCustomListItems, instr: CustomListItemsInstruction, size: Optional[int],
-                 ctx_val: lldb.SBValue, context: EvaluationContext, wildcards: Sequence[str]):
+                 ctx_val: lldb.SBValue, context: Optional[EvaluationContext], wildcards: Sequence[str],
+                 compiled: Optional[CompiledCustomListItems] = None):
         self._items_provider: TypeVizItemProviderCustomListItems = items_provider
+        self._root_instruction: CustomListItemsInstruction = instr
         self._next_instruction: CustomListItemsInstruction = instr
         self._ctx_val: lldb.SBValue = ctx_val
-        self._context: EvaluationContext = context
+        # the context is created only when the program is interpreted
+        self._context: Optional[EvaluationContext] = context
         self._wildcards: Sequence[str] = wildcards
+        self._compiled: Optional[CompiledCustomListItems] = compiled
+        self._compiled_finished: bool = False
 
         self.cached_items: List[lldb.SBValue] = list()
         self.size: int = 0
         self.name_to_item: dict[str, int] = dict()
+        # whether the program without size has more items than calculated
+        self.has_more: bool = False
+        self._max_num_children: int = 0
+        # the first page of the program without size is calculated when the children are requested
+        self._first_page_pending: bool = False
         if size is not None:
             # Cache will be calculated lazily
             self.size = size
         else:
-            self._calculate_cache(g_max_num_children)
-            self.size = len(self.cached_items)
+            self.has_more = True
+            self._max_num_children = get_max_num_children(ctx_val.GetTypeName())
+            self._first_page_pending = True
+
+    def _ensure_first_page(self) -> None:
+        if self._first_page_pending:
+            self._first_page_pending = False
+            self._extend_cache(get_num_children_page_size())
+
+    def _extend_cache(self, num_children: int) -> bool:
+        num_children = min(num_children, self._max_num_children)
+        if not self.has_more or num_children <= self.size:
+            return False
+
+        # one more item tells whether the program has more items
+        self._calculate_cache(num_children)
+        self.has_more = len(self.cached_items) > num_children
+        old_size = self.size
+        self.size = min(len(self.cached_items), num_children)
+        return old_size != self.size
 
     def _calculate_cache(self, stop_at: int) -> None:
+        if self._compiled is not None:
+            if self._calculate_cache_compiled(stop_at):
+                return
+            # restart the program in the interpreter
+            self._compiled = None
+            self.cached_items = list()
+            self.name_to_item = dict()
+            self._next_instruction = self._root_instruction
+            self._context = _create_custom_list_items_context(self._items_provider, self._ctx_val, self._wildcards)
+
         first_index = len(self.cached_items)
         while self._next_instruction and len(self.cached_items) <= stop_at:
             self._next_instruction = self._next_instruction.execute(self._ctx_val, self._context, self.cached_items)
         for idx in range(first_index, len(self.cached_items)):
             self.name_to_item[self.cached_items[idx].GetName()] = idx
 
+    def _calculate_cache_compiled(self, stop_at: int) -> bool:
+        while not self._compiled_finished and len(self.cached_items) <= stop_at:
+            chunk = self._compiled.run(self._ctx_val, len(self.cached_items))
+            if chunk is None:
+                return False
+            items, self._compiled_finished = chunk
+            for item_node_index, address in items:
+                name = "[{}]".format(len(self.cached_items))
+                item = self._compiled.create_item(self._ctx_val, name, item_node_index, address)
+                opts = self._compiled.item_nodes[item_node_index].expr.view_options
+                item = _apply_value_formatting_impl(item, opts.format_spec, opts.format_flags, None, opts.view_spec_id)
+                self.name_to_item[name] = len(self.cached_items)
+                self.cached_items.append(item)
+        return True
+
     def num_children(self) -> int:
+        self._ensure_first_page()
         return self.size
 
+    def request_children(self, max_children: int) -> ChildrenProviderUpdateResult:
+        self._ensure_first_page()
+        if self._extend_cache(max_children):
+            return ChildrenProviderUpdateResult.SIZE_UPDATED
+        return ChildrenProviderUpdateResult.NONE
+
+    def preview_children(self, max_children: int) -> Tuple[int, bool]:
+        if self._first_page_pending:
+            # one item tells whether there are more children even if none is asked for
+            self._extend_cache(max(max_children, 1))
+        has_more = self.has_more and self.size < self._max_num_children
+        return min(self.size, max_children), self.size > max_children or has_more
+
     def get_child_index(self, name: str) -> int:
+        self._ensure_first_page()
         try:
             return self.name_to_item[name]
         except KeyError:
@@ -1366,14 +1946,20 @@ class CustomListItemsProvider(AbstractChildrenProvider):
             # That probably means that this provider is no longer valid, and we should rebuild all providers. But that should be rare case.
             return ChildrenProviderUpdateResult.NONE
 
-        old_size = self.size
+        old_size = self.num_children()
+        self._root_instruction = new_provider._root_instruction
         self._next_instruction = new_provider._next_instruction
         self._ctx_val = new_provider._ctx_val
         self._context = new_provider._context
+        self._compiled = new_provider._compiled
+        self._compiled_finished = new_provider._compiled_finished
         self.cached_items = new_provider.cached_items
         self.size = new_provider.size
+        self.has_more = new_provider.has_more
+        self._max_num_children = new_provider._max_num_children
+        self._first_page_pending = new_provider._first_page_pending
         self.name_to_item = new_provider.name_to_item
-        return ChildrenProviderUpdateResult.SIZE_UPDATED if old_size != self.size else ChildrenProviderUpdateResult.NONE
+        return ChildrenProviderUpdateResult.SIZE_UPDATED if old_size != self.num_children() else ChildrenProviderUpdateResult.NONE
 
 
 g_node_to_evaluation_context_factory = {}
@@ -1388,16 +1974,24 @@ def _create_custom_list_items_provider(items_provider: TypeVizItemProviderCustom
 
     root_instr = _process_code_block_nodes(items_provider.code_block_nodes, wildcards, None, [])
     size = _calculate_items_provider_size(items_provider.size_nodes, ctx_val, wildcards)
+    compiled = None
+    if is_enabled_custom_list_items_compilation():
+        compiled = CustomListItemsCompiler.get_compiled(items_provider, ctx_val, wildcards)
+    context = _create_custom_list_items_context(items_provider, ctx_val, wildcards) if compiled is None else None
+
+    return CustomListItemsProvider(items_provider, root_instr, size, ctx_val, context, wildcards, compiled)
+
+
+def _create_custom_list_items_context(items_provider: TypeVizItemProviderCustomListItems, ctx_val: lldb.SBValue,
+                                      wildcards: Sequence[str]) -> EvaluationContext:
     instantiated_node = (items_provider, wildcards)
     if instantiated_node not in g_node_to_evaluation_context_factory:
         context_factory = _process_variables_nodes(items_provider.variables_nodes, wildcards)
         g_node_to_evaluation_context_factory[instantiated_node] = context_factory
-        context = context_factory(ctx_val, True)
-    else:
-        context_factory = g_node_to_evaluation_context_factory[instantiated_node]
-        context = context_factory(ctx_val, False)
+        return context_factory(ctx_val, True)
 
-    return CustomListItemsProvider(items_provider, root_instr, size, ctx_val, context, wildcards)
+    context_factory = g_node_to_evaluation_context_factory[instantiated_node]
+    return context_factory(ctx_val, False)
 
 
 def _process_item_provider_custom_list_items(items_provider, val, wildcards):
@@ -1,18 +1,28 @@
 from jb_declarative_formatters.parsers.natvis import natvis_parse_file
 from jb_declarative_formatters.type_viz_storage import TypeVizStorage
+from .jb_lldb_declarative_formatters_options import is_enabled_natvis_lazy_loading
 from .jb_lldb_logging import log, get_logger
+from .jb_lldb_natvis_cache import get_source_cache_entry, load_cached_storage, store_cached_storage
 
 
 def natvis_loader(filepath):
+    lazy = is_enabled_natvis_lazy_loading()
+    cache_entry = get_source_cache_entry(filepath, lazy)
+    storage = load_cached_storage(cache_entry)
+    if storage is not None:
+        storage.set_logger(get_logger())
+        return storage
+
     storage = TypeVizStorage(get_logger())
-    load_natvis_file(storage, filepath)
+    load_natvis_file(storage, filepath, lazy)
     storage.generate_top_level_methods()
+    store_cached_storage(cache_entry, storage)
     return storage
 
 
-def load_natvis_file(storage, filepath):
+def load_natvis_file(storage, filepath, lazy=False):
     log("Parsing {}", filepath)
-    for type_viz in natvis_parse_file(filepath, get_logger()):
+    for type_viz in natvis_parse_file(filepath, get_logger(), lazy):
         log("Register types: {}", ', '.join(map(_type_viz_name_pp, type_viz.type_viz_names)))
         storage.add_type(type_viz)
 
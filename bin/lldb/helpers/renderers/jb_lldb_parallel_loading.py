@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, Sequence, Any
+
+from renderers.jb_lldb_declarative_formatters_loaders import TypeVizLoaderException
+from renderers.jb_lldb_declarative_formatters_options import enable_disable_natvis_cache, \
+    enable_disable_natvis_lazy_loading, get_natvis_cache_dir, is_enabled_natvis_cache, \
+    is_enabled_natvis_lazy_loading, set_natvis_cache_dir
+from renderers.jb_lldb_logging import log
+
+
+class LoadResult(object):
+    def __init__(self, filepath: str, storage: Any, error: Optional[TypeVizLoaderException], elapsed: float):
+        self.filepath = filepath
+        self.storage = storage
+        self.error = error
+        self.elapsed = elapsed
+
+
+def load_files(filepaths: Sequence[str], loader: Callable, jobs: int) -> list[LoadResult]:
+    """
+    Load type viz storages of the files, in worker processes if `jobs` allows that.
+    Storages must be serializable to be loaded in workers; loading falls back to serial one if workers are unavailable.
+
+    :return: load results in the order of `filepaths`
+    """
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(filepaths))
+    if jobs > 1:
+        results = _try_load_files_in_workers(filepaths, loader, jobs)
+        if results is not None:
+            return results
+
+    return [_load_file(loader, filepath) for filepath in filepaths]
+
+
+def _load_file(loader: Callable, filepath: str) -> LoadResult:
+    # Runs in worker processes, so it must be a picklable module-level function
+    start = time.perf_counter()
+    try:
+        storage = loader(filepath)
+        error = None
+    except TypeVizLoaderException as e:
+        storage = None
+        error = e
+    return LoadResult(filepath, storage, error, time.perf_counter() - start)
+
+
+def _init_worker(lazy: bool, natvis_cache_enabled: bool, natvis_cache_dir: str):
+    # Workers import the options with their defaults, the loaders must see the options set in the debugger
+    enable_disable_natvis_lazy_loading(lazy)
+    enable_disable_natvis_cache(natvis_cache_enabled)
+    set_natvis_cache_dir(natvis_cache_dir)
+
+
+# noinspection PyBroadException
+def _try_load_files_in_workers(filepaths: Sequence[str], loader: Callable, jobs: int) -> Optional[list[LoadResult]]:
+    python_executable = _find_python_executable()
+    if python_executable is None:
+        log("Python executable for worker processes is not found, loading natvis files serially")
+        return None
+
+    try:
+        import multiprocessing
+        mp_context = multiprocessing.get_context('spawn')
+        # Debugger process is not a Python interpreter, the workers have to be started by the Python executable
+        mp_context.set_executable(python_executable)
+
+        log("Loading {} natvis files in {} worker processes", len(filepaths), jobs)
+        worker_options = (is_enabled_natvis_lazy_loading(), is_enabled_natvis_cache(), get_natvis_cache_dir())
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context, initializer=_init_worker,
+                                 initargs=worker_options) as executor:
+            futures = [executor.submit(_load_file, loader, filepath) for filepath in filepaths]
+            return [future.result() for future in futures]
+
+    except Exception as e:
+        # Workers can't be started, can't import the loader or can't pass the storage back.
+        # Errors raised by the loader itself are reproduced by the serial loading.
+        log("Loading natvis files in worker processes failed ({}), loading them serially", e)
+        return None
+
+
+def _find_python_executable() -> Optional[str]:
+    candidates = [sys.executable, getattr(sys, '_base_executable', None)]
+    if sys.platform == 'win32':
+        candidates.append(os.path.join(sys.exec_prefix, 'python.exe'))
+    else:
+        version = f'{sys.version_info.major}.{sys.version_info.minor}'
+        candidates.append(os.path.join(sys.exec_prefix, 'bin', f'python{version}'))
+        candidates.append(os.path.join(sys.exec_prefix, 'bin', 'python3'))
+
+    for candidate in candidates:
+        if candidate and os.path.basename(candidate).lower().startswith('python') and os.path.isfile(candidate):
+            return candidate
+    return None
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import lldb
+from renderers.jb_lldb_cache import LLDBCache
+from renderers.jb_lldb_logging import log
+
+
+class ParseErrorCache:
+    """
+    ParseErrorCache remembers the expressions that LLDB failed to parse in the context of a specific type
+    in the current module. Parse errors don't depend on the runtime data, so a known bad expression
+    (e.g. a DisplayString alternative for another version of the library) is rejected without compiling it again
+    for every instance of the type and on every stop.
+    The errors are cleared when modules are loaded or unloaded, and when new symbols are loaded.
+    """
+    _lldb_cache = LLDBCache("lldb.ParseErrorCache",
+                            lldb.SBTarget.eBroadcastBitModulesLoaded |
+                            lldb.SBTarget.eBroadcastBitModulesUnloaded |
+                            lldb.SBTarget.eBroadcastBitSymbolsLoaded)
+
+    hits: int = 0
+
+    @staticmethod
+    def _make_key(val: lldb.SBValue, code: str) -> tuple:
+        current_module_path = val.GetFrame().GetModule().GetPlatformFileSpec().fullpath or ''
+        return current_module_path, val.GetTypeName(), code
+
+    @classmethod
+    def get_parse_error(cls, val: lldb.SBValue, code: str) -> Optional[lldb.SBError]:
+        error = cls._lldb_cache.get_for_process(val.GetProcess(), cls._make_key(val, code))
+        if error is not None:
+            cls.hits += 1
+            log("Skip evaluation of the expression that failed to parse before: {}", str(error))
+        return error
+
+    @classmethod
+    def add_parse_error(cls, val: lldb.SBValue, code: str, error: lldb.SBError):
+        cls._lldb_cache.set_for_process(val.GetProcess(), cls._make_key(val, code), error)
@@ -1,8 +1,10 @@
 import locale
-from typing import Tuple, Optional
+import re
+from typing import Dict, Iterable, List, Tuple, Optional
 
 import lldb
 from renderers.jb_lldb_declarative_formatters_options import get_max_string_length
+from renderers.jb_lldb_memory_cache import MEMORY_PAGE_SIZE, ProcessMemoryCache
 
 
 def get_max_string_summary_length(debugger):
@@ -25,6 +27,14 @@ def _repr(c):
         return c
 
 
+_ESCAPED_CHAR_CODES = [*range(0x1f), 0x7f]
+_escape_table = str.maketrans({char_code: _repr(chr(char_code)) for char_code in _ESCAPED_CHAR_CODES})
+_PATTERN_ESCAPED_CHARS = re.compile('[{}]'.format(''.join(re.escape(chr(char_code)) for char_code in _ESCAPED_CHAR_CODES)))
+
+# (char size, encoding) -> {char code: escaped char}
+_escaped_chars_cache: Dict[Tuple[int, str], Dict[int, str]] = {}
+_MAX_ESCAPED_CHARS_PER_ENCODING = 65536
+
 _locale = locale.getdefaultlocale()[1]
 
 
@@ -38,34 +48,82 @@ def get_locale():
 
 
 def escape_char(char_code, char_size, enc):
-    b: bytes = char_code.to_bytes(char_size, 'little')
-    return escape_bytes(b, enc)
+    return escape_chars([char_code], char_size, enc)[0]
+
+
+def escape_chars(char_codes: Iterable[int], char_size: int, enc: str) -> List[str]:
+    """
+    Escape every char code as a separate character, e.g. the elements of a char array.
+    """
+    escaped_chars = _escaped_chars_cache.get((char_size, enc))
+    if escaped_chars is None or len(escaped_chars) > _MAX_ESCAPED_CHARS_PER_ENCODING:
+        escaped_chars = {}
+        _escaped_chars_cache[(char_size, enc)] = escaped_chars
+
+    result = []
+    for char_code in char_codes:
+        escaped_char = escaped_chars.get(char_code)
+        if escaped_char is None:
+            escaped_char = escape_bytes(char_code.to_bytes(char_size, 'little'), enc)
+            escaped_chars[char_code] = escaped_char
+        result.append(escaped_char)
+    return result
 
 
 def escape_bytes(b, enc):
     s = b.decode(enc, 'replace')
-    s = ''.join([_repr(c) for c in s])
-    return s
+    if _PATTERN_ESCAPED_CHARS.search(s) is None:
+        return s
+    return s.translate(_escape_table)
+
+
+def _find_zero(content: bytes, zero: bytes, char_size: int) -> int:
+    pos = content.find(zero)
+    while pos != -1 and pos % char_size != 0:
+        pos = content.find(zero, pos + 1)
+    return pos
+
+
+def _read_chunk(process: lldb.SBProcess, address, size, char_size, err) -> Optional[bytes]:
+    """
+    Read at most `size` bytes at the address, the smaller parts are retried if the whole chunk can't be read.
+
+    :return: non-empty content of a multiple of `char_size` bytes or None if the first character can't be read
+    """
+    while True:
+        content = ProcessMemoryCache.read(process, address, size, err)
+        if err.Success() and content:
+            content = content[:len(content) - len(content) % char_size]
+            if content:
+                return content
+        if size == char_size:
+            if err.Success():
+                err.SetErrorString("memory read failed for 0x{:x}".format(address))
+            return None
+        size = max(char_size, size // 2 - size // 2 % char_size)
+        err.Clear()
 
 
 def extract_string(process: lldb.SBProcess, address, char_size, max_size, err) -> Tuple[Optional[bytes], bool]:
     if max_size is None:
         max_size = char_size * get_max_string_length()
     max_size = min(max_size, char_size * get_max_string_length())
+    max_size -= max_size % char_size
 
     zero = b'\x00' * char_size
     result = bytearray()
-    read_bytes = 0
-    zero_found = False
-    while read_bytes < max_size:
-        content = process.ReadMemory(address, char_size, err)
-        if err.Fail():
-            return None, zero_found
-        if content == zero:
-            zero_found = True
-            break
+    # Reads don't cross the boundaries of the pages, so the readable head of a string isn't lost with an unmapped tail
+    while len(result) < max_size:
+        chunk_size = min(max_size - len(result), MEMORY_PAGE_SIZE - address % MEMORY_PAGE_SIZE)
+        chunk_size = max(char_size, chunk_size - chunk_size % char_size)
+        content = _read_chunk(process, address, chunk_size, char_size, err)
+        if content is None:
+            return None, False
+        zero_pos = _find_zero(content, zero, char_size)
+        if zero_pos != -1:
+            result += content[:zero_pos]
+            return bytes(result), True
         result += content
-        address += char_size
-        read_bytes += char_size
+        address += len(content)
 
-    return bytes(result), zero_found
+    return bytes(result), False
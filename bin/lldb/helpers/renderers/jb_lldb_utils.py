@@ -2,14 +2,18 @@ from __future__ import annotations
 
 import traceback
 from enum import Flag, auto
-from typing import Optional
+from typing import Callable, Optional, Tuple
 
 import lldb
-from renderers.jb_lldb_declarative_formatters_options import set_recursion_level
+from renderers.jb_lldb_declarative_formatters_options import set_recursion_level, is_enabled_fast_eval, \
+    is_enabled_eval_result_cache, get_max_string_length
+from renderers.jb_lldb_eval_result_cache import EvalResultCache
 from renderers.jb_lldb_evaluation_utils import EvalSettings, EvaluateError, EvaluationContext
+from renderers.jb_lldb_fast_eval import try_fast_eval
 from renderers.jb_lldb_format_specs import eFormatRawView
 from renderers.jb_lldb_intrinsics_prolog_cache import IntrinsicsPrologCache
 from renderers.jb_lldb_logging import log
+from renderers.jb_lldb_parse_error_cache import ParseErrorCache
 from renderers.jb_lldb_item_expression import ItemExpression
 from six import StringIO
 
@@ -25,13 +29,22 @@ class Stream(object):
         self.pointer_format = "0x{:016x}" if is64bit else "0x{:08x}"
         self.length = 0
         self.level = initial_level
+        # the summary is cut after the text reaches the budget, the nested summaries share it
+        self.max_length = get_max_string_length()
 
     def create_nested(self):
         val = self.__class__(False, self.level)
         val.pointer_format = self.pointer_format
         val.length = self.length
+        val.max_length = self.max_length
         return val
 
+    def is_budget_exhausted(self) -> bool:
+        """
+        :return: True if nothing more is shown, so the summaries of the next children needn't be evaluated
+        """
+        return self.length > self.max_length
+
     def output(self, text):
         self.length += len(text)
         self.stream.write(text)
@@ -111,6 +124,28 @@ class AbstractChildrenProvider(object):
     def get_child_at_index(self, index: int) -> lldb.SBValue:
         raise NotImplementedError
 
+    def request_children(self, max_children: int) -> ChildrenProviderUpdateResult:
+        """
+        Calculate up to `max_children` children if the number of the children is not known without calculating them.
+        """
+        return ChildrenProviderUpdateResult.NONE
+
+    def preview_children(self, max_children: int) -> Tuple[int, bool]:
+        """
+        Calculate up to `max_children` first children without counting the rest.
+
+        :return: the number of the first children which can be got by index, and whether there are more children
+        """
+        num_children = self.num_children()
+        return min(num_children, max_children), num_children > max_children
+
+    def get_child_summary_presenter(self, index: int) -> Optional[Tuple[str, Callable[[Stream], None]]]:
+        """
+        :return: name of the child and the function to output its summary without creating the child value,
+                 None if the child value is needed
+        """
+        return None
+
     def try_update_size(self, value_non_synth: lldb.SBValue) -> ChildrenProviderUpdateResult:
         return ChildrenProviderUpdateResult.NONE
 
@@ -127,6 +162,9 @@ class AbstractVisDescriptor(object):
 
 
 class AbstractVizDescriptorProvider(object):
+    def watch_process(self, process: lldb.SBProcess):
+        pass
+
     def get_matched_visualizers(self, value_type: lldb.SBType, format_spec: int) -> AbstractVisDescriptor:
         pass
 
@@ -198,8 +236,31 @@ def eval_expression(val: lldb.SBValue, expr: str, settings: Optional[EvalSetting
                     context: Optional[EvaluationContext] = None) -> lldb.SBValue:
     log("Evaluate '{}' in context of '{}' of type '{}'", expr, val.GetName(), val.GetTypeName())
 
+    intrinsics_prolog = IntrinsicsPrologCache.get_intrinsics_prolog(val)
+    cache_key = None
+    if context is None and is_enabled_eval_result_cache():
+        cache_key = EvalResultCache.make_key(val, expr, settings, intrinsics_prolog)
+        if cache_key is not None:
+            cached_result = EvalResultCache.get(val, cache_key, settings)
+            if cached_result is not None:
+                log("Evaluate succeed from the cache of the current stop: result type - {}",
+                    cached_result.GetTypeName())
+                return cached_result
+
+    if context is None and is_enabled_fast_eval():
+        fast_eval_result = try_fast_eval(val, expr, settings, intrinsics_prolog)
+        if fast_eval_result is not None:
+            log("Evaluate succeed without LLDB: result type - {}", fast_eval_result.GetTypeName())
+            if cache_key is not None:
+                EvalResultCache.set(val, cache_key, fast_eval_result, expr)
+            return fast_eval_result
+
     expression_with_context = context.add_context(expr) if context else expr
-    expression_with_intrinsics = IntrinsicsPrologCache.add_intrinsics_prolog(val, expression_with_context)
+    expression_with_intrinsics = IntrinsicsPrologCache.add_prolog(intrinsics_prolog, expression_with_context)
+    parse_error = ParseErrorCache.get_parse_error(val, expression_with_intrinsics)
+    if parse_error is not None:
+        raise EvaluateError(parse_error)
+
     eval_result = _execute_lldb_eval(val, expression_with_intrinsics, settings)
 
     result_non_synth = eval_result.GetNonSyntheticValue()
@@ -209,6 +270,7 @@ def eval_expression(val: lldb.SBValue, expr: str, settings: Optional[EvalSetting
         err_code = err.GetError()
         if err_type == lldb.eErrorTypeExpression and err_code == lldb.eExpressionParseError:
             log("Evaluate failed (can't parse expression): {}", str(err))
+            ParseErrorCache.add_parse_error(val, expression_with_intrinsics, err)
             raise EvaluateError(err)
 
         # error is runtime error which is handled later
@@ -216,6 +278,8 @@ def eval_expression(val: lldb.SBValue, expr: str, settings: Optional[EvalSetting
         return eval_result
 
     log("Evaluate succeed: result type - {}", str(result_non_synth.GetTypeName()))
+    if cache_key is not None:
+        EvalResultCache.set(val, cache_key, eval_result, expression_with_intrinsics)
     return eval_result
 
 
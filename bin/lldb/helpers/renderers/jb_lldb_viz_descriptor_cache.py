@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+import lldb
+from renderers.jb_lldb_declarative_formatters_options import get_viz_descriptor_cache_size
+from renderers.jb_lldb_logging import log
+
+
+class VizDescriptorCache(object):
+    """
+    VizDescriptorCache keeps the visualizer descriptors matched to the types, the least recently used descriptors
+    are evicted when the cache is full.
+    Descriptors are built from the SBType of a module and from the loaded visualizers, so the whole cache is
+    dropped when modules are loaded or unloaded, or when new symbols are loaded in any of the watched processes.
+    """
+    _CLEAR_ON_TARGET_EVENTS = lldb.SBTarget.eBroadcastBitModulesLoaded | \
+                              lldb.SBTarget.eBroadcastBitModulesUnloaded | \
+                              lldb.SBTarget.eBroadcastBitSymbolsLoaded
+
+    def __init__(self, name: str):
+        self._name = name
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._listeners: dict[int, lldb.SBListener] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def watch_process(self, process: lldb.SBProcess):
+        if not process.IsValid():
+            return
+        process_id = process.GetUniqueID()
+        if process_id in self._listeners:
+            return
+        listener = lldb.SBListener(f"{self._name}.Process.{process_id}")
+        listener.StartListeningForEvents(process.GetTarget().GetBroadcaster(), self._CLEAR_ON_TARGET_EVENTS)
+        self._listeners[process_id] = listener
+
+    def _sync(self):
+        has_any_event = False
+        event = lldb.SBEvent()
+        for listener in self._listeners.values():
+            while listener.GetNextEvent(event):
+                has_any_event = True
+
+        if has_any_event:
+            log(f"[{self._name}]: Got an event, clear the cache")
+            self.clear()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        :param default: the value returned if the key isn't cached, cached values may be None
+        """
+        self._sync()
+        if key not in self._entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self.trim(get_viz_descriptor_cache_size())
+
+    def trim(self, max_size: int):
+        while len(self._entries) > max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def evict_if(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        evicted_keys = [key for key, value in self._entries.items() if predicate(key, value)]
+        for key in evicted_keys:
+            del self._entries[key]
+        if evicted_keys:
+            self.invalidations += 1
+        return len(evicted_keys)
+
+    def clear(self):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def reset_statistics(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def format_statistics(self, title: str) -> str:
+        total = self.hits + self.misses
+        hit_rate = 100.0 * self.hits / total if total else 0.0
+        return '{}: {} hits, {} misses ({:.1f}% hit rate), {} evictions, {} invalidations, ' \
+               '{}/{} cached entries'.format(title, self.hits, self.misses, hit_rate, self.evictions,
+                                             self.invalidations, len(self._entries), get_viz_descriptor_cache_size())
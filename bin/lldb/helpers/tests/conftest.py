@@ -0,0 +1,124 @@
+import io
+import itertools
+import os
+import sys
+import types
+
+_HELPERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in (os.path.join(os.path.dirname(os.path.dirname(_HELPERS_DIR)), 'helpers'), _HELPERS_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+
+class _SBError(object):
+    def __init__(self):
+        self._message = None
+
+    def Success(self) -> bool:
+        return self._message is None
+
+    def Fail(self) -> bool:
+        return self._message is not None
+
+    def SetErrorString(self, message: str):
+        self._message = message
+
+    def Clear(self):
+        self._message = None
+
+    def GetCString(self):
+        return self._message
+
+    def __str__(self) -> str:
+        return self._message or 'success'
+
+
+# enumerators of the stub are distinct integers, the custom formats follow kNumFormats
+_enumerators = itertools.count(1024)
+
+
+def _make_enumerator(owner, name: str) -> int:
+    if not name.startswith('e'):
+        raise AttributeError(f"'{owner.__name__}' has no attribute '{name}'")
+    value = next(_enumerators)
+    setattr(owner, name, value)
+    return value
+
+
+class _SBClass(type):
+    def __getattr__(cls, name):
+        return _make_enumerator(cls, name)
+
+
+class _SBObject(object, metaclass=_SBClass):
+    """
+    Placeholder of the SB API classes, the tests pass their own fakes instead of the values of these classes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class _Logger(object):
+    def __rshift__(self, other):
+        pass
+
+
+def _is_lldb_available() -> bool:
+    try:
+        import lldb
+    except ImportError:
+        return False
+    # `bin/lldb` is imported as a namespace package when `bin` is on the path
+    return hasattr(lldb, 'SBDebugger')
+
+
+def _install_lldb_stub():
+    """
+    Install a minimal `lldb` module, so the pure Python parts of the renderers are tested without LLDB.
+    SB classes are placeholders and enumerators are distinct integers.
+    """
+    lldb = types.ModuleType('lldb')
+    lldb.LLDB_INVALID_ADDRESS = 0xffffffffffffffff
+    lldb.kNumFormats = 64
+    lldb.SBError = _SBError
+
+    def get_attribute(name: str):
+        if name.startswith('SB'):
+            value = _SBClass(name, (_SBObject,), {})
+            setattr(lldb, name, value)
+            return value
+        return _make_enumerator(lldb, name)
+
+    lldb.__getattr__ = get_attribute
+
+    formatters = types.ModuleType('lldb.formatters')
+    logger = types.ModuleType('lldb.formatters.Logger')
+    logger.Logger = _Logger
+    logger._lldb_formatters_debug_level = 0
+    logger._lldb_formatters_debug_filename = None
+    formatters.Logger = logger
+    lldb.formatters = formatters
+
+    sys.modules['lldb'] = lldb
+    sys.modules['lldb.formatters'] = formatters
+    sys.modules['lldb.formatters.Logger'] = logger
+
+
+def _install_six_stub():
+    six = types.ModuleType('six')
+    six.StringIO = io.StringIO
+    six.itervalues = lambda d: iter(d.values())
+    sys.modules['six'] = six
+
+
+if not _is_lldb_available():
+    _install_lldb_stub()
+
+try:
+    import six  # noqa: F401
+except ImportError:
+    _install_six_stub()
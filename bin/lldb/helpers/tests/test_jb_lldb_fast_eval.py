@@ -0,0 +1,180 @@
+import os
+import sys
+import unittest
+
+_HELPERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _HELPERS_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(_HELPERS_DIR)), 'helpers'))
+
+import lldb  # noqa: E402
+from renderers.jb_lldb_fast_eval import FastEvalStatistics, has_side_effects, try_fast_eval, \
+    _Evaluator, _Pointer, _Scalar, _parse_expression  # noqa: E402
+
+
+class _FakeType(object):
+    def __init__(self, byte_size: int, type_class: int = 0):
+        self.byte_size = byte_size
+        self.type_class = type_class
+
+    def GetByteSize(self):
+        return self.byte_size
+
+    def GetCanonicalType(self):
+        return self
+
+    def GetTypeClass(self):
+        return self.type_class
+
+    def IsValid(self):
+        return True
+
+
+class _FakeTarget(object):
+    def GetAddressByteSize(self):
+        return 8
+
+    def GetBasicType(self, basic_type):
+        return _FakeType(8)
+
+
+class _FakeValue(object):
+    """
+    Context value of a builtin type: its members can't be evaluated.
+    """
+
+    def GetNonSyntheticValue(self):
+        return self
+
+    def GetTarget(self):
+        return _FakeTarget()
+
+    def GetType(self):
+        return _FakeType(4, lldb.eTypeClassBuiltin)
+
+
+class FastEvalParseTest(unittest.TestCase):
+    def assert_parsed(self, expression, ast, identifiers=()):
+        parsed = _parse_expression(expression)
+        self.assertIsNotNone(parsed, expression)
+        self.assertEqual((ast, frozenset(identifiers)), parsed)
+
+    def assert_not_parsed(self, expression):
+        self.assertIsNone(_parse_expression(expression), expression)
+
+    def test_members_and_subscripts(self):
+        self.assert_parsed('a.b->c[2]',
+                           ('index', ('member', ('member', ('id', 'a'), 'b', False), 'c', True),
+                            ('number', 2, False, 0, True)),
+                           ['a'])
+        self.assert_parsed('this->size', ('member', ('this',), 'size', True))
+        self.assert_parsed('*p', ('unary', '*', ('id', 'p')), ['p'])
+
+    def test_precedence(self):
+        self.assert_parsed('a + b * 2 == c',
+                           ('binary', '==',
+                            ('binary', '+', ('id', 'a'), ('binary', '*', ('id', 'b'), ('number', 2, False, 0, True))),
+                            ('id', 'c')),
+                           ['a', 'b', 'c'])
+        self.assert_parsed('a && b || c',
+                           ('binary', '||', ('binary', '&&', ('id', 'a'), ('id', 'b')), ('id', 'c')),
+                           ['a', 'b', 'c'])
+        self.assert_parsed('n ? 1 : 0',
+                           ('cond', ('id', 'n'), ('number', 1, False, 0, True), ('number', 0, False, 0, True)),
+                           ['n'])
+
+    def test_literals(self):
+        self.assert_parsed('0x10', ('number', 16, False, 0, False))
+        self.assert_parsed('010', ('number', 8, False, 0, False))
+        self.assert_parsed('0b11', ('number', 3, False, 0, False))
+        self.assert_parsed('1ull', ('number', 1, True, 2, True))
+        self.assert_parsed('true', ('bool', True))
+        self.assert_parsed('nullptr', ('nullptr',))
+        self.assert_not_parsed('1.5')
+        self.assert_not_parsed('1f')
+        self.assert_not_parsed("'a'")
+        self.assert_not_parsed('"a"')
+
+    def test_casts(self):
+        self.assert_parsed('(unsigned char)x', ('cast', 'unsigned char', ('id', 'x')), ['x'])
+        self.assert_parsed('(long long int)x', ('cast', 'long long int', ('id', 'x')), ['x'])
+        self.assert_parsed('(x)', ('id', 'x'), ['x'])
+        self.assert_not_parsed('(int*)x')
+        self.assert_not_parsed('(Foo)x')
+        self.assert_not_parsed('(long char)x')
+        self.assert_not_parsed('sizeof(int)')
+
+    def test_unsupported(self):
+        self.assert_not_parsed('size()')
+        self.assert_not_parsed('p->get(0)')
+        self.assert_not_parsed('std::max')
+        self.assert_not_parsed('a, b')
+        self.assert_not_parsed('x.true')
+        self.assert_not_parsed('a +')
+        self.assert_not_parsed('a[1')
+
+    def test_side_effects(self):
+        for expression in ('a = 1', 'a += 1', 'a++', '--a', 'a <<= 1', 'a >>= 1'):
+            self.assertTrue(has_side_effects(expression), expression)
+            self.assert_not_parsed(expression)
+        for expression in ('a == 1', 'a != 1', 'a <= 1', 'a >= 1', '!a', 'a - -1'):
+            self.assertFalse(has_side_effects(expression), expression)
+
+
+class FastEvalArithmeticTest(unittest.TestCase):
+    def evaluate(self, expression):
+        ast, _ = _parse_expression(expression)
+        return _Evaluator(_FakeValue()).evaluate(ast)
+
+    def assert_scalar(self, expression, value, size, signed):
+        result = self.evaluate(expression)
+        self.assertIsInstance(result, _Scalar, expression)
+        self.assertEqual((value, size, signed), (result.value, result.int_type.size, result.int_type.signed),
+                         expression)
+
+    def test_literal_types(self):
+        self.assert_scalar('2147483647', 2147483647, 4, True)
+        self.assert_scalar('2147483648', 2147483648, 8, True)
+        self.assert_scalar('0xffffffff', 0xffffffff, 4, False)
+        self.assert_scalar('1u', 1, 4, False)
+        self.assert_scalar('1ll', 1, 8, True)
+
+    def test_c_semantics(self):
+        self.assert_scalar('-7 / 2', -3, 4, True)
+        self.assert_scalar('-7 % 2', -1, 4, True)
+        self.assert_scalar('1u - 2', 0xffffffff, 4, False)
+        self.assert_scalar('2147483647 + 1', -2147483648, 4, True)
+        self.assert_scalar('-1 < 1u', 0, 1, False)
+        self.assert_scalar('(bool)5', 1, 1, False)
+        self.assert_scalar('1 << 4 | 1', 17, 4, True)
+        self.assert_scalar('0 ? 1 : 2', 2, 4, True)
+        self.assert_scalar('!nullptr', 1, 1, False)
+
+    def test_pointer_constants(self):
+        result = self.evaluate('nullptr')
+        self.assertIsInstance(result, _Pointer)
+        self.assertEqual(0, result.address)
+
+
+class FastEvalFallbackTest(unittest.TestCase):
+    def setUp(self):
+        FastEvalStatistics.reset()
+
+    def test_unsupported_expression(self):
+        self.assertIsNone(try_fast_eval(_FakeValue(), 'size()', None, ''))
+        self.assertEqual((0, 1, 0), (FastEvalStatistics.hits, FastEvalStatistics.unsupported,
+                                     FastEvalStatistics.fallbacks))
+
+    def test_prolog_shadows_members(self):
+        self.assertIsNone(try_fast_eval(_FakeValue(), 'size + 1', None, 'auto size = m_end - m_begin;'))
+        self.assertEqual((0, 1, 0), (FastEvalStatistics.hits, FastEvalStatistics.unsupported,
+                                     FastEvalStatistics.fallbacks))
+
+    def test_evaluation_falls_back(self):
+        for expression in ('1 / 0', '1 << 32', 'size', '*nullptr', '&1'):
+            self.assertIsNone(try_fast_eval(_FakeValue(), expression, None, ''), expression)
+        self.assertEqual((0, 0, 5), (FastEvalStatistics.hits, FastEvalStatistics.unsupported,
+                                     FastEvalStatistics.fallbacks))
+
+
+if __name__ == '__main__':
+    unittest.main()
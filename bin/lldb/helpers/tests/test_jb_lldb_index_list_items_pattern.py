@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+
+_HELPERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _HELPERS_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(_HELPERS_DIR)), 'helpers'))
+
+from renderers.jb_lldb_index_list_items_pattern import IndexListItemsPattern  # noqa: E402
+
+
+class IndexListItemsPatternParseTest(unittest.TestCase):
+    def assert_parsed(self, expression, base, coefficient, offset, modulo, members=()):
+        pattern = IndexListItemsPattern.parse(expression)
+        self.assertIsNotNone(pattern, expression)
+        self.assertEqual((base, coefficient, offset, modulo, list(members)),
+                         (pattern.base, pattern.coefficient, pattern.offset, pattern.modulo, pattern.members))
+
+    def assert_not_parsed(self, expression):
+        self.assertIsNone(IndexListItemsPattern.parse(expression), expression)
+
+    def test_affine(self):
+        self.assert_parsed('data[$i]', 'data', '(1)', '0', None)
+        self.assert_parsed('m_impl->data[2*$i + 1]', 'm_impl->data', '((2))', '+(1)', None)
+        self.assert_parsed('this->a.b[n - $i]', 'this->a.b', '-(1)', '(n)', None)
+        self.assert_parsed('ptr[$i].value', 'ptr', '(1)', '0', None, ['value'])
+        self.assert_parsed('p[n / 2 + $i]', 'p', '(1)', '(n / 2)', None)
+
+    def test_modulo(self):
+        self.assert_parsed('buf[(head + $i) % cap]', 'buf', '(1)', '(head)', 'cap')
+        self.assert_parsed('p->q[(m_first+$i)%m_size].x.y', 'p->q', '(1)', '(m_first)', 'm_size', ['x', 'y'])
+        self.assert_parsed('p[$i % this->cap]', 'p', '(1)', '0', 'this->cap')
+        self.assert_parsed('p[$i % (n + 1)]', 'p', '(1)', '0', '(n + 1)')
+
+    def test_modulo_is_not_outermost(self):
+        self.assert_not_parsed('p[(head + $i) % cap + 1]')
+        self.assert_not_parsed('p[a + $i % n]')
+        self.assert_not_parsed('p[$i % n * 2]')
+        self.assert_not_parsed('p[$i * 3 % 2]')
+        self.assert_not_parsed('p[$i % n % m]')
+
+    def test_division(self):
+        self.assert_not_parsed('p[$i * 3 / 2]')
+        self.assert_not_parsed('p[$i / 2]')
+
+    def test_unsupported(self):
+        self.assert_not_parsed('a + b[$i]')
+        self.assert_not_parsed('v[$i][0]')
+        self.assert_not_parsed('data[$i++]')
+        self.assert_not_parsed('x[g($i)]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import unittest
+
+_HELPERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _HELPERS_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(_HELPERS_DIR)), 'helpers'))
+
+import lldb  # noqa: E402
+from renderers.jb_lldb_memory_cache import MEMORY_PAGE_SIZE, ProcessMemoryCache  # noqa: E402
+from renderers.jb_lldb_string_utils import escape_bytes, escape_char, escape_chars, extract_string  # noqa: E402
+
+
+class _FakeProcess(object):
+    """
+    Process with the content at the address, the pages holding it are readable and the rest of them is filled.
+    """
+
+    def __init__(self, address: int, content: bytes):
+        self.address = address - address % MEMORY_PAGE_SIZE
+        end = address + len(content)
+        end += -end % MEMORY_PAGE_SIZE
+        memory = bytearray(b'\xcc' * (end - self.address))
+        memory[address - self.address:address - self.address + len(content)] = content
+        self.content = bytes(memory)
+
+    def IsValid(self):
+        return True
+
+    def GetUniqueID(self):
+        return id(self)
+
+    def GetStopID(self, include_expression_stops=False):
+        return 1
+
+    def ReadMemory(self, address, size, err):
+        offset = address - self.address
+        if offset < 0 or offset >= len(self.content):
+            err.SetErrorString("memory read failed for 0x{:x}".format(address))
+            return None
+        return self.content[offset:offset + size]
+
+
+class EscapeTest(unittest.TestCase):
+    def test_escape_bytes(self):
+        self.assertEqual('abc', escape_bytes(b'abc', 'utf-8'))
+        # the whitespaces and the bell are kept as is
+        self.assertEqual('a\\0b\tc\n\\x1b\\x7f', escape_bytes(b'a\x00b\tc\n\x1b\x7f', 'utf-8'))
+        self.assertEqual('é�', escape_bytes(b'\xc3\xa9\xff', 'utf-8'))
+
+    def test_escape_chars(self):
+        self.assertEqual(['a', '\\0', '\\x1e', 'я'], escape_chars([0x61, 0, 0x1e, 0x44f], 2, 'utf-16-le'))
+        self.assertEqual(['\\x1', '\\x1'], escape_chars([1, 1], 1, 'utf-8'))
+        self.assertEqual('\\x7f', escape_char(0x7f, 4, 'utf-32-le'))
+
+
+class ExtractStringTest(unittest.TestCase):
+    def setUp(self):
+        ProcessMemoryCache.invalidate()
+
+    def tearDown(self):
+        ProcessMemoryCache.invalidate()
+
+    def extract(self, process, address, char_size=1, max_size=None):
+        err = lldb.SBError()
+        content, terminated = extract_string(process, address, char_size, max_size, err)
+        return content, terminated, err.Success()
+
+    def test_terminated(self):
+        process = _FakeProcess(0x1000, b'hello\x00world')
+        self.assertEqual((b'hello', True, True), self.extract(process, 0x1000))
+
+    def test_max_size(self):
+        process = _FakeProcess(0x1000, b'hello\x00')
+        self.assertEqual((b'hel', False, True), self.extract(process, 0x1000, max_size=3))
+
+    def test_zero_is_aligned_to_char_size(self):
+        process = _FakeProcess(0x1000, 'aĀb'.encode('utf-16-le') + b'\x00\x00')
+        self.assertEqual(('aĀb'.encode('utf-16-le'), True, True), self.extract(process, 0x1000, char_size=2))
+
+    def test_terminator_before_unmapped_page(self):
+        address = 2 * MEMORY_PAGE_SIZE - 3
+        process = _FakeProcess(address, b'ab\x00')
+        self.assertEqual((b'ab', True, True), self.extract(process, address))
+
+    def test_unterminated_before_unmapped_page(self):
+        address = 2 * MEMORY_PAGE_SIZE - 3
+        process = _FakeProcess(address, b'abc')
+        self.assertEqual((None, False, False), self.extract(process, address))
+
+    def test_terminator_on_next_page(self):
+        address = 2 * MEMORY_PAGE_SIZE - 3
+        process = _FakeProcess(address, b'abcdef\x00')
+        self.assertEqual((b'abcdef', True, True), self.extract(process, address))
+
+    def test_unreadable_start(self):
+        process = _FakeProcess(0x1000, b'abc')
+        self.assertEqual((None, False, False), self.extract(process, 0x2000))
+
+
+if __name__ == '__main__':
+    unittest.main()
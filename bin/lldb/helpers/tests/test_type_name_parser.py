@@ -0,0 +1,74 @@
+import os
+import sys
+import unittest
+
+_HELPERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _HELPERS_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(_HELPERS_DIR)), 'helpers'))
+
+from jb_declarative_formatters.parsers.type_name_parser import DefaultDiagHandler, TypeNameParsingError, \
+    parse_type_name_template  # noqa: E402
+
+
+class _CollectingDiagHandler(DefaultDiagHandler):
+    def __init__(self):
+        self.errors = []
+
+    def raise_error(self, error: TypeNameParsingError):
+        self.errors.append(error)
+        raise error
+
+
+class TypeNameParserTest(unittest.TestCase):
+    def assert_parsed(self, type_name, name, fmt, args, text):
+        parsed = parse_type_name_template(type_name)
+        self.assertEqual((name, fmt, args, text), (parsed.name, parsed.fmt, [str(arg) for arg in parsed.args],
+                                                   str(parsed)))
+
+    def test_templates(self):
+        self.assert_parsed('std::vector<int, std::allocator<int>>', 'std::vector<>', 'std::vector<{},{} >',
+                           ['int', 'std::allocator<int>'], 'std::vector<int,std::allocator<int> >')
+        self.assert_parsed('Foo<*>', 'Foo<>', 'Foo<{}>', ['*'], 'Foo<*>')
+        self.assert_parsed('T<A, *>', 'T<>', 'T<{},{}>', ['A', '*'], 'T<A,*>')
+
+    def test_simple_types_keep_original_text(self):
+        self.assert_parsed('unsigned   int', 'unsigned int', 'unsigned int', [], 'unsigned   int')
+        self.assert_parsed('int const *', 'int const*', 'int const*', [], 'int const *')
+        self.assert_parsed('<lambda_1>', '<lambda_1>', '<lambda_1>', [], '<lambda_1>')
+
+    def test_signatures(self):
+        self.assert_parsed('void (*)(int, Bar<char>)', 'void(*)(int,Bar<>)', 'void(*)(int,Bar<{}>)', ['char'],
+                           'void(*)(int,Bar<char>)')
+
+    def test_wildcards(self):
+        self.assertTrue(parse_type_name_template('Foo<Bar<*>>').has_wildcard)
+        self.assertFalse(parse_type_name_template('Foo<Bar<int>>').has_wildcard)
+
+    def test_errors(self):
+        for type_name, pos in (('Foo<int', 7), ('Foo<int>>', 8), ('<foo>', 1), ('f(int', 5)):
+            with self.assertRaises(TypeNameParsingError, msg=type_name) as context:
+                parse_type_name_template(type_name)
+            self.assertEqual(pos, context.exception.pos, type_name)
+
+    def test_default_handler_results_are_cached(self):
+        parsed = parse_type_name_template('std::map<int, Foo<char>>')
+        self.assertIs(parsed, parse_type_name_template('std::map<int, Foo<char>>'))
+        with self.assertRaises(AttributeError):
+            parsed.name = 'Bar'
+
+    def test_errors_are_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(TypeNameParsingError):
+                parse_type_name_template('Foo<')
+
+    def test_custom_handler_is_called(self):
+        handler = _CollectingDiagHandler()
+        for _ in range(2):
+            with self.assertRaises(TypeNameParsingError):
+                parse_type_name_template('Foo<', handler)
+        self.assertEqual(2, len(handler.errors))
+        self.assertIsNot(parse_type_name_template('Foo<int>', handler), parse_type_name_template('Foo<int>', handler))
+
+
+if __name__ == '__main__':
+    unittest.main()
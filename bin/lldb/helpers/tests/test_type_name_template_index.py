@@ -0,0 +1,89 @@
+import itertools
+import os
+import sys
+import unittest
+
+_HELPERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _HELPERS_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(_HELPERS_DIR)), 'helpers'))
+
+from jb_declarative_formatters.parsers.type_name_parser import parse_type_name_template  # noqa: E402
+from jb_declarative_formatters.type_name_template_index import TypeNameTemplateIndex  # noqa: E402
+
+_TEMPLATES = [
+    'A<*>',
+    'A<int>',
+    'A<int, *>',
+    'A<*, *>',
+    'A<*, char>',
+    'A<B<*>>',
+    'A<B<*>, *>',
+    'A<B<int, *>>',
+    'A<B<*, *>, int>',
+    'B<*>',
+    'B<int, *>',
+    'B<A<*>, *>',
+    'C<*, A<*>, *>',
+]
+
+_CANDIDATES = [
+    'A<int>',
+    'A<char>',
+    'A<int, char>',
+    'A<int, char, long>',
+    'A<char, char>',
+    'A<B<int>>',
+    'A<B<int, char>>',
+    'A<B<int, char>, int>',
+    'A<B<int, char, long>, int, char>',
+    'A<B<int>, char>',
+    'B<int>',
+    'B<int, int, int>',
+    'B<A<int, char>, long>',
+    'C<int, A<char>, long, long>',
+    'C<int, A<char, char>>',
+    'D<int>',
+]
+
+
+class TypeNameTemplateIndexTest(unittest.TestCase):
+    def make_index(self, templates):
+        index = TypeNameTemplateIndex()
+        for template in templates:
+            index.add(parse_type_name_template(template), template)
+        return index
+
+    def assert_lookup(self, index, templates, candidate):
+        parsed = parse_type_name_template(candidate)
+        expected = [template for template in templates if parse_type_name_template(template).match(parsed)]
+        self.assertEqual(sorted(expected), sorted(index.lookup(parsed)), candidate)
+
+    def test_lookup_is_match(self):
+        index = self.make_index(_TEMPLATES)
+        for candidate in _CANDIDATES:
+            self.assert_lookup(index, _TEMPLATES, candidate)
+
+    def test_lookup_is_match_for_every_subset_order(self):
+        for templates in itertools.permutations(_TEMPLATES[:5]):
+            index = self.make_index(templates)
+            for candidate in _CANDIDATES[:5]:
+                self.assert_lookup(index, templates, candidate)
+
+    def test_trailing_wildcard(self):
+        index = self.make_index(['A<int, *>'])
+        self.assertEqual([], index.lookup(parse_type_name_template('A<int>')))
+        self.assertEqual(['A<int, *>'], index.lookup(parse_type_name_template('A<int, char, long>')))
+        # the trailing wildcard matches only the arguments of its own template
+        index = self.make_index(['A<B<int, *>, char>'])
+        self.assertEqual([], index.lookup(parse_type_name_template('A<B<int>, char>')))
+        self.assertEqual(['A<B<int, *>, char>'], index.lookup(parse_type_name_template('A<B<int, long>, char>')))
+
+    def test_duplicate_templates(self):
+        index = TypeNameTemplateIndex()
+        index.add(parse_type_name_template('A<*>'), 1)
+        index.add(parse_type_name_template('A<*>'), 2)
+        self.assertEqual([1, 2], sorted(index.lookup(parse_type_name_template('A<int>'))))
+
+
+if __name__ == '__main__':
+    unittest.main()